@@ -0,0 +1,265 @@
+# aim_calibration.py
+import json
+import os
+import time
+
+# Calibration file lives next to the code (same as the ONNX model)
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "aim_calibration.json")
+
+
+class AimTable:
+    """
+    Image position -> Pan/Tilt correction lookup table.
+    - Each sample: target seen at (cx, cy), turret had to move (d_pan, d_tilt)
+      so the NOZZLE hits it (nozzle offset is included)
+    - Samples are spread over a dense grid (inverse distance weighting)
+    - Lookup is bilinear, so Auto Mode can slew to the target in one move
+    - Joystick trims (g_offset_x/y) are stored in the same file
+    """
+    GRID_SIZE = 33          # Grid nodes per axis over the 0..1 image range
+    IDW_POWER = 2.0
+    MIN_SAMPLES = 4
+
+    def __init__(self):
+        self.samples = []   # [cx, cy, d_pan, d_tilt]
+        self.grid = None    # grid[iy][ix] = (d_pan, d_tilt)
+        self.calib_offset_x = None   # Trims active while the samples were recorded
+        self.calib_offset_y = None
+        self.offset_x = None         # Last saved trims
+        self.offset_y = None
+
+    @property
+    def ready(self):
+        return self.grid is not None and self.calib_offset_x is not None and self.calib_offset_y is not None
+
+    def add_sample(self, cx, cy, d_pan, d_tilt):
+        self.samples.append([cx, cy, d_pan, d_tilt])
+
+    def build(self):
+        """Spread samples over the dense grid"""
+        if len(self.samples) < self.MIN_SAMPLES:
+            print(f"[Aim] Not enough samples ({len(self.samples)}/{self.MIN_SAMPLES}).")
+            self.grid = None
+            return False
+
+        n = self.GRID_SIZE
+        grid = []
+        for iy in range(n):
+            row = []
+            gy = iy / (n - 1)
+            for ix in range(n):
+                gx = ix / (n - 1)
+                w_sum = p_sum = t_sum = 0.0
+                exact = None
+                for cx, cy, d_pan, d_tilt in self.samples:
+                    dist2 = (gx - cx) ** 2 + (gy - cy) ** 2
+                    if dist2 < 1e-12:
+                        exact = (d_pan, d_tilt)
+                        break
+                    w = 1.0 / dist2 ** (self.IDW_POWER / 2.0)
+                    w_sum += w
+                    p_sum += w * d_pan
+                    t_sum += w * d_tilt
+                row.append(exact if exact else (p_sum / w_sum, t_sum / w_sum))
+            grid.append(row)
+        self.grid = grid
+        return True
+
+    def lookup(self, cx, cy):
+        """Bilinear lookup -> (d_pan, d_tilt) to put the nozzle on (cx, cy)"""
+        n = self.GRID_SIZE
+        fx = max(0.0, min(1.0, cx)) * (n - 1)
+        fy = max(0.0, min(1.0, cy)) * (n - 1)
+        ix, iy = min(int(fx), n - 2), min(int(fy), n - 2)
+        tx, ty = fx - ix, fy - iy
+
+        def lerp(a, b, t):
+            return a + (b - a) * t
+
+        g = self.grid
+        out = []
+        for k in range(2):
+            top = lerp(g[iy][ix][k], g[iy][ix + 1][k], tx)
+            bottom = lerp(g[iy + 1][ix][k], g[iy + 1][ix + 1][k], tx)
+            out.append(lerp(top, bottom, ty))
+        return out[0], out[1]
+
+    def save(self, path=CALIBRATION_FILE):
+        data = {
+            "samples": self.samples,
+            "calib_offset_x": self.calib_offset_x,
+            "calib_offset_y": self.calib_offset_y,
+            "offset_x": self.offset_x,
+            "offset_y": self.offset_y,
+            "grid_size": self.GRID_SIZE,
+            "grid": self.grid,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CALIBRATION_FILE):
+        table = cls()
+        if not os.path.exists(path):
+            print(f"[Aim] No calibration file ({path}). Using gain tracking.")
+            return table
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            table.samples = data.get("samples", [])
+            table.calib_offset_x = data.get("calib_offset_x")
+            table.calib_offset_y = data.get("calib_offset_y")
+            table.offset_x = data.get("offset_x")
+            table.offset_y = data.get("offset_y")
+            if data.get("grid") and data.get("grid_size") == cls.GRID_SIZE:
+                table.grid = [[tuple(v) for v in row] for row in data["grid"]]
+            elif table.samples:
+                table.build()
+            print(f"[Aim] Calibration loaded ({len(table.samples)} samples, table {'ON' if table.ready else 'OFF'}).")
+        except Exception as e:
+            print(f"[Aim] Calibration Load Error: {e}")
+        return table
+
+
+# ---------------------------------------------------------
+# Calibration Routine
+# ---------------------------------------------------------
+
+# Start poses relative to the home pose (turret pointed at the target)
+CALIB_PAN_STEPS = (-20, -10, 0, 10, 20)
+CALIB_TILT_STEPS = (-12, -6, 0, 6, 12)
+CONVERGE_TOLERANCE = 0.01   # Image units
+CONVERGE_TIMEOUT = 5.0
+TRIM_STEP_DEGREE = 0.5
+
+
+def _detect_avg(camera, min_score, frames=5):
+    """Average target position over a few frames"""
+    xs, ys = [], []
+    for _ in range(frames):
+        found, cx, cy = camera.detect(sensor_active=False, min_score=min_score)
+        if found:
+            xs.append(cx)
+            ys.append(cy)
+    if not xs:
+        return None
+    return sum(xs) / len(xs), sum(ys) / len(ys)
+
+
+def _wait_button(joy_ctrl, servo_ctrl, camera, min_score):
+    """
+    Operator trims the turret until the water hits the target.
+    X/B: Tilt, Y/A: Pan, R: Accept, SELECT: Skip
+    """
+    while True:
+        camera.detect(sensor_active=False, min_score=min_score)
+        pan = servo_ctrl.current_pan_angle
+        tilt = servo_ctrl.current_tilt_angle
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_X): tilt += TRIM_STEP_DEGREE
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_B): tilt -= TRIM_STEP_DEGREE
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_Y): pan -= TRIM_STEP_DEGREE
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_A): pan += TRIM_STEP_DEGREE
+        if pan != servo_ctrl.current_pan_angle:
+            servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, max(0, min(180, pan)))
+        if tilt != servo_ctrl.current_tilt_angle:
+            servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, max(0, min(180, tilt)))
+
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_R):
+            return True
+        if joy_ctrl.get_button_state(joy_ctrl.BUTTON_SELECT):
+            return False
+
+
+def calibrate(camera, servo_ctrl, joy_ctrl, pump_ctrl, offset_x, offset_y, min_score=0.2):
+    """
+    [Calibration]
+    1. Aim the turret at a flame target and press R (home pose)
+    2. For every start pose around home:
+       - record where the target appears in the image
+       - track it with the normal gain loop, then trim until the water hits (pump runs)
+       - record the angle change
+    """
+    import robot_modes
+
+    table = AimTable()
+    table.calib_offset_x = offset_x
+    table.calib_offset_y = offset_y
+
+    print(">>> [CALIBRATION] Aim at the target, then press R. <<<")
+    _wait_button(joy_ctrl, servo_ctrl, camera, min_score)
+    home_pan = servo_ctrl.current_pan_angle
+    home_tilt = servo_ctrl.current_tilt_angle
+    time.sleep(0.5)
+
+    for d_tilt in CALIB_TILT_STEPS:
+        for d_pan in CALIB_PAN_STEPS:
+            start_pan = max(0, min(180, home_pan + d_pan))
+            start_tilt = max(0, min(180, home_tilt + d_tilt))
+            servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, start_pan)
+            servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, start_tilt)
+            time.sleep(0.5)
+
+            pos = _detect_avg(camera, min_score)
+            if pos is None:
+                print(f"[Aim] Pose ({start_pan:.0f}, {start_tilt:.0f}): target not visible, skipped.")
+                continue
+
+            # Closed-loop tracking with the current gains
+            deadline = time.time() + CONVERGE_TIMEOUT
+            while time.time() < deadline:
+                found, cx, cy = camera.detect(sensor_active=False, min_score=min_score)
+                if not found:
+                    continue
+                err_x = (0.5 + offset_x) - cx
+                err_y = (0.5 + offset_y) - cy
+                if abs(err_x) < CONVERGE_TOLERANCE and abs(err_y) < CONVERGE_TOLERANCE:
+                    break
+                servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, max(0, min(180, servo_ctrl.current_pan_angle + err_x * robot_modes.PAN_GAIN)))
+                servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, max(0, min(180, servo_ctrl.current_tilt_angle + err_y * robot_modes.TILT_GAIN)))
+
+            print(f"[Aim] Target at ({pos[0]:.3f}, {pos[1]:.3f}). Trim until water hits, R: accept, SELECT: skip")
+            pump_ctrl.pump_on()
+            accepted = _wait_button(joy_ctrl, servo_ctrl, camera, min_score)
+            pump_ctrl.pump_off()
+            if accepted:
+                table.add_sample(pos[0], pos[1],
+                                 servo_ctrl.current_pan_angle - start_pan,
+                                 servo_ctrl.current_tilt_angle - start_tilt)
+                print(f"[Aim] Sample {len(table.samples)} recorded.")
+            time.sleep(0.5)   # Debounce R / SELECT
+
+    if table.build():
+        table.offset_x = offset_x
+        table.offset_y = offset_y
+        table.save()
+        print(f">>> [CALIBRATION] Saved {len(table.samples)} samples to {CALIBRATION_FILE} <<<")
+    return table
+
+
+if __name__ == "__main__":
+    import motor
+    import joystick
+    import servo
+    import pump
+    import camera
+    import robot_modes
+
+    motor_ctrl = joy_ctrl = servo_ctrl = pump_ctrl = cam_ctrl = None
+    try:
+        motor_ctrl = motor.MotorController()   # Sets GPIO mode
+        joy_ctrl = joystick.JoystickController()
+        servo_ctrl = servo.ServoController()
+        pump_ctrl = pump.PumpController()
+        cam_ctrl = camera.FireCamera()
+        calibrate(cam_ctrl, servo_ctrl, joy_ctrl, pump_ctrl,
+                  robot_modes.g_offset_x, robot_modes.g_offset_y, robot_modes.AUTO_MIN_SCORE)
+    except KeyboardInterrupt:
+        print("\n>>> CALIBRATION ABORTED <<<")
+    finally:
+        if pump_ctrl: pump_ctrl.cleanup()
+        if servo_ctrl: servo_ctrl.cleanup()
+        if cam_ctrl: cam_ctrl.cleanup()
+        if motor_ctrl: motor_ctrl.cleanup()
+        if joy_ctrl: joy_ctrl.quit()
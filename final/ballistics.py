@@ -0,0 +1,252 @@
+# ballistics.py
+import argparse
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from search_planner import SearchPlanner
+
+# Calibration file lives next to the code (same as aim_calibration.json)
+BALLISTICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ballistics.json")
+
+FLAME_SIZE_M = 0.15    # Box height of the reference flame (m): pinhole range before calibration
+
+
+class BallisticModel:
+    """
+    Water arc drop -> extra vertical aim offset, by range.
+    - Range from the detection box height: range = k / h + m
+      (pinhole default from FLAME_SIZE_M and the camera VFOV, refitted by calibrate())
+    - Lead = c0 + c1*r + c2*r^2 in image units, added on top of the vertical trim
+      (g_offset_y), fitted to test shots aimed with that trim
+    - Range is clamped to the shot span: the quadratic is never extrapolated
+    """
+    MIN_SHOTS = 3
+
+    def __init__(self):
+        self.range_k = FLAME_SIZE_M / (2 * math.tan(math.radians(SearchPlanner.CAMERA_VFOV_DEG) / 2))
+        self.range_m = 0.0
+        self.coeffs = None          # c0, c1, c2
+        self.span = None            # (min range, max range) of the shots
+        self.shots = []             # [box height, range, lead]
+
+    @property
+    def ready(self):
+        return self.coeffs is not None
+
+    def estimate_range(self, box_h):
+        """Box height (fraction of the frame) -> range (m), None without a box"""
+        if not box_h or box_h <= 0:
+            return None
+        return self.range_k / box_h + self.range_m
+
+    def lead(self, box_h):
+        """Vertical aim lead (image units) for a flame with this box height, 0 if uncalibrated"""
+        if not self.ready:
+            return 0.0
+        r = self.estimate_range(box_h)
+        if r is None:
+            return 0.0
+        r = max(self.span[0], min(self.span[1], r))
+        c0, c1, c2 = self.coeffs
+        return c0 + c1 * r + c2 * r * r
+
+    def add_shot(self, box_h, range_m, lead):
+        self.shots.append([box_h, range_m, lead])
+
+    def fit(self):
+        """Refit range-from-box and the lead curve from the shots"""
+        if len(self.shots) < self.MIN_SHOTS:
+            print(f"[Ballistics] Not enough shots ({len(self.shots)}/{self.MIN_SHOTS}).")
+            return False
+        h, r, lead = (np.array(col, dtype=np.float64) for col in zip(*self.shots))
+        if np.ptp(1.0 / h) > 1e-9:
+            self.range_k, self.range_m = (float(v) for v in np.polyfit(1.0 / h, r, 1))
+        deg = min(2, len(set(r.tolist())) - 1)
+        c = np.polyfit(r, lead, deg)[::-1].tolist() if deg >= 1 else [float(lead.mean())]
+        self.coeffs = tuple(float(v) for v in c + [0.0] * (3 - len(c)))
+        self.span = (float(r.min()), float(r.max()))
+        return True
+
+    def to_dict(self):
+        return {"range_k": self.range_k, "range_m": self.range_m, "coeffs": self.coeffs,
+                "span": self.span, "shots": self.shots}
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls()
+        model.range_k = data.get("range_k", model.range_k)
+        model.range_m = data.get("range_m", model.range_m)
+        model.coeffs = tuple(data["coeffs"]) if data.get("coeffs") else None
+        model.span = tuple(data["span"]) if data.get("span") else None
+        model.shots = [list(s) for s in data.get("shots", [])]
+        return model
+
+    def save(self, path=BALLISTICS_FILE):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=BALLISTICS_FILE):
+        if not os.path.exists(path):
+            print(f"[Ballistics] No calibration file ({path}). Fixed vertical offset.")
+            return cls()
+        try:
+            with open(path) as f:
+                model = cls.from_dict(json.load(f))
+            print(f"[Ballistics] Loaded ({len(model.shots)} shots, {'ON' if model.ready else 'OFF'}).")
+            return model
+        except Exception as e:
+            print(f"[Ballistics] Load Error: {e}")
+            return cls()
+
+
+# ---------------------------------------------------------
+# Calibration Routine (test shots at known distances)
+# ---------------------------------------------------------
+
+CALIB_RANGES = (0.6, 0.9, 1.2, 1.5)   # m
+LEAD_STEP = 0.005                      # Image units per frame while Y/A is held
+BOX_FRAMES = 10
+SHOT_MAX_TIME = 10.0                   # sec per shot, then the pump stops and the shot is skipped
+CALIB_TICK = 0.05                      # sec, aiming loop period
+
+
+def _wait_choice(joy_ctrl, camera, min_score):
+    """R: go, SELECT: skip (waits for the release too)"""
+    while True:
+        camera.detect(sensor_active=False, min_score=min_score)
+        for button, choice in ((joy_ctrl.BUTTON_R, True), (joy_ctrl.BUTTON_SELECT, False)):
+            if joy_ctrl.get_button_state(button):
+                while joy_ctrl.get_button_state(button):
+                    time.sleep(0.02)
+                return choice
+
+
+def _box_height(camera, min_score):
+    """Median box height over a few frames, None if the target is not seen"""
+    heights = []
+    for _ in range(BOX_FRAMES):
+        found, _, _ = camera.detect(sensor_active=False, min_score=min_score)
+        if found and camera.last_box is not None:
+            heights.append(camera.last_box[3])
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+def calibrate(camera, servo_ctrl, joy_ctrl, pump_ctrl, offset_x, offset_y, min_score=0.2):
+    """
+    [Ballistics Calibration]
+    For every distance in CALIB_RANGES:
+    1. Put the flame target there, press R (SELECT: skip)
+    2. The box height is measured, the turret tracks the target, the pump
+       pulses like a burst (PUMP_PULSE_ON / OFF) for at most SHOT_MAX_TIME
+    3. Y/A raise / lower the aim until the water hits, R accepts
+    """
+    import robot_modes
+
+    model = BallisticModel()
+    for target_range in CALIB_RANGES:
+        print(f">>> [BALLISTICS] Target at {target_range:.1f}m, then press R (SELECT: skip) <<<")
+        if not _wait_choice(joy_ctrl, camera, min_score):
+            continue
+        box_h = _box_height(camera, min_score)
+        if box_h is None:
+            print("[Ballistics] Target not visible, skipped.")
+            continue
+
+        lead = 0.0
+        print(f"[Ballistics] Box height {box_h:.3f}. Y/A: aim up/down until the water hits, R: accept, SELECT: skip")
+        accepted = None
+        shot_start = time.monotonic()
+        try:
+            while accepted is None:
+                tick = time.monotonic()
+                elapsed = tick - shot_start
+                if elapsed > SHOT_MAX_TIME:
+                    print(f"[Ballistics] No answer within {SHOT_MAX_TIME:.0f}s, shot skipped.")
+                    break
+                period = robot_modes.PUMP_PULSE_ON + robot_modes.PUMP_PULSE_OFF
+                if elapsed % period < robot_modes.PUMP_PULSE_ON:
+                    pump_ctrl.pump_on()
+                else:
+                    pump_ctrl.pump_off()
+
+                found, cx, cy = camera.detect(sensor_active=False, min_score=min_score)
+                if joy_ctrl.get_button_state(joy_ctrl.BUTTON_Y): lead += LEAD_STEP
+                if joy_ctrl.get_button_state(joy_ctrl.BUTTON_A): lead -= LEAD_STEP
+                if found:
+                    err_x = (0.5 + offset_x) - cx
+                    err_y = (0.5 + offset_y + lead) - cy
+                    servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, max(0, min(180, servo_ctrl.current_pan_angle + err_x * robot_modes.PAN_GAIN)))
+                    servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, max(0, min(180, servo_ctrl.current_tilt_angle + err_y * robot_modes.TILT_GAIN)))
+                if joy_ctrl.get_button_state(joy_ctrl.BUTTON_R):
+                    accepted = True
+                elif joy_ctrl.get_button_state(joy_ctrl.BUTTON_SELECT):
+                    accepted = False
+                time.sleep(max(0.0, CALIB_TICK - (time.monotonic() - tick)))
+        finally:
+            pump_ctrl.pump_off()
+        if accepted:
+            model.add_shot(box_h, target_range, lead)
+            print(f"[Ballistics] Shot {len(model.shots)}: {target_range:.1f}m -> lead {lead:+.3f}")
+        time.sleep(0.5)   # Debounce R / SELECT
+
+    if model.fit():
+        model.save()
+        print(f">>> [BALLISTICS] Saved {len(model.shots)} shots to {BALLISTICS_FILE} <<<")
+        show(model)
+    return model
+
+
+def show(model):
+    if not model.ready:
+        print("[Ballistics] Not calibrated.")
+        return
+    c0, c1, c2 = model.coeffs
+    print(f"[Ballistics] range = {model.range_k:.4f} / h + {model.range_m:.3f} | "
+          f"lead = {c0:+.4f} {c1:+.4f} r {c2:+.4f} r^2 | span {model.span[0]:.2f}~{model.span[1]:.2f}m")
+    for h, r, lead in model.shots:
+        print(f"[Ballistics]   box {h:.3f}: {r:.2f}m (est. {model.estimate_range(h):.2f}m), "
+              f"lead {lead:+.3f} (fit {model.lead(h):+.3f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ballistic tilt lead calibration")
+    parser.add_argument("--show", action="store_true", help="Print the saved model and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        show(BallisticModel.load())
+        raise SystemExit(0)
+
+    import motor
+    import evdev_joystick
+    import servo
+    import pump
+    import camera
+    import robot_modes
+
+    motor_ctrl = joy_ctrl = servo_ctrl = pump_ctrl = cam_ctrl = None
+    try:
+        motor_ctrl = motor.MotorController()   # Sets GPIO mode
+        joy_ctrl = evdev_joystick.EvdevJoystick()
+        servo_ctrl = servo.ServoController()
+        pump_ctrl = pump.PumpController()
+        cam_ctrl = camera.FireCamera()
+        calibrate(cam_ctrl, servo_ctrl, joy_ctrl, pump_ctrl,
+                  robot_modes.g_offset_x, robot_modes.g_offset_y, robot_modes.AUTO_MIN_SCORE)
+    except KeyboardInterrupt:
+        print("\n>>> CALIBRATION ABORTED <<<")
+    finally:
+        if pump_ctrl: pump_ctrl.cleanup()
+        if servo_ctrl: servo_ctrl.cleanup()
+        if cam_ctrl: cam_ctrl.cleanup()
+        if joy_ctrl: joy_ctrl.quit()
+        if motor_ctrl: motor_ctrl.cleanup()
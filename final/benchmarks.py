@@ -0,0 +1,260 @@
+# benchmarks.py
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import fake_hw
+
+# Real controllers on fake GPIO / PWM (must happen before importing them)
+fake_hw.install_fake_gpio()
+
+import motor
+import servo
+import robot_modes
+import simulator
+from camera import letterbox, preprocess, decode, nms, best_index
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks_baseline.json")
+DEFAULT_THRESHOLD = 10.0   # % slower than baseline = regression
+
+
+# ---------------------------------------------------------
+# Benchmarks: setup() -> function timed per call
+# ---------------------------------------------------------
+
+def _frame(w=640, h=480):
+    return np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+def bench_letterbox():
+    frame = _frame()
+    return lambda: letterbox(frame, (320, 320))
+
+
+def bench_preprocess():
+    img, _, _ = letterbox(_frame(), (320, 320))
+    return lambda: preprocess(img)
+
+
+def bench_postprocess():
+    """decode + best box (full-frame pass of detect) on a 320 model output (4+1 x 2100)"""
+    rng = np.random.default_rng(0)
+    out = np.zeros((5, 2100), dtype=np.float32)
+    out[:4] = rng.uniform(0, 320, (4, 2100))
+    out[2:4] = rng.uniform(5, 60, (2, 2100))
+    out[4] = rng.uniform(0, 0.15, 2100)
+    out[4, :40] = rng.uniform(0.5, 0.9, 40)
+    return lambda: best_index(decode(out, 0.2))
+
+
+def bench_tile_merge():
+    """Global NMS of the tiled second pass (6 tiles x a few boxes each)"""
+    rng = np.random.default_rng(0)
+    dets = np.concatenate([rng.uniform(0, 640, (30, 2)), rng.uniform(5, 60, (30, 2)),
+                           rng.uniform(0.2, 0.9, (30, 1))], axis=1).astype(np.float32)
+    return lambda: nms(dets)
+
+
+def bench_overlay():
+    """Box + the three status texts of detect() on a 640x480 frame"""
+    frame = _frame()
+    def run():
+        cv2.rectangle(frame, (100, 100), (200, 220), (0, 0, 255), 3)
+        cv2.putText(frame, "FIRE: 0.87", (100, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv2.putText(frame, "VISION: [DETECTED] > 20%", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        cv2.putText(frame, "SENSOR: [ FIRE!!! ]", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    return run
+
+
+def _sim_devices():
+    """Flame in view, zero inference time: measures the control logic only"""
+    world = fake_hw.SimWorld([fake_hw.Flame(0.2, 1.0)])
+    clock = fake_hw.SimClock(world)
+    camera = fake_hw.SimCamera(world, clock)
+    camera.INFERENCE_TIME = camera.FRAME_AGE = 0.0
+    camera.DROPOUT = camera.FALSE_POSITIVE = 0.0
+    devices = (fake_hw.SimMotor(world), fake_hw.SimServo(world, clock, hardware_pwm=True),
+               fake_hw.SimPump(world), fake_hw.SimFireSensor(world), camera)
+    simulator.reset_modes({}, clock)
+    return clock, devices
+
+
+def bench_auto_tick():
+    clock, (motor_ctrl, servo_ctrl, pump_ctrl, sensor, camera) = _sim_devices()
+    null = fake_hw.NullDevice()
+    def run():
+        robot_modes.handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, sensor, null, camera, null)
+        clock.sleep(0.001)
+    return run
+
+
+class _Joystick(fake_hw.NullDevice):
+    """Half forward, slight turn, A (pan) held"""
+    def get_axes(self):
+        return 0.3, -0.5
+
+    def get_button_state(self, button_id):
+        return button_id == self.BUTTON_A
+
+
+def bench_manual_tick():
+    clock, (motor_ctrl, servo_ctrl, pump_ctrl, _, camera) = _sim_devices()
+    null = fake_hw.NullDevice()
+    joy = _Joystick()
+    def run():
+        if servo_ctrl.current_pan_angle >= 179:
+            servo_ctrl.current_pan_angle = 10
+        robot_modes.handle_manual_mode(joy, motor_ctrl, servo_ctrl, pump_ctrl, null, camera)
+    return run
+
+
+def bench_set_left_motor():
+    ctrl = motor.MotorController()
+    speeds = [30, -30, 0, 55]
+    state = {"i": 0}
+    def run():
+        state["i"] += 1
+        ctrl.set_left_motor(speeds[state["i"] & 3])
+    return run
+
+
+def bench_set_angle():
+    ctrl = servo.ServoController()
+    state = {"angle": 0}
+    def run():
+        state["angle"] = (state["angle"] + 7) % 180
+        ctrl.set_angle(ctrl.PAN_SERVO_PIN, state["angle"])
+    return run
+
+
+BENCHMARKS = {
+    "letterbox_640x480": bench_letterbox,
+    "preprocess_320": bench_preprocess,
+    "postprocess_320": bench_postprocess,
+    "tile_merge_nms": bench_tile_merge,
+    "overlay_640x480": bench_overlay,
+    "auto_mode_tick": bench_auto_tick,
+    "manual_mode_tick": bench_manual_tick,
+    "motor_set_left": bench_set_left_motor,
+    "servo_set_angle": bench_set_angle,
+}
+
+
+# ---------------------------------------------------------
+# Runner
+# ---------------------------------------------------------
+
+def measure(fn, rounds=9, min_round_time=0.1):
+    """Per-call time in microseconds: loop count calibrated to min_round_time, GC off (like timeit)"""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _measure(fn, rounds, min_round_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _measure(fn, rounds, min_round_time):
+    fn()
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_round_time / 4 or loops >= 1 << 20:
+            break
+        loops *= 4
+    loops = max(1, int(loops * min_round_time / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops * 1e6)
+    samples.sort()
+    return {"median_us": samples[len(samples) // 2], "min_us": samples[0], "max_us": samples[-1], "loops": loops}
+
+
+def run_all(selected=None, setups=3):
+    """Each benchmark is set up 'setups' times (fresh objects), the fastest one counts"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = min((measure(setup()) for _ in range(setups)), key=lambda r: r["min_us"])
+        print(f"{name:<20} {results[name]['median_us']:10.2f}us (min {results[name]['min_us']:.2f})")
+    return {
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Prints the table, returns the names that got slower than threshold %.
+    Compares the fastest round: it is the least disturbed by other processes.
+    """
+    if baseline.get("machine") != current.get("machine"):
+        print(f"[Bench] Warning: baseline from {baseline.get('machine')}, running on {current.get('machine')}")
+    regressions = []
+    print(f"\n{'Benchmark':<20} {'Baseline':>12} {'Current':>12} {'Change':>8}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<20} {'-':>12} {cur['min_us']:10.2f}us {'new':>8}")
+            continue
+        change = (cur["min_us"] - base["min_us"]) / base["min_us"] * 100.0
+        flag = ""
+        if change > threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  (faster)"
+        print(f"{name:<20} {base['min_us']:10.2f}us {cur['min_us']:10.2f}us {change:+7.1f}%{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vision / control micro-benchmarks (no hardware needed)")
+    parser.add_argument("command", choices=["run", "save", "compare"],
+                        help="run: print results | save: store as baseline | compare: run and check against baseline")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--out", help="Also write this run's results to a JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Regression threshold (%%)")
+    parser.add_argument("--only", nargs="+", help="Run benchmarks whose name contains one of these")
+    args = parser.parse_args()
+
+    print(">>> Micro-benchmarks (fake hardware) <<<")
+    current = run_all(args.only)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.command == "save":
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\n[Bench] Baseline saved to {args.baseline}")
+    elif args.command == "compare":
+        if not os.path.exists(args.baseline):
+            sys.exit(f"[Bench] No baseline at {args.baseline} (run 'save' first)")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n[Bench] {len(regressions)} regression(s) above {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n[Bench] No regressions above {args.threshold:.0f}%.")
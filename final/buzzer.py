@@ -1,26 +1,44 @@
 # buzzer.py
-import RPi.GPIO as GPIO
+import pwm_backend
 
 class BuzzerController:
     # Pin Definition (BCM)
     PIN_BUZZER = 16
+    FREQ = 1500
 
     def __init__(self):
-        GPIO.setup(self.PIN_BUZZER, GPIO.OUT)
-        
-
-        self.pwm = GPIO.PWM(self.PIN_BUZZER, 1500) 
+        self.pwm = pwm_backend.open_pwm(self.PIN_BUZZER, self.FREQ) 
         self.pwm.start(0) 
+        self.freq = self.FREQ
+        self.sounding = False
+        self.writes = 0 # PWM writes (for metrics)
         
         print(f"BuzzerController Initialized (Pin {self.PIN_BUZZER}, Freq: 2kHz).")
 
     def on(self):
         """Turn buzzer ON (50% Duty Cycle)"""
         self.pwm.ChangeDutyCycle(50) 
+        self.sounding = True
+        self.writes += 1
 
     def off(self):
         """Turn buzzer OFF (0% Duty Cycle)"""
         self.pwm.ChangeDutyCycle(0)
+        self.sounding = False
+        self.writes += 1
+
+    def tone(self, freq):
+        """Sound at freq Hz (0 = silent). Only what changed is written to the PWM."""
+        if freq <= 0:
+            if self.sounding:
+                self.off()
+            return
+        if freq != self.freq:
+            self.pwm.ChangeFrequency(freq)
+            self.freq = freq
+            self.writes += 1
+        if not self.sounding:
+            self.on()
 
     def cleanup(self):
         self.pwm.stop()
@@ -1,47 +1,258 @@
 # camera.py
 import cv2
+import hashlib
+import json
 import numpy as np
 import onnxruntime as ort
 import os
+import platform
+import re
 import time
 
+from detector import Detector
+from ort_tuning import load_or_tune
+from metrics import Histogram
+from resolution import ResolutionScaler
+
 # [IMPORTANT] Using Native Camera Library for RPi 5
-from picamera2 import Picamera2
-import libcamera
+try:
+    from picamera2 import Picamera2, MappedArray
+    import libcamera
+except ImportError:
+    # Offline tools (evaluate.py) only need the model stages below
+    Picamera2 = None
+
+# ---------------------------------------------------------
+# Shared Model Stages (also used by inference_server.py)
+# ---------------------------------------------------------
+
+# Optimized graphs, one per (model hash, ORT version, CPU type)
+ORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ort_cache")
+
+XNNPACK = "XnnpackExecutionProvider"
+
+# Sensor timestamps further from "now" than this are not trusted (sec)
+MAX_FRAME_AGE = 1.0
+
+def _cache_key(model_path):
+    h = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return stem, f"{stem}-{h.hexdigest()[:16]}-ort{ort.__version__}-{platform.machine()}"
+
+def _session_options(level, cpus=None, tuning=None):
+    """tuning: threading config picked by ort_tuning.py (None = ORT defaults)"""
+    so = ort.SessionOptions()
+    so.graph_optimization_level = level
+    threads = None
+    if tuning:
+        # XNNPACK runs its own pool: ORT's stays at the calling thread
+        threads = 1 if tuning["provider"] == XNNPACK else tuning["threads"]
+        so.add_session_config_entry("session.intra_op.allow_spinning", "1" if tuning["spin"] else "0")
+        if tuning["parallel"]:
+            so.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+            so.inter_op_num_threads = tuning["inter"]
+            so.add_session_config_entry("session.inter_op.allow_spinning", "1" if tuning["spin"] else "0")
+    if cpus:
+        # Calling thread + one pool thread per vision core (ORT ids are 1-based)
+        cpus = sorted(cpus)
+        threads = min(threads or len(cpus) + 1, len(cpus) + 1)
+        so.intra_op_num_threads = threads
+        if threads > 1:
+            so.add_session_config_entry("session.intra_op_thread_affinities", ";".join(str(c + 1) for c in cpus[:threads - 1]))
+    elif threads:
+        so.intra_op_num_threads = threads
+    return so
+
+def _providers(tuning=None):
+    if tuning and tuning["provider"] == XNNPACK:
+        return [(XNNPACK, {"intra_op_num_threads": str(tuning["threads"])}), "CPUExecutionProvider"]
+    return ["CPUExecutionProvider"]
+
+def create_session(model_path, use_cache=True, cpus=None, tuning=None):
+    """
+    ONNX Runtime session for the fire model (CPU).
+    The first start saves the ORT_ENABLE_ALL graph as an ORT-format model in
+    ORT_CACHE_DIR; later starts load it without optimizing again.
+    A new model file or ORT version gives a new key, stale entries are deleted.
+    cpus: pin the intra-op worker threads to these cores (see watchdog.py).
+    tuning: provider / threading from ort_tuning.py (XNNPACK graphs are not cached).
+    """
+    providers = _providers(tuning)
+    if not use_cache or providers[0] != "CPUExecutionProvider":
+        so = _session_options(ort.GraphOptimizationLevel.ORT_ENABLE_ALL, cpus, tuning)
+        return ort.InferenceSession(model_path, sess_options=so, providers=providers)
+
+    t0 = time.perf_counter()
+    stem, key = _cache_key(model_path)
+    cached = os.path.join(ORT_CACHE_DIR, key + ".ort")
+    info_path = os.path.join(ORT_CACHE_DIR, key + ".json")
+    t_hash = time.perf_counter()
+
+    if os.path.exists(cached):
+        try:
+            # Graph was optimized when it was saved
+            so = _session_options(ort.GraphOptimizationLevel.ORT_DISABLE_ALL, cpus, tuning)
+            session = ort.InferenceSession(cached, sess_options=so, providers=providers)
+            load_ms = (time.perf_counter() - t0) * 1000
+            try:
+                with open(info_path) as f:
+                    build_ms = json.load(f)["build_ms"]
+                print(f"[Camera] Cached graph loaded in {load_ms:.0f}ms (hash {(t_hash - t0) * 1000:.0f}ms) "
+                      f"vs {build_ms:.0f}ms optimizing from ONNX.")
+            except (OSError, ValueError, KeyError):
+                print(f"[Camera] Cached graph loaded in {load_ms:.0f}ms.")
+            return session
+        except Exception as e:
+            print(f"[Camera] Cached graph unusable ({e}), rebuilding.")
+            os.remove(cached)
+
+    so = _session_options(ort.GraphOptimizationLevel.ORT_ENABLE_ALL, cpus, tuning)
+    try:
+        os.makedirs(ORT_CACHE_DIR, exist_ok=True)
+        # Drop entries of older versions of this model / ORT (best-v2.onnx is another model)
+        ours = re.compile(re.escape(stem) + r"-[0-9a-f]{16}-ort")
+        for name in os.listdir(ORT_CACHE_DIR):
+            if ours.match(name) and not name.startswith((key + ".", key + "-")):
+                os.remove(os.path.join(ORT_CACHE_DIR, name))
+        so.optimized_model_filepath = cached
+        so.add_session_config_entry("session.save_model_format", "ORT")
+    except OSError as e:
+        print(f"[Camera] Graph cache unavailable: {e}")
+    session = ort.InferenceSession(model_path, sess_options=so, providers=providers)
+    build_ms = (time.perf_counter() - t0) * 1000
+    if os.path.exists(cached):
+        with open(info_path, "w") as f:
+            json.dump({"model": os.path.basename(model_path), "build_ms": build_ms}, f)
+        print(f"[Camera] Graph optimized in {build_ms:.0f}ms, cached as {os.path.basename(cached)}.")
+    return session
+
+def letterbox_params(shape, new_shape):
+    """(h, w) -> ratio, resized (w, h), (dw, dh) of letterbox() without touching pixels"""
+    r = min(new_shape[0]/shape[0], new_shape[1]/shape[1])
+    new_unpad = int(round(shape[1]*r)), int(round(shape[0]*r))
+    dw, dh = new_shape[1]-new_unpad[0], new_shape[0]-new_unpad[1]
+    return r, new_unpad, (dw/2, dh/2)
+
+def letterbox(im, new_shape):
+    """Resize keeping aspect ratio, pad to new_shape -> (img, ratio, (dw, dh))"""
+    shape = im.shape[:2]
+    r, new_unpad, (dw, dh) = letterbox_params(shape, new_shape)
+    
+    if shape[::-1] != new_unpad:
+        im = cv2.resize(im, new_unpad, interpolation=cv2.INTER_LINEAR)
+        
+    top, bottom = int(round(dh)), int(round(dh))
+    left, right = int(round(dw)), int(round(dw))
+    
+    im = cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114,114,114))
+    return im, r, (dw, dh)
+
+def preprocess(img):
+    """
+    Letterboxed frame (HxWx3 uint8, BGR) -> model input (3xHxW float32 RGB, 0~1).
+    Channel swap, layout change and scaling are one pass into the output tensor.
+    """
+    h, w = img.shape[:2]
+    out = np.empty((3, h, w), dtype=np.float32)
+    for c in range(3):
+        np.multiply(img[:, :, 2-c], np.float32(1/255.0), out=out[c])
+    return out
+
+def decode(out, min_score):
+    """One image of model output (4+C x N) -> rows [cx, cy, w, h, conf] above min_score"""
+    preds = out.T
+    conf_max = preds[:, 4:].max(1)
+    mask = conf_max > min_score
+    return np.concatenate([preds[mask, :4], conf_max[mask, None]], axis=1)
+
+def nms(dets, iou_thres=0.45):
+    """Greedy NMS on rows [cx, cy, w, h, conf]"""
+    if len(dets) == 0:
+        return dets
+    x1 = dets[:, 0] - dets[:, 2]/2
+    y1 = dets[:, 1] - dets[:, 3]/2
+    x2 = dets[:, 0] + dets[:, 2]/2
+    y2 = dets[:, 1] + dets[:, 3]/2
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-dets[:, 4])
+    keep = []
+    while len(order) > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_thres]
+    return dets[keep]
+
+def tile_origins(length, tile, overlap):
+    """Start offsets of tiles covering 'length' with at least 'overlap' shared"""
+    if length <= tile:
+        return [0]
+    count = int(np.ceil((length - tile) / (tile * (1 - overlap)))) + 1
+    return [int(round(i * (length - tile) / (count - 1))) for i in range(count)]
+
+def best_index(dets):
+    """Robot aims at the single most confident box (None = nothing found)"""
+    if len(dets) == 0:
+        return None
+    return int(np.argmax(dets[:, 4]))
 
 class FireCamera:
-    def __init__(self, model_filename="best_nano_320.onnx", width=640, height=480): #best.onnx,best_nano_320.onnx
+    def __init__(self, model_filename="best_nano_320.onnx", width=640, height=480, server_socket=None, vision_cpus=None, cascade=False, server_timeout=None): #best.onnx,best_nano_320.onnx
         print("\n>>> [SYSTEM] LOADING CAMERA CODE (ACCURACY FILTER ADDED) <<<")
         
         self.img_size = 320
         self.conf_thres = 0.5 # Default threshold
+        self.last_frame_time = None # Exposure time of the last frame (time.monotonic() seconds)
+        self.last_detection = (False, 0.5, 0.5, 0.0) # found, cx, cy, score (for telemetry)
+        self.last_box = None # cx, cy, w, h of the best box (fraction of frame width / height, no letterbox padding), None = nothing found
+        
+        # Image bytes copied per stage (capture / display should stay 0 on the zero-copy path)
+        self.copied = {"capture": 0, "display": 0, "model_input": 0}
+        self.frames = 0
+        self.detections = 0
+        
+        # Per-stage latency (seconds), read by metrics.py
+        self.latency = {stage: Histogram() for stage in ("prefilter", "inference", "tiles", "display")}
+        
+        # Tiled second pass: sensor says fire but the full frame found nothing
+        # -> run native-resolution tiles (small / distant flames)
+        self.tiled_second_pass = True
+        self.tile_overlap = 0.2
+        self.tile_passes = 0
+        self.tile_hits = 0
+        
+        # Input size ladder (dynamic-shape models only): see resolution.py
+        self.dynamic_resolution = True
+        self.scaler = None
+        
+        # Provider / threading measured on the first start, cached: see ort_tuning.py
+        self.autotune = True
+        
+        # Colour prefilter decides whether / where the CNN runs: see detector.py
+        self.detector = Detector() if cascade else None
         
         # 1. Automatic Path Detection
         current_dir = os.path.dirname(os.path.abspath(__file__))
         model_path = os.path.join(current_dir, model_filename)
         
-        # 2. Load AI Model
-        self.session = None
-        if os.path.exists(model_path):
-            try:
-                print(f"[Camera] Loading AI Model from: {model_path}")
-                so = ort.SessionOptions()
-                so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-                self.session = ort.InferenceSession(model_path, sess_options=so, providers=["CPUExecutionProvider"])
-                self.input_name = self.session.get_inputs()[0].name
-                self.output_name = self.session.get_outputs()[0].name
-                print("[Camera] Model loaded successfully.")
-            except Exception as e:
-                print(f"[Camera] Model Load Error: {e}")
-                self.session = None
-        else:
-            print(f"[Camera] Error: Model file not found at {model_path}")
-
-        # 3. Initialize Picamera2 (RPi 5 Native)
+        # 2. Initialize Picamera2 (RPi 5 Native)
+        # (before the model: ORT tuning measures on live frames)
         print("[Camera] Initializing Picamera2...")
         try:
+            if Picamera2 is None:
+                raise RuntimeError("picamera2 is not installed")
             self.picam2 = Picamera2()
             
+            # "RGB888" is B,G,R in memory: OpenCV displays it as is,
+            # preprocess() swaps to RGB while building the tensor
             cfg = self.picam2.create_video_configuration(
                 main={"size": (width, height), "format": "RGB888"},
                 transform=libcamera.Transform(hflip=True, vflip=True)
@@ -54,69 +265,228 @@ class FireCamera:
             print(f"[Camera] Hardware Init Error: {e}")
             self.picam2 = None
 
+        # 3. Load AI Model (or connect to a shared inference server)
+        self.session = None
+        self.client = None
+        if server_socket:
+            try:
+                from inference_server import InferenceClient
+                print(f"[Camera] Connecting to Inference Server: {server_socket}")
+                self.client = InferenceClient(server_socket, server_timeout)
+                print("[Camera] Inference Server connected.")
+            except Exception as e:
+                print(f"[Camera] Inference Server Error: {e} (falling back to the local model)")
+                self.client = None
+        if self.client is None and os.path.exists(model_path):
+            try:
+                print(f"[Camera] Loading AI Model from: {model_path}")
+                tuning = load_or_tune(model_path, vision_cpus, self.img_size, frames=self._tuning_frames) if self.autotune else None
+                self.session = create_session(model_path, cpus=vision_cpus, tuning=tuning)
+                self.input_name = self.session.get_inputs()[0].name
+                self.output_name = self.session.get_outputs()[0].name
+                print("[Camera] Model loaded successfully.")
+                if self.dynamic_resolution:
+                    if isinstance(self.session.get_inputs()[0].shape[2], int):
+                        print("[Camera] Model input size is fixed: resolution ladder disabled.")
+                    else:
+                        self.scaler = ResolutionScaler(self.img_size)
+                        print(f"[Camera] Dynamic input size, ladder {self.scaler.LADDER}.")
+            except Exception as e:
+                print(f"[Camera] Model Load Error: {e}")
+                self.session = None
+        elif self.client is None:
+            print(f"[Camera] Error: Model file not found at {model_path}")
+
+    def _tuning_frames(self, count=8):
+        """A few live frames for ORT tuning (empty without a camera: synthetic frames then)"""
+        if self.picam2 is None:
+            return []
+        return [self.read() for _ in range(count)]
+
     def _letterbox(self, im, new_shape):
-        shape = im.shape[:2]
-        r = min(new_shape[0]/shape[0], new_shape[1]/shape[1])
-        new_unpad = int(round(shape[1]*r)), int(round(shape[0]*r))
-        dw, dh = new_shape[1]-new_unpad[0], new_shape[0]-new_unpad[1]
-        dw, dh = dw/2, dh/2
-        
-        if shape[::-1] != new_unpad:
-            im = cv2.resize(im, new_unpad, interpolation=cv2.INTER_LINEAR)
-            
-        top, bottom = int(round(dh)), int(round(dh))
-        left, right = int(round(dw)), int(round(dw))
-        
-        im = cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114,114,114))
-        return im, r, (dw, dh)
+        return letterbox(im, new_shape)
+
+    def _detect_tiles(self, frame, min_score, ratio, dw, dh):
+        """
+        Second pass on img_size x img_size crops of the native frame (no downscaling).
+        All tiles go into one session.run, results are merged with global NMS
+        and returned in letterbox coordinates, like the full-frame pass.
+        """
+        h, w = frame.shape[:2]
+        size = self.img_size
+        if h < size or w < size:
+            return np.zeros((0, 5), dtype=np.float32)
+
+        origins = [(x, y) for y in tile_origins(h, size, self.tile_overlap)
+                          for x in tile_origins(w, size, self.tile_overlap)]
+        tiles = [frame[y:y+size, x:x+size] for x, y in origins]
+
+        if self.client is not None:
+            per_tile = [self.client.infer(t, min_score) for t in tiles]
+        else:
+            batch = np.stack([preprocess(t) for t in tiles])
+            self.copied["model_input"] += 2 * batch.nbytes
+            if isinstance(self.session.get_inputs()[0].shape[0], int):
+                # Fixed batch-1 model: same work, one run per tile
+                out = np.concatenate([self.session.run([self.output_name], {self.input_name: b[None,...]})[0] for b in batch])
+            else:
+                out = self.session.run([self.output_name], {self.input_name: batch})[0]
+            per_tile = [decode(o, min_score) for o in out]
+
+        merged = []
+        for (x, y), d in zip(origins, per_tile):
+            if len(d):
+                d = d.copy()
+                d[:, 0] += x
+                d[:, 1] += y
+                merged.append(d)
+        self.tile_passes += 1
+        if not merged:
+            return np.zeros((0, 5), dtype=np.float32)
+        self.tile_hits += 1
+
+        dets = nms(np.concatenate(merged))
+        # Native frame -> letterbox coordinates
+        dets[:, :4] *= ratio
+        dets[:, 0] += dw
+        dets[:, 1] += dh
+        return dets
+
+    def _infer(self, img, min_score):
+        """One letterboxed image -> dets in its own letterbox coordinates"""
+        if self.client is not None:
+            return self.client.infer(img, min_score)
+        img_input = preprocess(img)[None,...]
+        self.copied["model_input"] += img_input.nbytes
+        out = self.session.run([self.output_name], {self.input_name: img_input})[0]
+        return decode(out[0], min_score)
+
+    def _detect_region(self, frame, roi, min_score, ratio, dw, dh):
+        """CNN on the prefilter's region only, boxes mapped to full-frame letterbox coordinates"""
+        x0, y0, x1, y1 = roi
+        img, r, (rdw, rdh) = self._letterbox(frame[y0:y1, x0:x1], (self.img_size, self.img_size))
+        self.copied["model_input"] += img.nbytes
+        dets = self._infer(img, min_score)
+        if len(dets):
+            dets = dets.copy()
+            dets[:, 0] = ((dets[:, 0] - rdw) / r + x0) * ratio + dw
+            dets[:, 1] = ((dets[:, 1] - rdh) / r + y0) * ratio + dh
+            dets[:, 2:4] *= ratio / r
+        return dets
+
+    def _stamp(self, metadata):
+        """
+        Remember when the frame was exposed, in time.monotonic() seconds.
+        libcamera stamps SensorTimestamp (ns) with CLOCK_BOOTTIME, which runs ahead
+        of CLOCK_MONOTONIC by the time spent in suspend: convert with the current gap.
+        """
+        now = time.monotonic()
+        sensor_ts = metadata.get("SensorTimestamp")
+        self.last_frame_time = now
+        if sensor_ts:
+            boot_offset = time.clock_gettime(time.CLOCK_BOOTTIME) - now
+            # Middle of the exposure (ExposureTime is in microseconds)
+            exposure = sensor_ts / 1e9 - boot_offset + metadata.get("ExposureTime", 0) / 2e6
+            if now - MAX_FRAME_AGE <= exposure <= now:
+                self.last_frame_time = exposure
 
     def read(self):
+        """Capture one frame as a copy (for callers that keep it; detect() does not copy)"""
         if self.picam2:
-            return self.picam2.capture_array("main")
+            request = self.picam2.capture_request()
+            try:
+                frame = request.make_array("main")
+                self._stamp(request.get_metadata())
+            finally:
+                request.release()
+            self.copied["capture"] += frame.nbytes
+            return frame
         return None
 
     def detect(self, sensor_active=False, min_score=0.5):
         """
         [Updated] Now supports 'min_score' to filter weak detections.
+        Works on a view of the camera's DMA buffer, released as soon as the frame is shown.
         """
-        if self.session is None or self.picam2 is None:
+        self.last_frame_time = None
+        self.last_detection = (False, 0.5, 0.5, 0.0)
+        self.last_box = None
+        if (self.session is None and self.client is None) or self.picam2 is None:
             return False, 0.5, 0.5
 
         try:
-            frame_rgb = self.read() 
-            if frame_rgb is None: return False, 0.5, 0.5
+            request = self.picam2.capture_request()
         except:
             return False, 0.5, 0.5
+        try:
+            self._stamp(request.get_metadata())
+            with MappedArray(request, "main") as mapped:
+                return self._process(mapped.array, sensor_active, min_score)
+        finally:
+            request.release()
 
-        # Preprocessing
-        img, ratio, (dw, dh) = self._letterbox(frame_rgb, (self.img_size, self.img_size))
-        img_input = cv2.cvtColor(img, cv2.COLOR_RGB2BGR).astype(np.float32)/255.0
-        img_input = np.transpose(img_input, (2,0,1))[None,...]
+    def _process(self, frame, sensor_active, min_score):
+        """Detection + display on one BGR frame (may be the mapped camera buffer: no copies of it)"""
+        self.frames += 1
+
+        # Cascade: nothing flame-coloured -> no CNN (sensor alarm always runs it)
+        run_cnn, roi = True, None
+        if self.detector is not None:
+            t_check = time.perf_counter()
+            run_cnn, roi = self.detector.check(frame, force=sensor_active, min_size=self.img_size)
+            self.latency["prefilter"].observe(time.perf_counter() - t_check)
+        ratio, _, (dw, dh) = letterbox_params(frame.shape[:2], (self.img_size, self.img_size))
 
         # Inference
-        out = self.session.run([self.output_name], {self.input_name: img_input})[0]
-        preds = np.squeeze(out, 0).T
-        boxes = preds[:, :4]
-        scores = preds[:, 4:]
-        conf_max = scores.max(1)
-        
         # [CORE LOGIC] Use the dynamic min_score provided by Robot Modes
-        mask = conf_max > min_score
-        
-        boxes = boxes[mask]
-        conf_max = conf_max[mask]
+        t_infer = time.perf_counter()
+        try:
+            if not run_cnn:
+                dets = np.zeros((0, 5), dtype=np.float32)
+            elif roi is not None:
+                dets = self._detect_region(frame, roi, min_score, ratio, dw, dh)
+            else:
+                img, ratio, (dw, dh) = self._letterbox(frame, (self.img_size, self.img_size))
+                self.copied["model_input"] += img.nbytes
+                dets = self._infer(img, min_score)
+        except Exception as e:
+            if self.client is None:
+                raise
+            print(f"[Camera] Inference Server Error: {e}")
+            return False, 0.5, 0.5
+        infer_ms = (time.perf_counter() - t_infer) * 1000
+        if run_cnn:
+            self.latency["inference"].observe(infer_ms / 1000)
 
+        if len(dets) == 0 and run_cnn and sensor_active and self.tiled_second_pass:
+            t_tiles = time.perf_counter()
+            try:
+                dets = self._detect_tiles(frame, min_score, ratio, dw, dh)
+            except Exception as e:
+                print(f"[Camera] Tile Pass Error: {e}")
+            self.latency["tiles"].observe(time.perf_counter() - t_tiles)
+        if self.detector is not None:
+            self.detector.feedback(len(dets) > 0)
         found = False
         cx, cy = 0.5, 0.5
 
-        display_frame = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
+        # Overlay is drawn straight into the camera buffer (already BGR)
+        t_display = time.perf_counter()
+        display_frame = frame
+
+        score = 0.0
 
-        if len(boxes) > 0:
-            best_idx = np.argmax(conf_max)
-            bx, by, bw, bh = boxes[best_idx]
+        best_idx = best_index(dets)
+        if best_idx is not None:
+            bx, by, bw, bh, score = dets[best_idx]
             cx = bx/self.img_size
             cy = by/self.img_size
+            score = float(score)
             found = True
+            self.detections += 1
+            # Box size drives range (approach, ballistics): frame units, like the camera FOV
+            frame_h, frame_w = frame.shape[:2]
+            self.last_box = ((bx - dw)/ratio/frame_w, (by - dh)/ratio/frame_h, bw/ratio/frame_w, bh/ratio/frame_h)
             
             x1 = int((bx - bw/2 - dw)/ratio)
             y1 = int((by - bh/2 - dh)/ratio)
@@ -125,7 +495,7 @@ class FireCamera:
             
             cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0,0,255), 3)
             # Show score on screen
-            cv2.putText(display_frame, f"FIRE: {conf_max[best_idx]:.2f}", (x1,y1-10),
+            cv2.putText(display_frame, f"FIRE: {score:.2f}", (x1,y1-10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
 
         # UI Overlay
@@ -139,10 +509,25 @@ class FireCamera:
 
         cv2.imshow("Robot Vision", display_frame)
         cv2.waitKey(1)
+        self.latency["display"].observe(time.perf_counter() - t_display)
         
+        self.last_detection = (found, cx, cy, score)
+        if self.scaler is not None and run_cnn and roi is None:
+            # Size for the next frame (cx, cy above are already normalized)
+            self.img_size = self.scaler.update(infer_ms, found)
         return found, cx, cy
 
     def cleanup(self):
+        if self.tile_passes:
+            print(f"[Camera] Tile pass: {self.tile_passes} runs, {self.tile_hits} found a flame.")
+        if self.scaler is not None:
+            self.scaler.report()
+        if self.detector is not None:
+            self.detector.report()
+        if self.frames:
+            per_frame = {k: v // self.frames for k, v in self.copied.items()}
+            print(f"[Camera] Bytes copied per frame: {sum(per_frame.values())} "
+                  f"(capture {per_frame['capture']}, display {per_frame['display']}, model input {per_frame['model_input']})")
         if self.picam2:
             self.picam2.stop()
             self.picam2.close()
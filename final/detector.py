@@ -0,0 +1,207 @@
+# detector.py
+import argparse
+import glob
+import os
+import time
+
+import cv2
+
+
+class Detector:
+    """
+    Cascade in front of the CNN.
+    1. Colour prefilter at PREFILTER_WIDTH: flame-hue HSV mask + over-exposed cores,
+       connected components drop specks smaller than MIN_AREA
+    2. No blob -> skip the CNN, blobs in a small area -> CNN on that region only
+    3. Recall guards: CNN every EVERY_NTH frame anyway, for HOLD_FRAMES after a detection,
+       and whenever the caller forces it (flame sensor active)
+    Frames are BGR (Picamera2 RGB888 / OpenCV).
+    """
+    PREFILTER_WIDTH = 160
+    HUE_RANGES = ((0, 35), (165, 180))   # OpenCV hue (0~180): red, orange, yellow
+    SAT_MIN = 80
+    VAL_MIN = 140
+    CORE_VAL_MIN = 245                   # Flame cores clip to white: any hue / saturation
+    MIN_AREA = 4                         # px at prefilter resolution
+
+    EVERY_NTH = 10
+    HOLD_FRAMES = 5
+
+    ROI_MARGIN = 0.5                     # Grow the blob box by this share on every side
+    ROI_MAX_AREA = 0.6                   # Bigger regions -> full frame
+
+    def __init__(self, every_nth=None, use_roi=True):
+        if every_nth is not None:
+            self.EVERY_NTH = every_nth
+        self.use_roi = use_roi
+        self.hold = 0
+        self.frames = 0
+        self.skipped = 0
+        self.roi_runs = 0
+        self.guard_runs = 0
+        self.prefilter_time = 0.0
+
+    def prefilter(self, frame):
+        """BGR frame -> list of blob boxes (x0, y0, x1, y1) in frame pixels"""
+        h, w = frame.shape[:2]
+        scale = self.PREFILTER_WIDTH / w
+        small = cv2.resize(frame, (self.PREFILTER_WIDTH, max(1, int(round(h * scale)))),
+                           interpolation=cv2.INTER_NEAREST)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, (0, 0, self.CORE_VAL_MIN), (180, 255, 255))
+        for lo, hi in self.HUE_RANGES:
+            mask |= cv2.inRange(hsv, (lo, self.SAT_MIN, self.VAL_MIN), (hi, 255, 255))
+
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        boxes = []
+        for x, y, bw, bh, area in stats[1:count]:
+            if area >= self.MIN_AREA:
+                boxes.append((x / scale, y / scale, (x + bw) / scale, (y + bh) / scale))
+        return boxes
+
+    def _roi(self, boxes, frame_w, frame_h, min_size):
+        """Union of the blobs plus margin, at least min_size (no upscaling in the CNN)"""
+        x0 = min(b[0] for b in boxes)
+        y0 = min(b[1] for b in boxes)
+        x1 = max(b[2] for b in boxes)
+        y1 = max(b[3] for b in boxes)
+        mx = (x1 - x0) * self.ROI_MARGIN
+        my = (y1 - y0) * self.ROI_MARGIN
+        x0, y0, x1, y1 = x0 - mx, y0 - my, x1 + mx, y1 + my
+
+        # Grow around the center to min_size, then shift back inside the frame
+        roi = []
+        for lo, hi, limit in ((x0, x1, frame_w), (y0, y1, frame_h)):
+            size = min(limit, max(hi - lo, min_size))
+            center = (lo + hi) / 2
+            start = int(round(min(max(center - size / 2, 0), limit - size)))
+            roi.append((start, start + int(size)))
+        (x0, x1), (y0, y1) = roi
+        if (x1 - x0) * (y1 - y0) > self.ROI_MAX_AREA * frame_w * frame_h:
+            return None
+        return x0, y0, x1, y1
+
+    def check(self, frame, force=False, min_size=320):
+        """
+        -> (run_cnn, roi). roi = (x0, y0, x1, y1) to run the CNN on, None = full frame.
+        force: run on the full frame (e.g. flame sensor active)
+        """
+        self.frames += 1
+        t0 = time.perf_counter()
+        boxes = self.prefilter(frame)
+        self.prefilter_time += time.perf_counter() - t0
+
+        guard = force or self.hold > 0 or (self.EVERY_NTH and self.frames % self.EVERY_NTH == 0)
+        if guard:
+            if not boxes:
+                self.guard_runs += 1
+            return True, None
+        if not boxes:
+            self.skipped += 1
+            return False, None
+        if not self.use_roi:
+            return True, None
+        h, w = frame.shape[:2]
+        roi = self._roi(boxes, w, h, min_size)
+        if roi is not None:
+            self.roi_runs += 1
+        return True, roi
+
+    def feedback(self, found):
+        """Result of the CNN for this frame (keeps it running while a flame is tracked)"""
+        if found:
+            self.hold = self.HOLD_FRAMES
+        elif self.hold > 0:
+            self.hold -= 1
+
+    @property
+    def skip_rate(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def report(self):
+        if not self.frames:
+            return
+        print(f"[Detector] Frames {self.frames} | CNN skipped {self.skip_rate * 100:.1f}% | "
+              f"region runs {self.roi_runs} | guard runs {self.guard_runs} | "
+              f"prefilter {self.prefilter_time / self.frames * 1000:.3f}ms/frame")
+
+
+# ---------------------------------------------------------
+# Recall Check on Recorded Footage (CNN on every frame = reference)
+# ---------------------------------------------------------
+
+def _frames(source):
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, "*"))):
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield frame
+        return
+    cap = cv2.VideoCapture(source)
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        yield frame
+    cap.release()
+
+
+def measure_recall(source, model_path, img_size, min_score, every_nth):
+    from camera import create_session, letterbox, preprocess, decode
+
+    session = create_session(model_path)
+    input_name = session.get_inputs()[0].name
+    fixed = session.get_inputs()[0].shape[2]
+    if isinstance(fixed, int):
+        img_size = fixed
+
+    def cnn(image):
+        img, _, _ = letterbox(image, (img_size, img_size))
+        out = session.run(None, {input_name: preprocess(img)[None, ...]})[0]
+        return len(decode(out[0], min_score)) > 0
+
+    det = Detector(every_nth=every_nth)
+    positives = missed = 0
+    cnn_time = 0.0
+    for frame in _frames(source):
+        t0 = time.perf_counter()
+        reference = cnn(frame)
+        cnn_time += time.perf_counter() - t0
+
+        run, roi = det.check(frame, min_size=img_size)
+        if run and roi is not None:
+            x0, y0, x1, y1 = roi
+            found = cnn(frame[y0:y1, x0:x1])
+        elif run:
+            found = reference
+        else:
+            found = False
+        det.feedback(found)
+
+        if reference:
+            positives += 1
+            if not found:
+                missed += 1
+
+    det.report()
+    if det.frames:
+        print(f"[Detector] CNN {cnn_time / det.frames * 1000:.1f}ms/frame | "
+              f"frames with fire (full CNN): {positives} | missed by cascade: {missed} "
+              f"(recall loss {missed / positives * 100 if positives else 0.0:.1f}%)")
+    return det, positives, missed
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Cascade prefilter: skip rate and recall loss on recorded footage")
+    parser.add_argument("source", help="Video file or image folder (BGR frames)")
+    parser.add_argument("--model", default=os.path.join(here, "best_nano_320.onnx"))
+    parser.add_argument("--size", type=int, default=320)
+    parser.add_argument("--min-score", type=float, default=0.2)
+    parser.add_argument("--every-nth", type=int, nargs="+", default=[Detector.EVERY_NTH],
+                        help="Recall guard values to compare (0 = off)")
+    args = parser.parse_args()
+
+    for n in args.every_nth:
+        print(f"\n--- every_nth = {n} ---")
+        measure_recall(args.source, args.model, args.size, args.min_score, n)
@@ -0,0 +1,152 @@
+# effects.py
+import threading
+import time
+
+# --- Colors (r, g, b) ---
+OFF = (0, 0, 0)
+RED = (1, 0, 0)
+GREEN = (0, 1, 0)
+BLUE = (0, 0, 1)
+YELLOW = (1, 1, 0)
+
+
+class Effect:
+    """
+    Declarative indicator pattern, one track per channel:
+    - led:  [(seconds, (r, g, b)), ...]
+    - tone: [(seconds, Hz), ...]   0 Hz = silent
+    A track loops; a step of None seconds holds for good. No track = channel not used.
+    once: plays a single time over the current effect (jingles, chirps), which then resumes.
+    """
+    def __init__(self, name, led=None, tone=None, once=False):
+        self.name = name
+        self.led = led
+        self.tone = tone
+        self.once = once
+
+    def __repr__(self):
+        return f"Effect({self.name})"
+
+
+def sweep(start_hz, end_hz, seconds, steps=15):
+    """Tone track gliding from start_hz to end_hz in equal steps"""
+    return [(seconds / steps, start_hz + (end_hz - start_hz) * i / (steps - 1)) for i in range(steps)]
+
+
+def _track_at(track, t, loop):
+    """-> (value at t seconds into the track, seconds until the next step). (None, None) = track done"""
+    if loop and all(d is not None for d, _ in track):
+        t %= sum(d for d, _ in track)
+    for duration, value in track:
+        if duration is None:
+            return value, None
+        if t < duration:
+            return value, duration - t
+        t -= duration
+    return None, None
+
+
+# --- Effects used by robot_modes ---
+IDLE_MANUAL = Effect("manual", led=[(None, BLUE)], tone=[(None, 0)])
+IDLE_AUTO = Effect("auto", led=[(None, GREEN)], tone=[(None, 0)])
+# Chirp once when a flame is picked up, then quiet yellow
+TRACKING = Effect("tracking", led=[(None, YELLOW)], tone=[(0.06, 2400), (None, 0)])
+# Fire truck: fast red blink + siren sweeping the buzzer frequency
+FIRE_ALARM = Effect("fire", led=[(0.1, RED), (0.1, OFF)],
+                    tone=sweep(1200, 2400, 0.6) + sweep(2400, 1200, 0.6))
+
+# Mode switch: three notes down (manual) / up (auto)
+JINGLE_MANUAL = Effect("to manual", led=[(0.3, BLUE)], once=True,
+                       tone=[(0.08, 1568), (0.02, 0), (0.08, 1319), (0.02, 0), (0.12, 1047)])
+JINGLE_AUTO = Effect("to auto", led=[(0.3, GREEN)], once=True,
+                     tone=[(0.08, 1047), (0.02, 0), (0.08, 1319), (0.02, 0), (0.12, 1568)])
+
+
+class EffectsEngine:
+    """
+    Plays Effects on RGBController + BuzzerController from its own timer thread.
+    - play(effect) from the loop: same looping effect again = no-op, so it can be called every tick
+    - The thread sleeps until the next step of a track (or a new play()), not a fixed tick
+    - LED / buzzer are written only when the value changes
+    - Blink and siren keep their timing when the control loop stalls
+    """
+    def __init__(self, rgb_ctrl, buzz_ctrl):
+        self.rgb_ctrl = rgb_ctrl
+        self.buzz_ctrl = buzz_ctrl
+        self.cond = threading.Condition()
+        self.base = None
+        self.base_start = 0.0
+        self.overlay = None
+        self.overlay_start = 0.0
+
+        self.color = None
+        self.freq = None
+        self.writes = 0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def play(self, effect):
+        with self.cond:
+            now = time.monotonic()
+            if effect.once:
+                self.overlay, self.overlay_start = effect, now
+            elif effect is self.base:
+                return
+            else:
+                self.base, self.base_start = effect, now
+            self.cond.notify()
+
+    def _channel(self, name, now, waits):
+        """Overlay value if it has one, else the base effect's. Appends the times to the next steps."""
+        value = None
+        for effect, start, loop in ((self.overlay, self.overlay_start, False), (self.base, self.base_start, True)):
+            track = getattr(effect, name) if effect is not None else None
+            if track is None:
+                continue
+            step_value, wait = _track_at(track, now - start, loop)
+            if wait is not None:
+                waits.append(wait)
+            if value is None:
+                value = step_value
+        return value
+
+    def _run(self):
+        with self.cond:
+            while self.running:
+                now = time.monotonic()
+                if self.overlay is not None:
+                    t = now - self.overlay_start
+                    if all(track is None or _track_at(track, t, False)[0] is None
+                           for track in (self.overlay.led, self.overlay.tone)):
+                        self.overlay = None
+
+                waits = []
+                color = self._channel("led", now, waits)
+                freq = self._channel("tone", now, waits)
+                self._write(OFF if color is None else color, 0 if freq is None else freq)
+                self.cond.wait(timeout=min(waits) if waits else None)
+
+    def _write(self, color, freq):
+        if color != self.color:
+            self.color = color
+            self.writes += 1
+            try:
+                self.rgb_ctrl.set_color(*color)
+            except Exception as e:
+                print(f"[Effects] LED Error: {e}")
+        if freq != self.freq:
+            self.freq = freq
+            self.writes += 1
+            try:
+                self.buzz_ctrl.tone(freq)
+            except Exception as e:
+                print(f"[Effects] Buzzer Error: {e}")
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout=1.0)
+        self._write(OFF, 0)
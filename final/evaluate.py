@@ -0,0 +1,218 @@
+# evaluate.py
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Same stages as FireCamera.detect
+from camera import create_session, letterbox, preprocess, decode, best_index
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_dataset(image_dir, label_dir=None):
+    """
+    YOLO txt layout: images/xxx.jpg + labels/xxx.txt ("class cx cy w h", normalized).
+    Missing label file = image without fire.
+    """
+    if label_dir is None:
+        label_dir = os.path.join(os.path.dirname(os.path.normpath(image_dir)), "labels")
+    items = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "*"))):
+        if not path.lower().endswith(IMAGE_EXTS):
+            continue
+        label_path = os.path.join(label_dir, os.path.splitext(os.path.basename(path))[0] + ".txt")
+        boxes = []
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 5:
+                        boxes.append([float(v) for v in parts[1:5]])
+        items.append((path, boxes))
+    return items
+
+
+class ModelRunner:
+    """One model at one input size, batched when the model allows it"""
+    def __init__(self, model_path, img_size):
+        self.session = create_session(model_path)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+        self.img_size = img_size
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        fixed = model_input.shape[2]
+        self.supported = not isinstance(fixed, int) or fixed == img_size
+        self.fixed_size = fixed
+
+    def run(self, items):
+        """items -> list of (best_conf, best_center, latency_sec) per image"""
+        t0 = time.perf_counter()
+        prepared = []
+        for path, _ in items:
+            frame = cv2.imread(path)
+            img, ratio, (dw, dh) = letterbox(frame, (self.img_size, self.img_size))
+            prepared.append((preprocess(img), ratio, dw, dh, frame.shape[1], frame.shape[0]))
+        t_pre = time.perf_counter()
+
+        inputs = np.stack([p[0] for p in prepared])
+        if self.dynamic_batch:
+            out = self.session.run([self.output_name], {self.input_name: inputs})[0]
+        else:
+            out = np.concatenate([self.session.run([self.output_name], {self.input_name: x[None, ...]})[0]
+                                  for x in inputs])
+        t_infer = time.perf_counter()
+
+        results = []
+        for i, (_, ratio, dw, dh, w, h) in enumerate(prepared):
+            # min_score=0: the best box does not depend on the threshold
+            dets = decode(out[i], 0.0)
+            idx = best_index(dets)
+            if idx is None:
+                results.append((0.0, None))
+                continue
+            bx, by, _, _, conf = dets[idx]
+            results.append((float(conf), ((bx - dw) / ratio / w, (by - dh) / ratio / h)))
+        t_post = time.perf_counter()
+
+        per_image = (t_post - t0) / len(items)
+        return [(conf, center, per_image, (t_pre - t0) / len(items), (t_infer - t_pre) / len(items),
+                 (t_post - t_infer) / len(items)) for conf, center in results]
+
+
+def _hit(center, boxes):
+    """The robot aims at the box center, so a hit = center inside a labeled flame"""
+    if center is None:
+        return False
+    x, y = center
+    return any(abs(x - bx) <= bw / 2 and abs(y - by) <= bh / 2 for bx, by, bw, bh in boxes)
+
+
+def pr_curve(records, thresholds):
+    """
+    Image-level PR, as the robot uses it:
+    TP = best box above threshold and on a flame, FP = above threshold but not on a flame,
+    FN = labeled flame but no correct best box.
+    """
+    curve = []
+    positives = sum(1 for r in records if r["boxes"])
+    for t in thresholds:
+        tp = fp = 0
+        for r in records:
+            if r["conf"] > t:
+                if _hit(r["center"], r["boxes"]):
+                    tp += 1
+                else:
+                    fp += 1
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / positives if positives else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        curve.append({"threshold": round(t, 3), "precision": precision, "recall": recall, "f1": f1,
+                      "tp": tp, "fp": fp, "fn": positives - tp})
+    return curve
+
+
+def operating_points(curve, min_precisions):
+    best_f1 = max(curve, key=lambda c: c["f1"])
+    points = {"best_f1": best_f1}
+    for p in min_precisions:
+        ok = [c for c in curve if c["precision"] >= p and c["tp"] > 0]
+        points[f"precision>={p}"] = max(ok, key=lambda c: (c["recall"], -c["threshold"])) if ok else None
+    return points
+
+
+def evaluate(model_path, img_size, items, batch, workers, latency_images):
+    runner = ModelRunner(model_path, img_size)
+    if not runner.supported:
+        print(f"[Eval] {os.path.basename(model_path)} @ {img_size}: skipped (model input fixed at {runner.fixed_size})")
+        return None
+    if not runner.dynamic_batch and batch > 1:
+        print(f"[Eval] {os.path.basename(model_path)}: fixed batch size, frames run one by one inside each batch")
+
+    chunks = [items[i:i + batch] for i in range(0, len(items), batch)]
+    # ONNX Runtime releases the GIL, so batches run in parallel threads
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outputs = list(pool.map(runner.run, chunks))
+    throughput = len(items) / (time.perf_counter() - t0)
+
+    records = []
+    for chunk, out in zip(chunks, outputs):
+        for (path, boxes), (conf, center, *_) in zip(chunk, out):
+            records.append({"image": path, "boxes": boxes, "conf": conf, "center": center})
+
+    # Batched times say nothing about one frame: time it the way the robot runs it,
+    # one image per session.run and nothing else in flight
+    latency = {"total": [], "pre": [], "infer": [], "post": []}
+    for item in items[:max(1, latency_images)]:
+        (_, _, total, pre, infer, post), = runner.run([item])
+        latency["total"].append(total)
+        latency["pre"].append(pre)
+        latency["infer"].append(infer)
+        latency["post"].append(post)
+    return records, latency, throughput
+
+
+def _ms(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Offline accuracy / latency evaluation of fire models")
+    parser.add_argument("--images", required=True, help="Image folder")
+    parser.add_argument("--labels", help="YOLO label folder (default: ../labels next to --images)")
+    parser.add_argument("--models", nargs="+", default=[os.path.join(here, "best_nano_320.onnx"), os.path.join(here, "best.onnx")])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[320])
+    parser.add_argument("--batch", type=int, default=8, help="Images per session.run in the accuracy / throughput pass")
+    parser.add_argument("--workers", type=int, default=2, help="Parallel batches in the accuracy / throughput pass")
+    parser.add_argument("--latency-images", type=int, default=100, help="Images timed one by one for latency")
+    parser.add_argument("--min-precision", nargs="+", type=float, default=[0.8, 0.9, 0.95])
+    parser.add_argument("--json", help="Write curves and operating points to this file")
+    args = parser.parse_args()
+
+    items = load_dataset(args.images, args.labels)
+    print(f"[Eval] {len(items)} images, {sum(1 for _, b in items if b)} with fire")
+    thresholds = [i / 100.0 for i in range(5, 100, 5)]
+
+    report = []
+    for model_path in args.models:
+        if not os.path.exists(model_path):
+            print(f"[Eval] Model not found: {model_path}")
+            continue
+        for size in args.sizes:
+            result = evaluate(model_path, size, items, args.batch, args.workers, args.latency_images)
+            if result is None:
+                continue
+            records, latency, throughput = result
+            curve = pr_curve(records, thresholds)
+            points = operating_points(curve, args.min_precision)
+
+            name = f"{os.path.basename(model_path)} @ {size}"
+            print(f"\n=== {name} ===")
+            print(f"Throughput: {throughput:.1f} img/s (batch {args.batch}, {args.workers} workers)")
+            print(f"Latency (batch 1, {len(latency['total'])} images): p50 {_ms(latency['total'], 0.5):.1f}ms p95 {_ms(latency['total'], 0.95):.1f}ms "
+                  f"(pre {_ms(latency['pre'], 0.5):.1f} / infer {_ms(latency['infer'], 0.5):.1f} / post {_ms(latency['post'], 0.5):.1f})")
+            print("Thres | Prec  | Recall | F1")
+            for c in curve:
+                print(f"{c['threshold']:5.2f} | {c['precision']:.3f} | {c['recall']:.3f}  | {c['f1']:.3f}")
+            for label, c in points.items():
+                if c is None:
+                    print(f"{label:<16}: not reachable")
+                else:
+                    print(f"{label:<16}: threshold {c['threshold']:.2f} (P {c['precision']:.3f}, R {c['recall']:.3f})")
+            report.append({"model": model_path, "img_size": size, "curve": curve, "operating_points": points,
+                           "throughput_ips": throughput,
+                           "latency_ms": {k: {"p50": _ms(v, 0.5), "p95": _ms(v, 0.95)} for k, v in latency.items()}})
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[Eval] Report written to {args.json}")
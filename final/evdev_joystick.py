@@ -0,0 +1,387 @@
+# evdev_joystick.py
+import argparse
+import fcntl
+import glob
+import os
+import select
+import struct
+import threading
+import time
+
+# --- Linux evdev (linux/input.h) ---
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_DROPPED = 3
+BTN_MISC = 0x100
+BTN_JOYSTICK = 0x120
+BTN_DIGI = 0x140
+KEY_MAX = 0x2ff
+ABS_HAT0X = 0x10
+ABS_HAT3Y = 0x17
+ABS_MAX = 0x3f
+CLOCK_MONOTONIC = 1
+
+# struct input_event: timeval (2 x long), type, code, value
+EVENT = struct.Struct("llHHi")
+# struct input_absinfo: value, minimum, maximum, fuzz, flat, resolution
+ABSINFO = struct.Struct("6i")
+
+
+def _ioc(direction, nr, size):
+    """_IOC(dir, 'E', nr, size) (direction: 1 write, 2 read)"""
+    return (direction << 30) | (size << 16) | (ord("E") << 8) | nr
+
+
+EVIOCSCLOCKID = _ioc(1, 0xa0, 4)
+
+def EVIOCGNAME(length):
+    return _ioc(2, 0x06, length)
+
+def EVIOCGKEY(length):
+    return _ioc(2, 0x18, length)
+
+def EVIOCGBIT(ev_type, length):
+    return _ioc(2, 0x20 + ev_type, length)
+
+def EVIOCGABS(code):
+    return _ioc(2, 0x40 + code, ABSINFO.size)
+
+
+def _bits(fd, request, max_code):
+    """ioctl bitmask -> list of set codes"""
+    buf = bytearray((max_code + 8) // 8)
+    fcntl.ioctl(fd, request(len(buf)), buf)
+    return [c for c in range(max_code + 1) if buf[c // 8] >> (c % 8) & 1]
+
+
+def button_codes(key_codes):
+    """Key codes in SDL2's joystick button order (= pygame button indices)"""
+    return ([c for c in key_codes if BTN_JOYSTICK <= c < KEY_MAX] +
+            [c for c in key_codes if c < BTN_JOYSTICK])
+
+
+def axis_codes(abs_codes):
+    """Abs codes in SDL2's axis order: hats are not axes"""
+    return [c for c in abs_codes if c < ABS_MAX and not ABS_HAT0X <= c <= ABS_HAT3Y]
+
+
+def find_gamepad():
+    """First event device with joystick / gamepad buttons and axes, None if nothing is plugged in"""
+    paths = sorted(glob.glob("/dev/input/by-id/*-event-joystick"))
+    paths += sorted(glob.glob("/dev/input/event*"), key=lambda p: int(p[16:]) if p[16:].isdigit() else 0)
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            continue
+        try:
+            types = _bits(fd, lambda n: EVIOCGBIT(0, n), 0x1f)
+            if EV_KEY in types and EV_ABS in types:
+                keys = _bits(fd, lambda n: EVIOCGBIT(EV_KEY, n), KEY_MAX)
+                if any(BTN_JOYSTICK <= k < BTN_DIGI for k in keys):
+                    return os.path.realpath(path)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    return None
+
+
+class EvdevJoystick:
+    """
+    Gamepad input straight from /dev/input (drop-in for JoystickController, no pygame).
+    - A reader thread applies kernel events as they arrive (no event.pump() in the loop)
+    - Button / axis indices follow SDL2 numbering, so the BUTTON_* IDs stay valid
+    - Each event keeps its kernel timestamp (CLOCK_MONOTONIC, same clock as time.monotonic())
+    - Unplugged -> axes 0, all buttons released, reconnect every RECONNECT_INTERVAL
+    """
+    DEADZONE = 0.1
+    RECONNECT_INTERVAL = 1.0   # sec
+
+    # Same IDs as JoystickController
+    BUTTON_B = 0
+    BUTTON_A = 2
+    BUTTON_Y = 1
+    BUTTON_X = 3
+    BUTTON_L = 4
+    BUTTON_R = 5
+    BUTTON_SELECT = 6
+    START_BUTTON = 7
+
+    def __init__(self, device_path=None):
+        self.device_path = device_path
+        self.lock = threading.Lock()
+        self.fd = None
+        self.path = None
+        self.name = None
+        self.button_map = {}   # key code -> index
+        self.axis_map = {}     # abs code -> (index, minimum, maximum)
+        self.axes = []
+        self.buttons = []
+        self.button_times = []
+        self.last_event_time = None
+        self.monotonic_stamps = False
+        self.disconnects = 0
+
+        if not self._connect():
+            print("Error: No joystick found.")
+            raise ConnectionError("No joystick found. Is 8BitDo connected?")
+        print(f"Joystick '{self.name}' initialized (evdev {self.path}).")
+        print(f"Axes: {self.num_axes}, Buttons: {self.num_buttons}")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+
+    @property
+    def num_axes(self):
+        return len(self.axes)
+
+    @property
+    def num_buttons(self):
+        return len(self.buttons)
+
+    # --- Device ---
+    def _connect(self):
+        path = self.device_path or find_gamepad()
+        if path is None:
+            return False
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            return False
+        try:
+            name = bytearray(256)
+            fcntl.ioctl(fd, EVIOCGNAME(len(name)), name)
+            keys = button_codes(_bits(fd, lambda n: EVIOCGBIT(EV_KEY, n), KEY_MAX))
+            abs_codes = axis_codes(_bits(fd, lambda n: EVIOCGBIT(EV_ABS, n), ABS_MAX))
+            try:
+                fcntl.ioctl(fd, EVIOCSCLOCKID, struct.pack("i", CLOCK_MONOTONIC))
+                monotonic = True
+            except OSError:
+                monotonic = False
+
+            axis_map = {}
+            for index, code in enumerate(abs_codes):
+                absinfo = bytearray(ABSINFO.size)
+                fcntl.ioctl(fd, EVIOCGABS(code), absinfo)
+                _, minimum, maximum, _, _, _ = ABSINFO.unpack(absinfo)
+                axis_map[code] = (index, minimum, maximum)
+        except OSError as e:
+            os.close(fd)
+            print(f"[Joystick] {path}: {e}")
+            return False
+
+        with self.lock:
+            self.fd = fd
+            self.path = path
+            self.name = name.split(b"\0", 1)[0].decode(errors="replace")
+            self.monotonic_stamps = monotonic
+            self.button_map = {code: i for i, code in enumerate(keys)}
+            self.axis_map = axis_map
+            self.axes = [0.0] * len(axis_map)
+            self.buttons = [False] * len(keys)
+            self.button_times = [None] * len(keys)
+        try:
+            self._sync_state()
+        except OSError as e:
+            self._disconnect(e)
+            return False
+        return True
+
+    def _sync_state(self):
+        """Read the current state with ioctls (after connect and SYN_DROPPED)"""
+        now = time.monotonic()
+        pressed = set(_bits(self.fd, EVIOCGKEY, KEY_MAX))
+        with self.lock:
+            for code, index in self.button_map.items():
+                if self.buttons[index] != (code in pressed):
+                    self.buttons[index] = code in pressed
+                    self.button_times[index] = now
+            for code, (index, minimum, maximum) in self.axis_map.items():
+                absinfo = bytearray(ABSINFO.size)
+                fcntl.ioctl(self.fd, EVIOCGABS(code), absinfo)
+                self.axes[index] = self._normalize(ABSINFO.unpack(absinfo)[0], minimum, maximum)
+
+    @staticmethod
+    def _normalize(value, minimum, maximum):
+        """Device range -> -1.0 ~ 1.0 (like SDL / pygame)"""
+        if maximum <= minimum:
+            return 0.0
+        return max(-1.0, min(1.0, 2.0 * (value - minimum) / (maximum - minimum) - 1.0))
+
+    def _disconnect(self, error):
+        with self.lock:
+            if self.fd is not None:
+                try:
+                    os.close(self.fd)
+                except OSError:
+                    pass
+            self.fd = None
+            # Released pad: the robot must not keep driving
+            self.axes = [0.0] * len(self.axes)
+            self.buttons = [False] * len(self.buttons)
+        self.disconnects += 1
+        print(f"\n[Joystick] Disconnected ({error}). Waiting for the gamepad...")
+
+    def _read_loop(self):
+        while self.running:
+            if self.fd is None:
+                if not self._connect():
+                    time.sleep(self.RECONNECT_INTERVAL)
+                    continue
+                print(f"\n[Joystick] Reconnected: '{self.name}' ({self.path}).")
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 0.2)
+                if not ready:
+                    continue
+                data = os.read(self.fd, EVENT.size * 64)
+            except (OSError, ValueError) as e:
+                if self.running:
+                    self._disconnect(e)
+                continue
+            if not data:
+                self._disconnect("end of file")
+                continue
+            try:
+                self._apply(data)
+            except OSError as e:
+                self._disconnect(e)
+
+    def _apply(self, data):
+        """Apply a block of input_events to the state"""
+        for offset in range(0, len(data) - EVENT.size + 1, EVENT.size):
+            sec, usec, ev_type, code, value = EVENT.unpack_from(data, offset)
+            stamp = sec + usec / 1e6 if self.monotonic_stamps else time.monotonic()
+            if ev_type == EV_KEY:
+                index = self.button_map.get(code)
+                if index is not None and value != 2:   # 2 = autorepeat
+                    with self.lock:
+                        self.buttons[index] = value == 1
+                        self.button_times[index] = stamp
+            elif ev_type == EV_ABS:
+                axis = self.axis_map.get(code)
+                if axis is not None:
+                    index, minimum, maximum = axis
+                    with self.lock:
+                        self.axes[index] = self._normalize(value, minimum, maximum)
+            elif ev_type == EV_SYN and code == SYN_DROPPED:
+                # Kernel buffer overflowed: events were lost
+                self._sync_state()
+                continue
+            else:
+                continue
+            self.last_event_time = stamp
+
+    # --- JoystickController Interface ---
+    def get_axes(self):
+        with self.lock:
+            x_val = self.axes[0] if len(self.axes) > 0 else 0.0
+            y_val = self.axes[1] if len(self.axes) > 1 else 0.0
+        if abs(x_val) < self.DEADZONE:
+            x_val = 0.0
+        if abs(y_val) < self.DEADZONE:
+            y_val = 0.0
+        return x_val, y_val
+
+    def get_button_state(self, button_id):
+        if button_id >= len(self.buttons):
+            return False
+        return self.buttons[button_id]
+
+    def button_time(self, button_id):
+        """Kernel timestamp of the last press / release of this button (None = not seen)"""
+        if button_id >= len(self.button_times):
+            return None
+        return self.button_times[button_id]
+
+    def quit(self):
+        print("Closing evdev joystick.")
+        self.running = False
+        self.thread.join(timeout=1.0)
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+
+# ---------------------------------------------------------
+# Comparison with the pygame backend (real gamepad needed)
+# ---------------------------------------------------------
+
+def _percentiles(values):
+    values = sorted(values)
+    return values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.99))], values[-1]
+
+
+def compare_backends(seconds, loop_period):
+    """
+    Startup time of both backends, then a robot-like loop polls both while buttons are pressed.
+    Input-to-actuation latency = loop sees the new button state - kernel timestamp of the event.
+    """
+    t0 = time.perf_counter()
+    evdev_joy = EvdevJoystick()
+    evdev_start = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    import joystick   # pygame import is part of its startup cost
+    pygame_joy = joystick.JoystickController()
+    pygame_start = time.perf_counter() - t0
+
+    backends = {"evdev": evdev_joy, "pygame": pygame_joy}
+    buttons = range(min(evdev_joy.num_buttons, pygame_joy.num_buttons))
+    seen = {name: [False] * len(buttons) for name in backends}
+    latency = {name: [] for name in backends}
+    poll_cost = {name: [] for name in backends}
+
+    print(f"\n[Joystick] Press buttons for {seconds:.0f}s (loop period {loop_period * 1000:.0f}ms)...")
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for name, joy in backends.items():
+            t0 = time.perf_counter()
+            joy.get_axes()
+            states = [joy.get_button_state(b) for b in buttons]
+            poll_cost[name].append(time.perf_counter() - t0)
+            now = time.monotonic()
+            for b, state in zip(buttons, states):
+                if state != seen[name][b]:
+                    seen[name][b] = state
+                    stamp = evdev_joy.button_time(b)
+                    if stamp is not None and evdev_joy.monotonic_stamps:
+                        latency[name].append(now - stamp)
+        time.sleep(loop_period)
+
+    print(f"\n{'Backend':<8} {'Startup':>10} {'Poll p50':>10} {'Latency p50 / p99 / max':>28} {'Edges':>6}")
+    for name, start in (("evdev", evdev_start), ("pygame", pygame_start)):
+        poll = _percentiles(poll_cost[name])[0] * 1e6
+        if latency[name]:
+            p50, p99, worst = (v * 1000 for v in _percentiles(latency[name]))
+            lat = f"{p50:6.1f} / {p99:6.1f} / {worst:6.1f}ms"
+        else:
+            lat = "-"
+        print(f"{name:<8} {start * 1000:8.0f}ms {poll:8.1f}us {lat:>28} {len(latency[name]):6d}")
+
+    evdev_joy.quit()
+    pygame_joy.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="evdev gamepad backend")
+    parser.add_argument("--compare", action="store_true", help="Startup time and input latency vs. pygame")
+    parser.add_argument("--seconds", type=float, default=15.0)
+    parser.add_argument("--period", type=float, default=0.02, help="Polling loop period (s)")
+    parser.add_argument("--device", help="Event device (default: first gamepad found)")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_backends(args.seconds, args.period)
+    else:
+        joy = EvdevJoystick(args.device)
+        try:
+            while True:
+                pressed = [b for b in range(joy.num_buttons) if joy.get_button_state(b)]
+                print(f"Axes {joy.get_axes()} | Buttons {pressed} | Disconnects {joy.disconnects}    ", end="\r")
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            joy.quit()
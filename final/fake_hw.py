@@ -0,0 +1,433 @@
+# fake_hw.py
+import math
+import random
+import sys
+import types
+from collections import deque
+
+import pwm_backend
+import robot_modes
+import servo
+from search_planner import SearchPlanner
+
+# --- Geometry ---
+# World: x/y in meters, heading in degrees (0 = +x, counter-clockwise)
+# Pan 90 = straight ahead, higher pan turns left
+# Tilt TILT_LEVEL = camera horizontal, higher tilt looks up
+TILT_LEVEL = 40.0
+CAMERA_HEIGHT = 0.20          # m
+FRAME_WIDTH_PX = 640
+
+
+class SimClock:
+    """Stands in for the 'time' module: sleeping advances the simulated world"""
+    def __init__(self, world, start=1000.0):
+        self.world = world
+        self.now = start
+        world.now = start
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+    perf_counter = time
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.world.advance(self.now + seconds)
+            self.now += seconds
+
+
+class Flame:
+    def __init__(self, x, y, height=0.1, width=0.15, water_needed=150.0):
+        self.x = x
+        self.y = y
+        self.height = height
+        self.width = width
+        self.water_needed = water_needed   # ml on target to put it out
+        self.water = 0.0
+        self.parts = None                  # Water per FLAME_GRID cell (created by SimWorld)
+        self.out_time = None
+
+    @property
+    def burning(self):
+        return self.out_time is None
+
+
+class SimWorld:
+    """
+    Kinematics + flames. advance() integrates in STEP-sized substeps.
+    - Servos: RESPONSE_TIME dead time, then SERVO_SLEW_DEG_PER_S to the command
+    - Drive: differential, wheel speed = motor % * MAX_WHEEL_SPEED
+    - Pump: FLOW_ML_PER_S * duty, counts as on target when the spray point
+      is within flame half-width + SPRAY_RADIUS (normalized image units)
+    """
+    STEP = 0.005
+    SERVO_SLEW_DEG_PER_S = SearchPlanner.SERVO_SLEW_DEG_PER_S
+    HFOV = SearchPlanner.CAMERA_HFOV_DEG
+    VFOV = SearchPlanner.CAMERA_VFOV_DEG
+    MAX_WHEEL_SPEED = 0.5     # m/s at 100%
+    TRACK_WIDTH = 0.15        # m
+    FLOW_ML_PER_S = 40.0
+    SPRAY_RADIUS = 0.03
+    WATER_RANGE = 1.5         # m, farther flames are out of reach
+    # Where the water really lands (image coordinates - 0.5). Default: where the robot's
+    # default trims aim, after the TRIM_LIMIT clamp (NOZZLE_OFFSET_Y itself is out of range)
+    NOZZLE_X = robot_modes._clamp_value(robot_modes.NOZZLE_OFFSET_X, -robot_modes.TRIM_LIMIT, robot_modes.TRIM_LIMIT)
+    NOZZLE_Y = robot_modes._clamp_value(robot_modes.NOZZLE_OFFSET_Y, -robot_modes.TRIM_LIMIT, robot_modes.TRIM_LIMIT)
+    NOZZLE_DROP = 0.0         # Water arc drop (image units per m^2 of range), adds to NOZZLE_Y
+    FLAME_GRID = (1, 1)       # Flame split into cols x rows cells, each needs its share of water_needed
+
+    def __init__(self, flames, seed=0):
+        self.rng = random.Random(seed)
+        self.flames = flames
+        self.now = 0.0
+        self.x = self.y = 0.0
+        self.heading = 90.0
+        self.pan = float(servo.ServoController.INITIAL_PAN_ANGLE)
+        self.tilt = float(servo.ServoController.INITIAL_TILT_ANGLE)
+        self.servo_cmds = deque()            # (time it takes effect, pan, tilt)
+        self.cmd_pan, self.cmd_tilt = self.pan, self.tilt
+        self.left = self.right = 0.0
+        self.pump_duty = 0.0
+        self.water_used = 0.0
+        self.water_on_target = 0.0
+        self.history = deque(maxlen=1000)    # (time, pan, tilt, x, y, heading)
+        self._record()
+
+    def _record(self):
+        self.history.append((self.now, self.pan, self.tilt, self.x, self.y, self.heading))
+
+    def pose_at(self, t):
+        for entry in reversed(self.history):
+            if entry[0] <= t:
+                return entry
+        return self.history[0]
+
+    def command_servo(self, pan, tilt, response_time):
+        self.servo_cmds.append((self.now + response_time, pan, tilt))
+
+    # --- Projection ---
+    def project(self, flame, pose=None):
+        """Flame -> (cx, cy, w) in normalized image units for a pose, or None behind the camera"""
+        _, pan, tilt, x, y, heading = pose or (self.now, self.pan, self.tilt, self.x, self.y, self.heading)
+        dx, dy = flame.x - x, flame.y - y
+        dist = math.hypot(dx, dy)
+        bearing = (math.degrees(math.atan2(dy, dx)) - heading + 180.0) % 360.0 - 180.0
+        flame_pan = 90.0 + bearing
+        flame_tilt = TILT_LEVEL + math.degrees(math.atan2(flame.height - CAMERA_HEIGHT, dist))
+        if abs(pan - flame_pan) > 90.0:
+            return None
+        cx = 0.5 + (pan - flame_pan) / self.HFOV
+        cy = 0.5 + (tilt - flame_tilt) / self.VFOV
+        w = math.degrees(2 * math.atan2(flame.width / 2, dist)) / self.HFOV
+        return cx, cy, w, dist
+
+    def spray_hit(self, flame):
+        """Spray landing point relative to the flame box centre (image units), None = miss"""
+        p = self.project(flame)
+        if p is None:
+            return None
+        cx, cy, w, dist = p
+        if dist > self.WATER_RANGE:
+            return None
+        reach = w / 2 + self.SPRAY_RADIUS
+        land_y = 0.5 + self.NOZZLE_Y + self.NOZZLE_DROP * dist * dist
+        dx, dy = (0.5 + self.NOZZLE_X) - cx, land_y - cy
+        if abs(dx) > reach or abs(dy) > reach:
+            return None
+        return dx, dy, w
+
+    def on_target(self, flame):
+        return self.spray_hit(flame) is not None
+
+    def _wet(self, flame, hit, flow):
+        """Share the flow between the grid cells the spray patch covers. True once every cell had enough."""
+        cols, rows = self.FLAME_GRID
+        if flame.parts is None:
+            flame.parts = [0.0] * (cols * rows)
+        dx, dy, w = hit
+        h = w * self.HFOV / self.VFOV
+
+        def shares(offset, size, n):
+            # Spray patch [offset - r, offset + r] clipped to the flame, split over n cells
+            lo = max(-size / 2, offset - self.SPRAY_RADIUS)
+            hi = min(size / 2, offset + self.SPRAY_RADIUS)
+            if hi <= lo:
+                # Edge of the reach: the nearest cell gets it
+                i = 0 if offset < 0 else n - 1
+                return [1.0 if j == i else 0.0 for j in range(n)]
+            edges = [-size / 2 + size * j / n for j in range(n + 1)]
+            return [max(0.0, min(hi, edges[j + 1]) - max(lo, edges[j])) / (hi - lo) for j in range(n)]
+
+        for c, sx in enumerate(shares(dx, w, cols)):
+            for r, sy in enumerate(shares(dy, h, rows)):
+                flame.parts[r * cols + c] += flow * sx * sy
+        need = flame.water_needed / (cols * rows)
+        return all(p >= need for p in flame.parts)
+
+    # --- Integration ---
+    def advance(self, until):
+        while self.now < until - 1e-12:
+            dt = min(self.STEP, until - self.now)
+            self.now += dt
+            while self.servo_cmds and self.servo_cmds[0][0] <= self.now:
+                _, self.cmd_pan, self.cmd_tilt = self.servo_cmds.popleft()
+            max_move = self.SERVO_SLEW_DEG_PER_S * dt
+            self.pan += max(-max_move, min(max_move, self.cmd_pan - self.pan))
+            self.tilt += max(-max_move, min(max_move, self.cmd_tilt - self.tilt))
+
+            v_l = self.left / 100.0 * self.MAX_WHEEL_SPEED
+            v_r = self.right / 100.0 * self.MAX_WHEEL_SPEED
+            v = (v_l + v_r) / 2
+            self.heading += math.degrees((v_r - v_l) / self.TRACK_WIDTH) * dt
+            self.x += v * math.cos(math.radians(self.heading)) * dt
+            self.y += v * math.sin(math.radians(self.heading)) * dt
+
+            if self.pump_duty > 0:
+                flow = self.FLOW_ML_PER_S * self.pump_duty / 100.0 * dt
+                self.water_used += flow
+                for flame in self.flames:
+                    hit = self.spray_hit(flame) if flame.burning else None
+                    if hit is not None:
+                        flame.water += flow
+                        self.water_on_target += flow
+                        if self._wet(flame, hit, flow):
+                            flame.out_time = self.now
+                        break
+            self._record()
+
+    @property
+    def all_out(self):
+        return all(not f.burning for f in self.flames)
+
+
+# ---------------------------------------------------------
+# Fake Devices (same methods as the real controllers)
+# ---------------------------------------------------------
+
+class SimServo(servo.ServoController):
+    """Real pose_at(); commands go to the world instead of PWM"""
+    def __init__(self, world, clock, hardware_pwm=False):
+        self.world = world
+        self.clock = clock
+        self.hardware_pwm = hardware_pwm
+        self.current_pan_angle = self.INITIAL_PAN_ANGLE
+        self.current_tilt_angle = self.INITIAL_TILT_ANGLE
+        self.history = deque(maxlen=self.HISTORY_LENGTH)
+        self.history.append((clock.monotonic(), self.current_pan_angle, self.current_tilt_angle))
+
+    def set_angle(self, servo_pin, angle):
+        angle = max(0, min(180, angle))
+        if servo_pin == self.PAN_SERVO_PIN:
+            self.current_pan_angle = angle
+        elif servo_pin == self.TILT_SERVO_PIN:
+            self.current_tilt_angle = angle
+        else:
+            return
+        self.history.append((self.clock.monotonic(), self.current_pan_angle, self.current_tilt_angle))
+        self.world.command_servo(self.current_pan_angle, self.current_tilt_angle, self.RESPONSE_TIME)
+        if not self.hardware_pwm:
+            self.clock.sleep(0.03)
+
+    def cleanup(self):
+        pass
+
+
+class SimMotor:
+    def __init__(self, world):
+        self.world = world
+        self.left_speed = 0
+        self.right_speed = 0
+
+    def set_left_motor(self, speed):
+        self.left_speed = self.world.left = max(-100, min(100, speed))
+
+    def set_right_motor(self, speed):
+        self.right_speed = self.world.right = max(-100, min(100, speed))
+
+    def stop_all(self):
+        self.set_left_motor(0)
+        self.set_right_motor(0)
+
+    def cleanup(self):
+        self.stop_all()
+
+
+class SimPump:
+    PUMP_SPEED = 100
+    TANK_ML = 1000.0
+
+    def __init__(self, world):
+        self.world = world
+        self.is_on = False
+        self.refilled_at = 0.0   # world.water_used at the last refill
+
+    @property
+    def water_used(self):
+        return self.world.water_used - self.refilled_at
+
+    @property
+    def water_left(self):
+        return max(0.0, self.TANK_ML - self.water_used)
+
+    def refill(self):
+        self.refilled_at = self.world.water_used
+
+    def pump_on(self):
+        self.world.pump_duty = self.PUMP_SPEED
+        self.is_on = True
+
+    def pump_off(self):
+        self.world.pump_duty = 0.0
+        self.is_on = False
+
+    def cleanup(self):
+        self.pump_off()
+
+
+class SimFireSensor:
+    """IR cone along the camera (SearchPlanner.SENSOR_ON_TURRET) or the chassis"""
+    RANGE = 3.0            # m
+    MISS_RATE = 0.05
+
+    def __init__(self, world):
+        self.world = world
+
+    def is_fire_detected(self):
+        w = self.world
+        axis = w.pan if SearchPlanner.SENSOR_ON_TURRET else 90.0
+        for flame in w.flames:
+            if not flame.burning:
+                continue
+            p = w.project(flame, (w.now, axis, TILT_LEVEL, w.x, w.y, w.heading))
+            if p is None or p[3] > self.RANGE:
+                continue
+            if abs(p[0] - 0.5) * w.HFOV <= SearchPlanner.SENSOR_SECTOR_DEG / 2 and w.rng.random() > self.MISS_RATE:
+                return True
+        return False
+
+
+class SimCamera:
+    """
+    Synthetic detections with FireCamera's interface.
+    The frame is exposed FRAME_AGE before detect() starts, detect() blocks for INFERENCE_TIME.
+    """
+    INFERENCE_TIME = 0.10     # sec
+    FRAME_AGE = 0.03          # sec (capture pipeline)
+    NOISE = 0.01              # Center jitter (normalized)
+    MIN_PIXELS = 6            # Smaller flames are not detected
+    FULL_SCORE_PIXELS = 40
+    DROPOUT = 0.05
+    FALSE_POSITIVE = 0.01
+
+    def __init__(self, world, clock):
+        self.world = world
+        self.clock = clock
+        self.img_size = 320
+        self.last_frame_time = None
+        self.last_detection = (False, 0.5, 0.5, 0.0)
+        self.last_box = None
+
+    def detect(self, sensor_active=False, min_score=0.5):
+        w = self.world
+        exposure = self.clock.monotonic() - self.FRAME_AGE
+        pose = w.pose_at(exposure)
+        self.clock.sleep(self.INFERENCE_TIME)
+        self.last_frame_time = exposure
+
+        best = None
+        for flame in w.flames:
+            if not flame.burning:
+                continue
+            p = w.project(flame, pose)
+            if p is None:
+                continue
+            cx, cy, bw, _ = p
+            px = bw * FRAME_WIDTH_PX
+            if not (0.0 <= cx <= 1.0 and 0.0 <= cy <= 1.0) or px < self.MIN_PIXELS or w.rng.random() < self.DROPOUT:
+                continue
+            score = min(0.95, 0.3 + 0.6 * px / self.FULL_SCORE_PIXELS) + w.rng.gauss(0, 0.05)
+            if score > min_score and (best is None or score > best[3]):
+                best = (cx + w.rng.gauss(0, self.NOISE), cy + w.rng.gauss(0, self.NOISE), bw, score)
+        if best is None and w.rng.random() < self.FALSE_POSITIVE:
+            best = (w.rng.random(), w.rng.random(), 0.02, min_score + 0.01)
+
+        if best is None:
+            self.last_detection = (False, 0.5, 0.5, 0.0)
+            self.last_box = None
+            return False, 0.5, 0.5
+        cx, cy, bw, score = best
+        self.last_detection = (True, cx, cy, score)
+        self.last_box = (cx, cy, bw, bw * self.world.HFOV / self.world.VFOV)
+        return True, cx, cy
+
+    def cleanup(self):
+        pass
+
+
+class NullDevice:
+    """RGB LED / buzzer / joystick: every call is accepted and ignored"""
+    BUTTON_B = 0
+    BUTTON_A = 2
+    BUTTON_Y = 1
+    BUTTON_X = 3
+    BUTTON_L = 4
+    BUTTON_R = 5
+
+    def get_button_state(self, button_id):
+        return False
+
+    def get_axes(self):
+        return 0.0, 0.0
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+# ---------------------------------------------------------
+# Fake GPIO / PWM Backends (real controllers without hardware)
+# ---------------------------------------------------------
+
+class FakePWM:
+    """Records the duty cycle, nothing else (no sleep in ServoController.set_angle)"""
+    is_hardware = True
+
+    def __init__(self, pin, freq):
+        self.pin = pin
+        self.freq = freq
+        self.duty = 0.0
+
+    def start(self, duty):
+        self.duty = duty
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+
+    def ChangeFrequency(self, freq):
+        self.freq = freq
+
+    def stop(self):
+        self.duty = 0.0
+
+
+def install_fake_gpio():
+    """
+    RPi.GPIO stand-in and fake PWM channels for motor / pump / servo / fire_sensor.
+    Call before importing those modules.
+    """
+    gpio = types.ModuleType("RPi.GPIO")
+    gpio.BCM, gpio.OUT, gpio.IN, gpio.HIGH, gpio.LOW, gpio.PUD_UP = 11, 0, 1, 1, 0, 22
+    gpio.pins = {}
+    gpio.setmode = gpio.setwarnings = gpio.cleanup = lambda *args, **kwargs: None
+    gpio.setup = lambda pin, mode, **kwargs: gpio.pins.setdefault(pin, 1)
+    gpio.output = lambda pin, value: gpio.pins.__setitem__(pin, value)
+    gpio.input = lambda pin: gpio.pins.get(pin, 1)
+    gpio.PWM = lambda pin, freq: FakePWM(pin, freq)
+    package = types.ModuleType("RPi")
+    package.GPIO = gpio
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = gpio
+    pwm_backend.open_pwm = lambda pin, freq: FakePWM(pin, freq)
+    pwm_backend.cleanup = lambda: None
+    return gpio
@@ -0,0 +1,296 @@
+# inference_server.py
+import argparse
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+# --- Protocol (Unix Socket) ---
+# Request : header + letterboxed frame (H x W x 3 uint8)
+# Response: header + rows x [cx, cy, w, h, conf] float32
+MAGIC = b"FIRE"
+REQ_HEADER = struct.Struct("<4sIHHf")   # magic, request id, height, width, min_score
+RESP_HEADER = struct.Struct("<4sIIH")   # magic, request id, rows, batch size
+
+DEFAULT_SOCKET = "/tmp/fire_inference.sock"
+
+
+def _recv_exact(conn, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = conn.recv_into(view[got:], size - got)
+        if n == 0:
+            raise ConnectionError("Socket closed")
+        got += n
+    return buf
+
+
+class InferenceClient:
+    """
+    Client side of the inference server.
+    FireCamera calls infer() instead of running its own ONNX session.
+    - Every request has a TIMEOUT: a hung server must not stall the control loop
+    - Any error drops the connection (the stream may be out of step), the next
+      infer() after RECONNECT_INTERVAL connects again; until then it fails fast
+    """
+    TIMEOUT = 0.25             # sec per request: half of main.WATCHDOG_TIMEOUT
+    RECONNECT_INTERVAL = 2.0   # sec between connection attempts
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout or self.TIMEOUT
+        self.sock = None
+        self.request_id = 0
+        self.last_attempt = 0.0
+        self._connect()
+
+    def _connect(self):
+        self.last_attempt = time.monotonic()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def infer(self, img, min_score):
+        """Letterboxed frame -> rows [cx, cy, w, h, conf] above min_score"""
+        if self.sock is None:
+            if time.monotonic() - self.last_attempt < self.RECONNECT_INTERVAL:
+                raise ConnectionError("Inference server disconnected")
+            self._connect()
+            print(f"[Client] Reconnected to {self.socket_path}")
+
+        self.request_id = (self.request_id + 1) & 0xFFFFFFFF
+        h, w = img.shape[:2]
+        try:
+            self.sock.sendall(REQ_HEADER.pack(MAGIC, self.request_id, h, w, min_score))
+            self.sock.sendall(np.ascontiguousarray(img, dtype=np.uint8))
+
+            magic, request_id, rows, batch_size = RESP_HEADER.unpack(_recv_exact(self.sock, RESP_HEADER.size))
+            if magic != MAGIC or request_id != self.request_id:
+                raise ConnectionError("Bad response from inference server")
+            data = _recv_exact(self.sock, rows * 5 * 4)
+        except OSError:   # Includes timeouts and ConnectionError
+            self._disconnect()
+            raise
+        self.last_batch_size = batch_size
+        return np.frombuffer(data, dtype=np.float32).reshape(rows, 5)
+
+    def close(self):
+        self._disconnect()
+
+
+class _Request:
+    __slots__ = ("conn", "lock", "request_id", "img", "min_score", "arrival")
+
+    def __init__(self, conn, lock, request_id, img, min_score):
+        self.conn = conn
+        self.lock = lock
+        self.request_id = request_id
+        self.img = img
+        self.min_score = min_score
+        self.arrival = time.monotonic()
+
+
+class BatchStats:
+    """Throughput and latency per batch size"""
+    def __init__(self):
+        self.data = {}   # batch size -> [batches, infer_sec, latency_sec_sum]
+
+    def add(self, batch_size, infer_sec, latencies):
+        entry = self.data.setdefault(batch_size, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += infer_sec
+        entry[2] += sum(latencies)
+
+    def report(self):
+        print("[Server] Batch | Batches | Infer ms/batch | Latency ms/frame | Throughput FPS")
+        for size in sorted(self.data):
+            batches, infer_sec, latency_sum = self.data[size]
+            frames = batches * size
+            print(f"[Server] {size:5d} | {batches:7d} | {infer_sec / batches * 1000:14.1f} | "
+                  f"{latency_sum / frames * 1000:16.1f} | {frames / infer_sec:14.1f}")
+
+
+class InferenceServer:
+    """
+    One process owns the ONNX session and serves every robot/camera on this host.
+    - Frames from all clients go into one queue
+    - Batches of up to max_batch frames, or whatever arrived within max_wait_ms
+    - Each client gets back only its own detections
+    """
+    STATS_INTERVAL = 10.0
+
+    def __init__(self, model_path, socket_path=DEFAULT_SOCKET, max_batch=4, max_wait_ms=5.0):
+        from camera import create_session
+
+        print(f"[Server] Loading AI Model from: {model_path}")
+        self.session = create_session(model_path)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+
+        # Fixed batch-1 models still work, but frames run one by one
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        if not self.dynamic_batch:
+            print("[Server] Warning: model has a fixed batch size. Export with dynamic batch for real batching.")
+
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.stats = BatchStats()
+        self.running = True
+
+    # --- Client Side Threads ---
+    def _accept_loop(self, server_sock):
+        while self.running:
+            try:
+                conn, _ = server_sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _client_loop(self, conn):
+        lock = threading.Lock()
+        try:
+            while self.running:
+                magic, request_id, h, w, min_score = REQ_HEADER.unpack(_recv_exact(conn, REQ_HEADER.size))
+                if magic != MAGIC:
+                    raise ConnectionError("Bad request")
+                img = np.frombuffer(_recv_exact(conn, h * w * 3), dtype=np.uint8).reshape(h, w, 3)
+                self.requests.put(_Request(conn, lock, request_id, img, min_score))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    # --- Batching ---
+    def _collect_batch(self):
+        first = self.requests.get()
+        batch = [first]
+        deadline = first.arrival + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, batch):
+        from camera import preprocess, decode
+
+        # Frames of different sizes cannot share a tensor
+        shape = batch[0].img.shape
+        same = [r for r in batch if r.img.shape == shape]
+        for r in batch:
+            if r.img.shape != shape:
+                self.requests.put(r)
+
+        t0 = time.monotonic()
+        inputs = np.stack([preprocess(r.img) for r in same])
+        if self.dynamic_batch:
+            out = self.session.run([self.output_name], {self.input_name: inputs})[0]
+        else:
+            out = np.concatenate([self.session.run([self.output_name], {self.input_name: x[None, ...]})[0]
+                                  for x in inputs])
+        infer_sec = time.monotonic() - t0
+
+        done = time.monotonic()
+        for i, r in enumerate(same):
+            dets = np.ascontiguousarray(decode(out[i], r.min_score), dtype=np.float32)
+            try:
+                with r.lock:
+                    r.conn.sendall(RESP_HEADER.pack(MAGIC, r.request_id, len(dets), len(same)))
+                    r.conn.sendall(dets)
+            except OSError:
+                pass
+        self.stats.add(len(same), infer_sec, [done - r.arrival for r in same])
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server_sock.bind(self.socket_path)
+        server_sock.listen()
+        threading.Thread(target=self._accept_loop, args=(server_sock,), daemon=True).start()
+        print(f"[Server] Listening on {self.socket_path} (batch<={self.max_batch}, wait<={self.max_wait * 1000:.1f}ms)")
+
+        last_report = time.monotonic()
+        try:
+            while self.running:
+                self._run_batch(self._collect_batch())
+                if time.monotonic() - last_report > self.STATS_INTERVAL:
+                    self.stats.report()
+                    last_report = time.monotonic()
+        finally:
+            self.running = False
+            server_sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.stats.report()
+
+
+def _bench_client(socket_path, frames, img_size, results, index):
+    client = InferenceClient(socket_path)
+    img = np.random.randint(0, 255, (img_size, img_size, 3), dtype=np.uint8)
+    latencies = []
+    for _ in range(frames):
+        t0 = time.monotonic()
+        client.infer(img, 0.5)
+        latencies.append(time.monotonic() - t0)
+    client.close()
+    results[index] = latencies
+
+
+def run_bench(socket_path, clients, frames, img_size):
+    """Fake cameras hammering the server, round-trip latency per client count"""
+    results = [None] * clients
+    threads = [threading.Thread(target=_bench_client, args=(socket_path, frames, img_size, results, i))
+               for i in range(clients)]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+    all_lat = sorted(l for r in results for l in r)
+    print(f"[Bench] {clients} clients x {frames} frames: {clients * frames / elapsed:.1f} FPS total | "
+          f"latency p50 {all_lat[len(all_lat) // 2] * 1000:.1f}ms p95 {all_lat[int(len(all_lat) * 0.95)] * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared batched inference server for FireCamera")
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "best_nano_320.onnx"))
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--batch", type=int, default=4, help="Max batch size")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Max time the first frame waits for a batch")
+    parser.add_argument("--bench", type=int, default=0, metavar="CLIENTS", help="Run N fake clients against a running server")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--img-size", type=int, default=320)
+    args = parser.parse_args()
+
+    if args.bench:
+        run_bench(args.socket, args.bench, args.frames, args.img_size)
+    else:
+        try:
+            InferenceServer(args.model, args.socket, args.batch, args.max_wait_ms).serve_forever()
+        except KeyboardInterrupt:
+            print("\n>>> INFERENCE SERVER STOPPED <<<")
@@ -1,15 +1,54 @@
 # main.py
 import robot_modes
 import motor
-import joystick
+import evdev_joystick
 import servo
 import pump
 import fire_sensor
 import rgb_led
 import buzzer
+import effects
+import recorder
 import camera
+import teleop
+import metrics
+import runtime_config
+import watchdog
 import time
 import sys
+import os
+
+# Shared Inference Server socket (see inference_server.py)
+# None = this process loads its own ONNX model
+INFERENCE_SOCKET = None
+
+# Network Teleoperation (see teleop.py). None = joystick only
+# Any interface other than loopback needs the shared key in $ROBOT_TELEOP_KEY
+TELEOP_PORT = None
+TELEOP_HOST = "127.0.0.1"   # e.g. "0.0.0.0" for the operator laptop
+
+# Prometheus metrics endpoint (see metrics.py). None = off
+METRICS_PORT = 9105
+METRICS_HOST = "127.0.0.1"   # e.g. "0.0.0.0" to scrape from another machine
+
+# Gamepad input: "evdev" reads /dev/input on its own thread (see evdev_joystick.py),
+# "pygame" uses JoystickController
+JOYSTICK_BACKEND = "evdev"
+
+# Session recording for offline replay (see recorder.py). None = off
+RECORD_DIR = None     # e.g. "recordings"
+
+# Loop Watchdog (see watchdog.py): motors + pump off after this long without a tick
+WATCHDOG_TIMEOUT = 0.5
+
+# CPU Pinning (Pi 5: 4 cores). None = kernel schedules freely
+# Control: main loop + watchdog thread, Vision: ONNX Runtime worker threads
+CONTROL_CPUS = None   # e.g. {3}
+VISION_CPUS = None    # e.g. {0, 1, 2}
+
+# Colour prefilter cascade (see detector.py): skip the CNN on frames without flame colours
+# Off until its recall loss is measured on real footage (python detector.py <video> --model ...)
+VISION_CASCADE = False
 
 def main():
     # Component Objects
@@ -20,7 +59,13 @@ def main():
     fire_sens = None
     rgb_ctrl = None
     buzz_ctrl = None
+    fx = None
     cam_ctrl = None
+    teleop_srv = None
+    metrics_srv = None
+    config = None
+    rec = None
+    dog = None
     
     try:
         print("\n>>> SYSTEM INITIALIZATION START <<<")
@@ -29,8 +74,21 @@ def main():
         # Motor Controller (TB6612FNG)
         motor_ctrl = motor.MotorController()
         
-        # Joystick (Pygame)
-        joy_ctrl = joystick.JoystickController()
+        # Network Teleop (UDP)
+        if TELEOP_PORT is not None:
+            teleop_srv = teleop.TeleopServer(TELEOP_PORT, TELEOP_HOST, os.environ.get(teleop.KEY_ENV))
+        
+        # Joystick (evdev / Pygame) - optional when teleop is enabled
+        try:
+            if JOYSTICK_BACKEND == "evdev":
+                joy_ctrl = evdev_joystick.EvdevJoystick()
+            else:
+                import joystick   # Pulls in pygame: only for this backend
+                joy_ctrl = joystick.JoystickController()
+        except ConnectionError:
+            if teleop_srv is None:
+                raise
+            print(">>> No joystick. Using network teleop only. <<<")
         
         # Servo Controller (Pan/Tilt)
         servo_ctrl = servo.ServoController()
@@ -44,18 +102,37 @@ def main():
         # RGB LED & Buzzer
         rgb_ctrl = rgb_led.RGBController()
         buzz_ctrl = buzzer.BuzzerController()
+        fx = effects.EffectsEngine(rgb_ctrl, buzz_ctrl)
         
         # 2. Initialize AI Camera
         # (This takes the longest, so we do it last)
         print(">>> Initializing AI Camera... Please wait.")
-        cam_ctrl = camera.FireCamera() 
+        # Inference requests give up well before the watchdog would trip on them
+        cam_ctrl = camera.FireCamera(server_socket=INFERENCE_SOCKET, vision_cpus=VISION_CPUS, cascade=VISION_CASCADE,
+                                     server_timeout=WATCHDOG_TIMEOUT / 2) 
+        
+        # Hot-reloadable tuning values (robot_config.json)
+        config = runtime_config.RuntimeConfig(robot_modes, cam_ctrl)
+        
+        # Metrics endpoint (HTTP thread stays off the control core)
+        if METRICS_PORT is not None:
+            metrics_srv = metrics.MetricsServer(METRICS_PORT, METRICS_HOST, motor_ctrl=motor_ctrl, servo_ctrl=servo_ctrl,
+                                                pump_ctrl=pump_ctrl, rgb_ctrl=rgb_ctrl, buzz_ctrl=buzz_ctrl,
+                                                camera=cam_ctrl)
+        
+        # Watchdog + control core (threads created from here on inherit the pinning)
+        watchdog.pin_current_thread(CONTROL_CPUS)
+        dog = watchdog.Watchdog(motor_ctrl, pump_ctrl, timeout=WATCHDOG_TIMEOUT, cpus=CONTROL_CPUS)
+        if metrics_srv: metrics_srv.watchdog = dog
         
         # 3. Start Robot Control Loop
         print(">>> ALL SYSTEMS GO. Starting Main Loop... <<<")
-        robot_modes.run_robot_loop(
-            motor_ctrl, joy_ctrl, servo_ctrl, pump_ctrl, 
-            fire_sens, rgb_ctrl, buzz_ctrl, cam_ctrl
-        )
+        loop_args = (motor_ctrl, joy_ctrl, servo_ctrl, pump_ctrl,
+                     fire_sens, fx, cam_ctrl, teleop_srv, config, dog)
+        if RECORD_DIR:
+            rec = recorder.Recorder.in_folder(RECORD_DIR)
+            loop_args = rec.wrap_loop_args(*loop_args)
+        robot_modes.run_robot_loop(*loop_args, metrics=metrics_srv)
 
     except KeyboardInterrupt:
         print("\n>>> STOPPED BY USER (Ctrl+C) <<<")
@@ -67,9 +144,14 @@ def main():
         
     finally:
         print("\n>>> CLEANING UP RESOURCES... <<<")
+        if dog: dog.stop()
+        if rec: rec.close()
+        if config: config.stop()
+        robot_modes.save_trims()
         # Cleanup in reverse order of dependency
         if pump_ctrl: pump_ctrl.cleanup()
         if servo_ctrl: servo_ctrl.cleanup()
+        if fx: fx.stop()
         if rgb_ctrl: rgb_ctrl.cleanup()
         if buzz_ctrl: buzz_ctrl.cleanup()
         if cam_ctrl: cam_ctrl.cleanup()
@@ -78,6 +160,8 @@ def main():
         if motor_ctrl: motor_ctrl.cleanup()
         
         if joy_ctrl: joy_ctrl.quit()
+        if teleop_srv: teleop_srv.quit()
+        if metrics_srv: metrics_srv.quit()
         print(">>> SYSTEM TERMINATED SAFELY <<<")
 
 if __name__ == "__main__":
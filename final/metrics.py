@@ -0,0 +1,318 @@
+# metrics.py
+import argparse
+import bisect
+import re
+import shutil
+import subprocess
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+DEFAULT_PORT = 9105
+THERMAL_FILE = "/sys/class/thermal/thermal_zone0/temp"
+
+# vcgencmd get_throttled bits
+THROTTLE_FLAGS = {
+    0: "under_voltage", 1: "freq_capped", 2: "throttled", 3: "soft_temp_limit",
+    16: "under_voltage_occurred", 17: "freq_capped_occurred",
+    18: "throttled_occurred", 19: "soft_temp_limit_occurred",
+}
+
+
+class Histogram:
+    """
+    Prometheus histogram (seconds).
+    Single writer: observe() only bumps plain numbers, no lock on the hot path.
+    A scrape at the same moment may miss the one sample in flight.
+    """
+    BUCKETS = (0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)   # Last one: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+class _Page:
+    """Prometheus text format builder (HELP / TYPE once per metric)"""
+    def __init__(self):
+        self.lines = []
+        self.declared = set()
+
+    def add(self, name, kind, help_text, value, **labels):
+        if value is None:
+            return
+        if name not in self.declared:
+            self.declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+        self.lines.append(f"{name}{_labels(labels)} {float(value)!r}")
+
+    def histogram(self, name, help_text, hist, **labels):
+        if name not in self.declared:
+            self.declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} histogram")
+        counts = list(hist.counts)   # Snapshot: the writer keeps going
+        total = 0
+        for bound, count in zip(hist.buckets + (float("inf"),), counts):
+            total += count
+            le = "+Inf" if bound == float("inf") else f"{bound:g}"
+            self.lines.append(f"{name}_bucket{_labels(dict(labels, le=le))} {total}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {float(hist.sum)!r}")
+        self.lines.append(f"{name}_count{_labels(labels)} {total}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """
+    Prometheus endpoint (GET /metrics) on its own thread: curl http://127.0.0.1:9105/metrics
+    - Loopback only by default: robot internals are not served to the whole network
+    - The control loop only calls loop_tick() (plain attribute writes, no locks)
+    - Controllers keep their own counters (writes, frames, latency histograms...),
+      read when scraped. Histograms have one writer (the loop); the watchdog thread's
+      stop calls also bump motor / pump writes (the pump under its switch lock, the
+      motor without one: a trip may lose an increment there, never add one)
+    - CPU temperature / throttle flags are read per scrape, never in the loop
+    """
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1", motor_ctrl=None, servo_ctrl=None, pump_ctrl=None,
+                 rgb_ctrl=None, buzz_ctrl=None, camera=None, watchdog=None):
+        self.controllers = {"motor": motor_ctrl, "servo": servo_ctrl, "pump": pump_ctrl,
+                            "rgb": rgb_ctrl, "buzzer": buzz_ctrl}
+        self.pump_ctrl = pump_ctrl
+        self.camera = camera
+        self.watchdog = watchdog
+        self.vcgencmd = shutil.which("vcgencmd")
+
+        # Written by the control loop only
+        self.ticks = 0
+        self.loop_hz = 0.0
+        self.manual_mode = None
+        self.last_tick = None
+        self.loop_period = Histogram()
+
+        # Scrape side: detections/s over the time between two scrapes
+        self.last_scrape = (time.monotonic(), camera.detections if camera is not None else 0)
+
+        server = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass   # Keep the status line of the loop clean
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"MetricsServer listening on http://{host}:{self.port}/metrics.")
+
+    def loop_tick(self, manual_mode, loop_hz):
+        """Once per control loop tick"""
+        now = time.monotonic()
+        if self.last_tick is not None:
+            self.loop_period.observe(now - self.last_tick)
+        self.last_tick = now
+        self.ticks += 1
+        self.loop_hz = loop_hz
+        self.manual_mode = manual_mode
+
+    # --- System ---
+    def _cpu_temp(self):
+        try:
+            with open(THERMAL_FILE) as f:
+                return int(f.read()) / 1000.0
+        except (OSError, ValueError):
+            return None
+
+    def _throttled(self):
+        if self.vcgencmd is None:
+            return None
+        try:
+            out = subprocess.run([self.vcgencmd, "get_throttled"], capture_output=True, text=True, timeout=1.0).stdout
+            return int(out.strip().split("=")[1], 16)
+        except (OSError, subprocess.SubprocessError, IndexError, ValueError):
+            return None
+
+    def render(self):
+        page = _Page()
+
+        # --- Control loop ---
+        page.add("robot_loop_ticks_total", "counter", "Control loop iterations.", self.ticks)
+        page.add("robot_loop_rate_hz", "gauge", "Control loop rate (smoothed).", self.loop_hz)
+        page.histogram("robot_loop_period_seconds", "Time between control loop ticks.", self.loop_period)
+        if self.manual_mode is not None:
+            for mode in ("manual", "auto"):
+                page.add("robot_mode", "gauge", "Current mode (1 = active).",
+                         int(self.manual_mode == (mode == "manual")), mode=mode)
+        if self.watchdog is not None:
+            page.add("robot_watchdog_trips_total", "counter", "Watchdog stops of motors and pump.", self.watchdog.trips)
+
+        # --- Vision ---
+        cam = self.camera
+        if cam is not None:
+            page.add("robot_camera_frames_total", "counter", "Frames processed.", cam.frames)
+            detections = cam.detections
+            page.add("robot_detections_total", "counter", "Frames with a flame detection.", detections)
+            now = time.monotonic()
+            last_time, last_detections = self.last_scrape
+            if now > last_time:
+                page.add("robot_detections_per_second", "gauge", "Detections per second since the last scrape.",
+                         (detections - last_detections) / (now - last_time))
+            self.last_scrape = (now, detections)
+            for stage, hist in cam.latency.items():
+                page.histogram("robot_vision_stage_seconds", "Vision pipeline latency per stage.", hist, stage=stage)
+
+        # --- Actuators ---
+        for name, ctrl in self.controllers.items():
+            writes = getattr(ctrl, "writes", None)
+            page.add("robot_gpio_writes_total", "counter", "GPIO / PWM writes per controller.", writes, controller=name)
+        if self.pump_ctrl is not None:
+            page.add("robot_pump_on_seconds_total", "counter", "Time the pump was running.", self.pump_ctrl.on_time)
+            page.add("robot_water_left_ml", "gauge", "Water left in the tank (estimate).", self.pump_ctrl.water_left)
+
+        # --- System ---
+        page.add("robot_cpu_temperature_celsius", "gauge", "SoC temperature.", self._cpu_temp())
+        throttled = self._throttled()
+        if throttled is not None:
+            for bit, flag in THROTTLE_FLAGS.items():
+                page.add("robot_throttled", "gauge", "Firmware throttle flags (vcgencmd get_throttled).",
+                         (throttled >> bit) & 1, flag=flag)
+        return page.text()
+
+    def quit(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join(timeout=1.0)
+
+
+# ---------------------------------------------------------
+# Self-test: fake loop writing, real HTTP scrapes
+# ---------------------------------------------------------
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[a-zA-Z_][a-zA-Z0-9_]*="[^"]*"(,[a-zA-Z_][a-zA-Z0-9_]*="[^"]*")*\})? '
+                         r'(-?[0-9.e+-]+|\+Inf|NaN)$')
+
+
+def parse(text):
+    """Prometheus text -> {sample name with labels: value}. Raises ValueError on a bad line."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        if not SAMPLE_LINE.match(line):
+            raise ValueError(f"Bad sample line: {line}")
+        key, value = line.rsplit(" ", 1)
+        samples[key] = float(value)
+    return samples
+
+
+def self_test(seconds=1.0):
+    cam = SimpleNamespace(frames=0, detections=0,
+                          latency={"prefilter": Histogram(), "inference": Histogram()})
+    devices = {name: SimpleNamespace(writes=0) for name in ("motor", "servo", "rgb", "buzzer")}
+    pump_ctrl = SimpleNamespace(writes=0, on_time=0.0, water_left=1000.0)
+    srv = MetricsServer(0, "127.0.0.1", devices["motor"], devices["servo"], pump_ctrl,
+                        devices["rgb"], devices["buzzer"], cam)
+    url = f"http://127.0.0.1:{srv.port}/metrics"
+
+    # Writer thread = control loop: bumps counters while the scrapes run
+    stop = threading.Event()
+    def loop():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            cam.frames += 1
+            cam.detections += i % 3 == 0
+            cam.latency["prefilter"].observe(0.001)
+            cam.latency["inference"].observe(0.04 + (i % 5) * 0.01)
+            for dev in devices.values():
+                dev.writes += 2
+            pump_ctrl.on_time += 0.001
+            srv.loop_tick(i % 50 < 25, 100.0)
+            time.sleep(0.001)
+    writer = threading.Thread(target=loop, daemon=True)
+    writer.start()
+
+    failures = []
+    scrapes = []
+    scrape_ms = []
+    end = time.monotonic() + seconds
+    try:
+        while time.monotonic() < end:
+            t0 = time.perf_counter()
+            with urllib.request.urlopen(url, timeout=2.0) as resp:
+                text = resp.read().decode()
+            scrape_ms.append((time.perf_counter() - t0) * 1000)
+            scrapes.append(parse(text))
+            time.sleep(0.05)
+    except ValueError as e:
+        failures.append(str(e))
+    finally:
+        stop.set()
+        writer.join()
+        srv.quit()
+
+    for name in ("robot_loop_ticks_total", "robot_camera_frames_total", 'robot_gpio_writes_total{controller="motor"}',
+                 "robot_pump_on_seconds_total", 'robot_vision_stage_seconds_count{stage="inference"}'):
+        values = [s.get(name) for s in scrapes]
+        if None in values:
+            failures.append(f"{name} missing")
+        elif any(b < a for a, b in zip(values, values[1:])):
+            failures.append(f"{name} went backwards")
+    for s in scrapes:
+        for stage in cam.latency:
+            buckets = [v for k, v in s.items() if k.startswith("robot_vision_stage_seconds_bucket") and f'stage="{stage}"' in k]
+            if any(b < a for a, b in zip(buckets, buckets[1:])):
+                failures.append(f"{stage} buckets not cumulative")
+            if buckets and buckets[-1] != s[f'robot_vision_stage_seconds_count{{stage="{stage}"}}']:
+                failures.append(f"{stage} +Inf bucket != count")
+
+    if scrape_ms:
+        print(f"[Metrics] {len(scrapes)} scrapes, {len(scrapes[-1])} samples, "
+              f"scrape p50 {sorted(scrape_ms)[len(scrape_ms) // 2]:.2f}ms max {max(scrape_ms):.2f}ms")
+    for failure in sorted(set(failures)):
+        print(f"[Metrics] FAIL: {failure}")
+    print(f">>> METRICS SELF-TEST {'FAILED' if failures or not scrapes else 'PASSED'} <<<")
+    return not failures and bool(scrapes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prometheus metrics endpoint")
+    parser.add_argument("--self-test", action="store_true", help="Scrape a local server fed by a fake loop")
+    parser.add_argument("--scrape", metavar="URL", help="Fetch and validate a running robot's endpoint")
+    args = parser.parse_args()
+
+    if args.scrape:
+        with urllib.request.urlopen(args.scrape, timeout=2.0) as resp:
+            text = resp.read().decode()
+        print(text, end="")
+        print(f"[Metrics] {len(parse(text))} samples OK.")
+    else:
+        raise SystemExit(0 if self_test() else 1)
@@ -1,5 +1,6 @@
 # motor.py
 import RPi.GPIO as GPIO
+import pwm_backend
 
 class MotorController:
     # Pin definitions (BCM) for TB6612FNG
@@ -22,23 +23,29 @@ class MotorController:
         
         GPIO.setup(self.AIN1, GPIO.OUT)
         GPIO.setup(self.AIN2_PIN, GPIO.OUT)
-        GPIO.setup(self.PWMA, GPIO.OUT)
         
         GPIO.setup(self.BIN1, GPIO.OUT)
         GPIO.setup(self.BIN2_PIN, GPIO.OUT)
-        GPIO.setup(self.PWMB, GPIO.OUT)
         
-        self.p_a = GPIO.PWM(self.PWMA, pwm_freq)
-        self.p_b = GPIO.PWM(self.PWMB, pwm_freq)
+        # PWM pins are owned by the shared PWM backend (hardware / lgpio)
+        self.p_a = pwm_backend.open_pwm(self.PWMA, pwm_freq)
+        self.p_b = pwm_backend.open_pwm(self.PWMB, pwm_freq)
         
         self.p_a.start(0)
         self.p_b.start(0)
         
         GPIO.output(self.STBY, GPIO.HIGH)
+        
+        # Last commanded speeds (for telemetry)
+        self.left_speed = 0
+        self.writes = 0 # GPIO / PWM writes (for metrics)
+        self.right_speed = 0
         print("MotorController initialized (using RPi.GPIO).")
 
     def set_left_motor(self, speed):
         speed = max(min(speed, 100), -100) 
+        self.left_speed = speed
+        self.writes += 3 # AIN1, AIN2, PWMA
         if speed > 0:
             GPIO.output(self.AIN1, GPIO.HIGH)
             GPIO.output(self.AIN2_PIN, GPIO.LOW)
@@ -54,6 +61,8 @@ class MotorController:
 
     def set_right_motor(self, speed):
         speed = max(min(speed, 100), -100)
+        self.right_speed = speed
+        self.writes += 3 # BIN1, BIN2, PWMB
         if speed > 0:
             GPIO.output(self.BIN1, GPIO.HIGH)
             GPIO.output(self.BIN2_PIN, GPIO.LOW)
@@ -82,3 +91,4 @@ class MotorController:
         
         # This will clean up motor AND servo pins
         GPIO.cleanup()
+        pwm_backend.cleanup()
@@ -0,0 +1,187 @@
+# ort_tuning.py
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+
+class OrtTuner:
+    """
+    Picks the ONNX Runtime provider / threading for the fire model on this machine.
+    - Candidates: CPU (+ XNNPACK when this ORT build has it) x thread count x spinning,
+      then ORT_PARALLEL with 2 inter-op threads on the best sequential config
+    - Each one runs WARMUP + RUNS inferences on live camera frames (synthetic without
+      a camera), one every FRAME_PERIOD like the robot loop. Process CPU time covers
+      the gaps too: pool threads spinning between frames compete with the loop
+    - Winner: least CPU per frame among the configs within LATENCY_SLACK of the
+      fastest, so vision leaves the control loop and PWM threads their share
+    - Result is cached next to the optimized graph (same model hash / ORT / CPU key)
+    """
+    RUNS = 20
+    WARMUP = 3
+    LATENCY_SLACK = 1.1   # Up to 10% slower is fine if it costs less CPU
+    MAX_THREADS = 4       # Pi 5 cores
+    FRAME_PERIOD = 0.1    # sec between detect() calls in the robot loop
+
+    def __init__(self, model_path, cpus=None, img_size=320):
+        self.model_path = model_path
+        self.cpus = sorted(cpus) if cpus else None
+        self.img_size = img_size
+        self.results = []   # (config, p50 ms, CPU ms per frame)
+
+    # --- Candidates ---
+    def _thread_counts(self):
+        limit = len(self.cpus) + 1 if self.cpus else min(self.MAX_THREADS, os.cpu_count() or 1)
+        return range(1, limit + 1)
+
+    def candidates(self):
+        from camera import XNNPACK
+        providers = ["CPUExecutionProvider"]
+        if XNNPACK in ort.get_available_providers():
+            providers.append(XNNPACK)
+        return [{"provider": provider, "threads": threads, "spin": spin, "parallel": False, "inter": 1}
+                for provider in providers for threads in self._thread_counts() for spin in (False, True)]
+
+    # --- Measurement ---
+    def _inputs(self, frames=None):
+        """Letterboxed model inputs from frames (BGR), or synthetic frames at camera resolution"""
+        from camera import letterbox, preprocess
+        size = self.img_size
+        shape = ort.InferenceSession(self.model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].shape
+        if isinstance(shape[2], int):
+            size = shape[2]   # Fixed-size model
+        if not frames:
+            print("[Tuning] No frames given: measuring on synthetic noise frames.")
+            rng = np.random.default_rng(0)
+            frames = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(4)]
+        return [preprocess(letterbox(f, (size, size))[0])[None, ...] for f in frames]
+
+    def measure(self, config, inputs):
+        from camera import _session_options, _providers
+        so = _session_options(ort.GraphOptimizationLevel.ORT_ENABLE_ALL, self.cpus, config)
+        session = ort.InferenceSession(self.model_path, sess_options=so, providers=_providers(config))
+        name = session.get_inputs()[0].name
+        for i in range(self.WARMUP):
+            session.run(None, {name: inputs[i % len(inputs)]})
+        latencies = []
+        cpu_start = time.process_time()
+        next_frame = time.perf_counter()
+        for i in range(self.RUNS):
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+            t0 = time.perf_counter()
+            session.run(None, {name: inputs[i % len(inputs)]})
+            latencies.append((time.perf_counter() - t0) * 1000)
+            next_frame = t0 + self.FRAME_PERIOD
+        time.sleep(max(0.0, next_frame - time.perf_counter()))   # The last gap counts too
+        cpu_ms = (time.process_time() - cpu_start) * 1000 / self.RUNS
+        return float(np.median(latencies)), cpu_ms
+
+    def pick(self):
+        fastest = min(p50 for _, p50, _ in self.results)
+        eligible = [r for r in self.results if r[1] <= fastest * self.LATENCY_SLACK]
+        return min(eligible, key=lambda r: r[2])
+
+    def tune(self, frames=None):
+        inputs = self._inputs(frames)
+        for config in self.candidates():
+            self._try(config, inputs)
+        if not self.results:
+            return None
+        best = min(self.results, key=lambda r: r[1])[0]
+        self._try(dict(best, parallel=True, inter=2), inputs)
+        return self.pick()
+
+    def _try(self, config, inputs):
+        try:
+            p50, cpu_ms = self.measure(config, inputs)
+        except Exception as e:
+            print(f"[Tuning] {describe(config)}: failed ({e})")
+            return
+        self.results.append((config, p50, cpu_ms))
+        print(f"[Tuning] {describe(config):<40} p50 {p50:7.2f}ms | CPU {cpu_ms:7.2f}ms/frame")
+
+    # --- Cache ---
+    def cache_path(self):
+        from camera import ORT_CACHE_DIR, _cache_key
+        _, key = _cache_key(self.model_path)
+        return os.path.join(ORT_CACHE_DIR, key + "-tune.json")
+
+    def context(self):
+        """What the measurement depends on besides the model / ORT / CPU type"""
+        return {"cpus": self.cpus, "img_size": self.img_size, "cores": os.cpu_count(),
+                "providers": ort.get_available_providers()}
+
+    def load(self):
+        try:
+            with open(self.cache_path()) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("context") != self.context():
+            return None
+        return data
+
+    def save(self, config, p50, cpu_ms):
+        from camera import ORT_CACHE_DIR
+        try:
+            os.makedirs(ORT_CACHE_DIR, exist_ok=True)
+            with open(self.cache_path(), "w") as f:
+                json.dump({"config": config, "p50_ms": p50, "cpu_ms": cpu_ms, "context": self.context()}, f)
+        except OSError as e:
+            print(f"[Tuning] Cache unavailable: {e}")
+
+
+def describe(config):
+    provider = "XNNPACK" if config["provider"] != "CPUExecutionProvider" else "CPU"
+    mode = f"parallel x{config['inter']}" if config["parallel"] else "sequential"
+    return f"{provider}, {config['threads']} thread(s), spin {'on' if config['spin'] else 'off'}, {mode}"
+
+
+def load_or_tune(model_path, cpus=None, img_size=320, retune=False, frames=None):
+    """
+    Cached tuning for this model / machine, measured on the first start. None if nothing ran.
+    frames: BGR frames, or a function returning them (only called when tuning runs).
+    """
+    tuner = OrtTuner(model_path, cpus, img_size)
+    cached = None if retune else tuner.load()
+    if cached is not None:
+        config = cached["config"]
+        print(f"[Camera] ORT config: {describe(config)} | p50 {cached['p50_ms']:.1f}ms, "
+              f"CPU {cached['cpu_ms']:.1f}ms/frame (cached)")
+        return config
+
+    print("[Camera] Tuning ONNX Runtime threading (first start only)...")
+    t0 = time.perf_counter()
+    if callable(frames):
+        frames = frames()
+    picked = tuner.tune(frames)
+    if picked is None:
+        print("[Camera] ORT tuning failed, using defaults.")
+        return None
+    config, p50, cpu_ms = picked
+    tuner.save(config, p50, cpu_ms)
+    print(f"[Camera] ORT config: {describe(config)} | p50 {p50:.1f}ms, CPU {cpu_ms:.1f}ms/frame "
+          f"(tuned in {time.perf_counter() - t0:.0f}s)")
+    return config
+
+
+if __name__ == "__main__":
+    import cv2
+
+    parser = argparse.ArgumentParser(description="ONNX Runtime provider / thread autotuning")
+    parser.add_argument("model", help="ONNX model file")
+    parser.add_argument("--frames", help="Folder of representative images (default: synthetic frames)")
+    parser.add_argument("--cpus", type=int, nargs="+", help="Vision cores, as VISION_CPUS in main.py")
+    parser.add_argument("--size", type=int, default=320, help="Model input size")
+    args = parser.parse_args()
+
+    frames = None
+    if args.frames:
+        paths = sorted(glob.glob(os.path.join(args.frames, "*")))[:16]
+        frames = [f for f in (cv2.imread(p) for p in paths) if f is not None]
+        print(f"[Tuning] {len(frames)} frames from {args.frames}")
+    load_or_tune(args.model, set(args.cpus) if args.cpus else None, args.size, retune=True, frames=frames)
@@ -1,6 +1,8 @@
 # pump.py
 import RPi.GPIO as GPIO
+import threading
 import time
+import pwm_backend
 
 class PumpController:
     # --- [NEW] Pin definitions (BCM) for TB6612FNG ---
@@ -17,6 +19,15 @@ class PumpController:
     
     PWM_FREQ = 100 # PWM Frequency (100Hz is fine)
     PUMP_SPEED = 100 # Default pump speed (0-100%)
+    
+    # Soft-start: ramp the duty instead of a full-current step (less inrush, no hose kick)
+    SOFT_START_DUTY = 40 # %
+    SOFT_START_TIME = 0.15 # sec
+    SOFT_START_STEPS = 5
+    
+    # Water Budget
+    FLOW_ML_PER_S = 40.0 # Measured flow at 100% duty
+    TANK_ML = 1000.0
 
     def __init__(self):
         """Initialize pump controller using RPi.GPIO for TB6612FNG"""
@@ -24,11 +35,10 @@ class PumpController:
         
         GPIO.setup(self.PUMP_IN1, GPIO.OUT)
         GPIO.setup(self.PUMP_IN2, GPIO.OUT)
-        GPIO.setup(self.PUMP_PWM, GPIO.OUT) 
         GPIO.setup(self.PUMP_STBY, GPIO.OUT) # [NEW] Setup STBY pin
         
-        # [NEW] Create PWM instance
-        self.pwm = GPIO.PWM(self.PUMP_PWM, self.PWM_FREQ)
+        # [NEW] Create PWM instance (shared PWM backend)
+        self.pwm = pwm_backend.open_pwm(self.PUMP_PWM, self.PWM_FREQ)
         self.pwm.start(0) # Start with 0% duty cycle
         
         # Enable the driver
@@ -37,25 +47,98 @@ class PumpController:
         # Start with pump off
         GPIO.output(self.PUMP_IN1, GPIO.LOW)
         GPIO.output(self.PUMP_IN2, GPIO.LOW)
+        self.is_on = False
+        
+        # Duty is integrated over time into water use
+        self.lock = threading.Lock()
+        self.duty = 0.0
+        self.duty_since = time.monotonic()
+        self.used_ml = 0.0
+        self.on_seconds = 0.0
+        self.writes = 0 # GPIO / PWM writes (for metrics)
+        self.ramp_stop = threading.Event()
+        self.ramp_thread = None
+        # pump_on / pump_off come from the loop and the watchdog thread
+        self.switch_lock = threading.Lock()
         
         print(f"PumpController initialized (using TB6612FNG pins {self.PUMP_IN1}, {self.PUMP_IN2}, PWM:{self.PUMP_PWM}).")
 
+    def _set_duty(self, duty):
+        with self.lock:
+            now = time.monotonic()
+            self.used_ml += self.FLOW_ML_PER_S * self.duty / 100.0 * (now - self.duty_since)
+            if self.duty > 0:
+                self.on_seconds += now - self.duty_since
+            self.duty = duty
+            self.duty_since = now
+            self.pwm.ChangeDutyCycle(duty)
+            self.writes += 1
+
+    def _ramp(self):
+        step_time = self.SOFT_START_TIME / self.SOFT_START_STEPS
+        for i in range(1, self.SOFT_START_STEPS + 1):
+            if self.ramp_stop.wait(step_time):
+                return
+            self._set_duty(self.SOFT_START_DUTY + (self.PUMP_SPEED - self.SOFT_START_DUTY) * i / self.SOFT_START_STEPS)
+
     def pump_on(self):
-        """Turn the pump on (e.g., Forward) at the set speed."""
-        GPIO.output(self.PUMP_IN1, GPIO.HIGH)
-        GPIO.output(self.PUMP_IN2, GPIO.LOW)
-        self.pwm.ChangeDutyCycle(self.PUMP_SPEED) # Set PWM speed
+        """Turn the pump on (e.g., Forward), soft-starting to the set speed. No-op if already on."""
+        with self.switch_lock:
+            if self.is_on:
+                return
+            GPIO.output(self.PUMP_IN1, GPIO.HIGH)
+            GPIO.output(self.PUMP_IN2, GPIO.LOW)
+            self.writes += 2
+            self.is_on = True
+            if self.SOFT_START_TIME > 0 and self.SOFT_START_DUTY < self.PUMP_SPEED:
+                self._set_duty(self.SOFT_START_DUTY)
+                self.ramp_stop.clear()
+                self.ramp_thread = threading.Thread(target=self._ramp, daemon=True)
+                self.ramp_thread.start()
+            else:
+                self._set_duty(self.PUMP_SPEED)
 
     def pump_off(self):
         """Turn the pump off (Stop/Brake)."""
-        GPIO.output(self.PUMP_IN1, GPIO.LOW) # Use LOW/LOW for coast (less stress)
-        GPIO.output(self.PUMP_IN2, GPIO.LOW)
-        self.pwm.ChangeDutyCycle(0) # Set PWM speed to 0
+        with self.switch_lock:
+            self.ramp_stop.set()
+            if self.ramp_thread is not None:
+                self.ramp_thread.join()
+                self.ramp_thread = None
+            GPIO.output(self.PUMP_IN1, GPIO.LOW) # Use LOW/LOW for coast (less stress)
+            GPIO.output(self.PUMP_IN2, GPIO.LOW)
+            self.writes += 2
+            self._set_duty(0) # Set PWM speed to 0
+            self.is_on = False
+
+    @property
+    def water_used(self):
+        """ml pumped since start (or the last refill)"""
+        with self.lock:
+            return self.used_ml + self.FLOW_ML_PER_S * self.duty / 100.0 * (time.monotonic() - self.duty_since)
+
+    @property
+    def on_time(self):
+        """Seconds the pump has been running since start"""
+        with self.lock:
+            running = time.monotonic() - self.duty_since if self.duty > 0 else 0.0
+            return self.on_seconds + running
+
+    @property
+    def water_left(self):
+        return max(0.0, self.TANK_ML - self.water_used)
+
+    def refill(self):
+        """Tank filled up again (operator: SELECT in Manual Mode)"""
+        with self.lock:
+            self.used_ml = 0.0
+            self.duty_since = time.monotonic()
 
     def cleanup(self):
         """Stops the pump and PWM."""
         print("Cleaning up Pump (TB6612FNG)...")
         self.pump_off()
+        print(f"Pump water used: {self.water_used:.0f}ml of {self.TANK_ML:.0f}ml.")
         self.pwm.stop() 
         GPIO.output(self.PUMP_STBY, GPIO.LOW) # Disable driver
         # GPIO.cleanup() will be called by motor_ctrl in main.py
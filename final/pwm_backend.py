@@ -0,0 +1,244 @@
+# pwm_backend.py
+import argparse
+import os
+import time
+
+# --- Hardware PWM (Pi 5, RP1 PWM0) ---
+# Needs the pins in PWM mode, e.g. in /boot/firmware/config.txt:
+#   dtoverlay=pwm-2chan,pin=12,func=4,pin2=19,func2=4
+HW_PWM_CHANNELS = {12: 0, 13: 1, 18: 2, 19: 3}   # BCM pin -> PWM0 channel
+HW_PWM_DEVICE = "1f00098000.pwm"                 # RP1 PWM0 in the device tree
+SYSFS_PWM = "/sys/class/pwm"
+
+
+class HardwarePWM:
+    """PWM0 channel through sysfs. Pulses come from the RP1 PWM block, no userspace thread."""
+    is_hardware = True
+
+    def __init__(self, chip_path, channel, pin, freq):
+        self.pin = pin
+        self.path = os.path.join(chip_path, f"pwm{channel}")
+        if not os.path.exists(self.path):
+            with open(os.path.join(chip_path, "export"), "w") as f:
+                f.write(str(channel))
+            # udev needs a moment to fix the permissions
+            for _ in range(50):
+                if os.access(os.path.join(self.path, "enable"), os.W_OK):
+                    break
+                time.sleep(0.01)
+        self.period_ns = 0
+        self.duty = 0.0
+        # Keep the duty file open: one pwrite per change
+        self.duty_fd = os.open(os.path.join(self.path, "duty_cycle"), os.O_WRONLY)
+        self._write("duty_cycle", 0)
+        self.ChangeFrequency(freq)
+
+    def _write(self, name, value):
+        if name == "duty_cycle":
+            os.pwrite(self.duty_fd, str(int(value)).encode(), 0)
+            return
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(str(int(value)))
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+        self._write("enable", 1)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = max(0.0, min(100.0, duty))
+        self._write("duty_cycle", self.period_ns * self.duty / 100.0)
+
+    def ChangeFrequency(self, freq):
+        period_ns = int(1e9 / freq)
+        # duty_cycle must stay <= period while changing
+        self._write("duty_cycle", 0)
+        self._write("period", period_ns)
+        self.period_ns = period_ns
+        self.ChangeDutyCycle(self.duty)
+
+    def stop(self):
+        self._write("duty_cycle", 0)
+        self._write("enable", 0)
+        os.close(self.duty_fd)
+
+
+class LgpioPWM:
+    """lgpio timed PWM: all channels share lgpio's single timing thread."""
+    is_hardware = False
+
+    def __init__(self, handle, pin, freq):
+        import lgpio
+        self.lgpio = lgpio
+        self.h = handle
+        self.pin = pin
+        self.freq = freq
+        self.duty = 0.0
+        lgpio.gpio_claim_output(self.h, pin, 0)
+
+    def _apply(self):
+        self.lgpio.tx_pwm(self.h, self.pin, self.freq, self.duty)
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = max(0.0, min(100.0, duty))
+        self._apply()
+
+    def ChangeFrequency(self, freq):
+        self.freq = freq
+        self._apply()
+
+    def stop(self):
+        self.lgpio.tx_pwm(self.h, self.pin, 0, 0)
+        self.lgpio.gpio_free(self.h, self.pin)
+
+
+class RPiGPIOPWM:
+    """Old behaviour: one RPi.GPIO software PWM thread per channel."""
+    is_hardware = False
+
+    def __init__(self, pin, freq):
+        import RPi.GPIO as GPIO
+        GPIO.setup(pin, GPIO.OUT)
+        self.pin = pin
+        self.pwm = GPIO.PWM(pin, freq)
+
+    def start(self, duty):
+        self.pwm.start(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.pwm.ChangeDutyCycle(duty)
+
+    def ChangeFrequency(self, freq):
+        self.pwm.ChangeFrequency(freq)
+
+    def stop(self):
+        self.pwm.stop()
+
+
+class PWMBackend:
+    """
+    One place that hands out PWM channels (same methods as RPi.GPIO.PWM).
+    - Pins 12/13/18/19 -> Pi 5 hardware PWM (if enabled in config.txt)
+    - Other pins       -> lgpio timed PWM
+    - Fallback         -> RPi.GPIO software PWM
+    """
+    def __init__(self, mode="auto"):
+        self.mode = mode
+        self.h = None
+        self.hw_chip = self._find_hw_chip() if mode == "auto" else None
+        self.channels = []
+
+        if mode in ("auto", "lgpio"):
+            try:
+                import lgpio
+                # gpiochip0 on RPi 5 kernels >= 6.6, gpiochip4 on older ones
+                for chip in (0, 4):
+                    try:
+                        self.h = lgpio.gpiochip_open(chip)
+                        break
+                    except Exception:
+                        continue
+            except ImportError:
+                print("[PWM] lgpio not installed, using RPi.GPIO software PWM.")
+
+    def _find_hw_chip(self):
+        if not os.path.isdir(SYSFS_PWM):
+            return None
+        for name in sorted(os.listdir(SYSFS_PWM)):
+            chip = os.path.join(SYSFS_PWM, name)
+            if HW_PWM_DEVICE in os.path.realpath(os.path.join(chip, "device")):
+                return chip
+        return None
+
+    def open(self, pin, freq):
+        channel = None
+        if self.hw_chip and pin in HW_PWM_CHANNELS:
+            try:
+                channel = HardwarePWM(self.hw_chip, HW_PWM_CHANNELS[pin], pin, freq)
+            except OSError as e:
+                print(f"[PWM] Hardware PWM on pin {pin} unavailable ({e}).")
+        if channel is None and self.h is not None:
+            channel = LgpioPWM(self.h, pin, freq)
+        if channel is None:
+            channel = RPiGPIOPWM(pin, freq)
+        self.channels.append(channel)
+        print(f"[PWM] Pin {pin} @ {freq}Hz -> {type(channel).__name__}")
+        return channel
+
+    def cleanup(self):
+        if self.h is not None:
+            import lgpio
+            lgpio.gpiochip_close(self.h)
+            self.h = None
+
+
+_backend = None
+
+def open_pwm(pin, freq):
+    """Shared backend for all controllers"""
+    global _backend
+    if _backend is None:
+        _backend = PWMBackend()
+    return _backend.open(pin, freq)
+
+def cleanup():
+    """Call after every controller stopped its channels"""
+    global _backend
+    if _backend is not None:
+        _backend.cleanup()
+        _backend = None
+
+
+# ---------------------------------------------------------
+# CPU Usage Comparison (same six channels as the robot)
+# Tool only: no numbers have been recorded yet. Run it on the Pi
+# (python pwm_backend.py) before relying on the backend choice for CPU headroom.
+# ---------------------------------------------------------
+
+ROBOT_CHANNELS = [  # pin, freq, duty
+    (22, 1000, 30), (26, 1000, 30),   # Motors A/B
+    (20, 100, 100),                   # Pump
+    (16, 1500, 50),                   # Buzzer
+    (12, 50, 7.5), (19, 50, 4.2),     # Servos Pan/Tilt
+]
+
+def measure_cpu(mode, seconds):
+    if mode == "rpigpio":
+        import RPi.GPIO as GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+    backend = PWMBackend(mode)
+    channels = [backend.open(pin, freq) for pin, freq, _ in ROBOT_CHANNELS]
+    for ch, (_, _, duty) in zip(channels, ROBOT_CHANNELS):
+        ch.start(duty)
+
+    t0, c0 = time.monotonic(), os.times()
+    time.sleep(seconds)
+    t1, c1 = time.monotonic(), os.times()
+
+    for ch in channels:
+        ch.stop()
+    backend.cleanup()
+    if mode == "rpigpio":
+        GPIO.cleanup()
+
+    cpu = (c1.user - c0.user) + (c1.system - c0.system)
+    return cpu / (t1 - t0) * 100.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PWM backend CPU comparison")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--modes", nargs="+", default=["rpigpio", "lgpio", "auto"])
+    args = parser.parse_args()
+
+    print(f">>> PWM CPU usage, {len(ROBOT_CHANNELS)} channels, {args.seconds:.0f}s each <<<")
+    for mode in args.modes:
+        try:
+            usage = measure_cpu(mode, args.seconds)
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"{mode:<8}: unavailable ({e})")
+            continue
+        print(f"{mode:<8}: {usage:6.1f}% of one core")
@@ -0,0 +1,475 @@
+# recorder.py
+import argparse
+import contextlib
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import struct
+import time
+
+import robot_modes
+from aim_calibration import AimTable
+from ballistics import BallisticModel
+from search_planner import SearchPlanner
+from spray_planner import SprayPlanner
+
+# --- Log Format ---
+# MAGIC, marshal(header), then events: channel index (1 byte) + marshal(payload)
+#   input event:  (args, value)  value handed to the controller
+#   output event: args           actuator command (diffed on replay)
+MAGIC = b"FRLOG1\n"
+CHANNEL = struct.Struct("<B")
+
+# What crosses the controller boundary, per run_robot_loop argument:
+# calls / attrs = inputs (recorded, fed back on replay), commands = actuator outputs (diffed),
+# ignore = passed through while recording, no-ops on replay (telemetry)
+DEVICES = {
+    "motor":    {"commands": ("set_left_motor", "set_right_motor", "stop_all")},
+    "joy":      {"calls": ("get_axes", "get_button_state")},
+    "servo":    {"calls": ("pose_at",), "attrs": ("current_pan_angle", "current_tilt_angle"),
+                 "commands": ("set_angle",)},
+    "pump":     {"attrs": ("water_left", "water_used", "is_on"), "commands": ("pump_on", "pump_off", "refill")},
+    "sensor":   {"calls": ("is_fire_detected",)},
+    "fx":       {"commands": ("play",)},
+    "camera":   {"calls": ("detect",), "attrs": ("last_detection", "last_frame_time", "last_box")},
+    "teleop":   {"calls": ("get_axes", "get_button_state"), "attrs": ("active", "client_rtt_ms"),
+                 "ignore": ("publish", "publish_config")},
+    "config":   {"calls": ("apply_pending",), "ignore": ("active", "version")},
+    "watchdog": {"commands": ("beat",)},   # One beat per tick: also the tick marker
+}
+LOOP_ARGS = ("motor", "joy", "servo", "pump", "sensor", "fx", "camera", "teleop", "config", "watchdog")
+TICK = "watchdog.beat"
+
+
+def _channels():
+    names = ["clock.time"]
+    for device, spec in DEVICES.items():
+        for kind in ("calls", "attrs", "commands"):
+            names += [f"{device}.{name}" for name in spec.get(kind, ())]
+    return names
+
+
+CHANNELS = _channels()
+OUTPUTS = {f"{d}.{n}" for d, spec in DEVICES.items() for n in spec.get("commands", ())}
+
+
+def _plain(value):
+    """Marshal-safe copy: numpy scalars -> Python numbers, Effects -> name"""
+    if isinstance(value, (bool, int, float, str, type(None))):
+        return value
+    if isinstance(value, (tuple, list)):
+        return tuple(_plain(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if hasattr(value, "item"):
+        return value.item()
+    return getattr(value, "name", repr(value))
+
+
+def _call_args(args, kwargs):
+    """Logged form of a call's arguments"""
+    return (_plain(args), _plain(kwargs)) if kwargs else _plain(args)
+
+
+def _constants(obj):
+    """BUTTON_* / *_PIN style class constants the loop reads"""
+    return {name: getattr(obj, name) for name in dir(obj)
+            if name.isupper() and isinstance(getattr(obj, name), (int, float, str))}
+
+
+def _modes_state():
+    """Tunables + state of robot_modes at the start of the session"""
+    state = {name: value for name, value in vars(robot_modes).items()
+             if not name.startswith("_") and isinstance(value, (bool, int, float, str, type(None)))}
+    table = robot_modes.aim_table
+    aim = {"samples": table.samples, "grid": table.grid,
+           "calib_offset_x": table.calib_offset_x, "calib_offset_y": table.calib_offset_y,
+           "offset_x": table.offset_x, "offset_y": table.offset_y}
+    return _plain(state), _plain(aim), _plain(robot_modes.ballistics.to_dict())
+
+
+# ---------------------------------------------------------
+# Recording
+# ---------------------------------------------------------
+
+class _RecordingProxy:
+    def __init__(self, recorder, device, target):
+        self._recorder = recorder
+        self._device = device
+        self._target = target
+        self._spec = DEVICES[device]
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        channel = f"{self._device}.{name}"
+        if name in self._spec.get("attrs", ()):
+            value = _plain(value)
+            self._recorder.write(channel, ((), value))
+            return value
+        if name in self._spec.get("calls", ()):
+            def call(*args, **kwargs):
+                result = _plain(value(*args, **kwargs))
+                self._recorder.write(channel, (_call_args(args, kwargs), result))
+                return result
+            return call
+        if name in self._spec.get("commands", ()):
+            def command(*args, **kwargs):
+                self._recorder.write(channel, _call_args(args, kwargs))
+                return value(*args, **kwargs)
+            return command
+        if name in self._spec.get("ignore", ()) and callable(value):
+            # Telemetry reads the real devices, not the proxies (nothing extra in the log)
+            return lambda *args: value(*[a._target if isinstance(a, _RecordingProxy) else a for a in args])
+        return value
+
+
+class _RecordingConfig(_RecordingProxy):
+    """Logs which robot_modes values each apply_pending() changed"""
+    def apply_pending(self):
+        before, _ = _modes_state()
+        applied = self._target.apply_pending()
+        changes = None
+        if applied:
+            after, _ = _modes_state()
+            changes = {k: v for k, v in after.items() if before.get(k) != v}
+        self._recorder.write("config.apply_pending", ((), changes))
+        return applied
+
+
+class _RecordingClock:
+    """Stands in for robot_modes.time"""
+    def __init__(self, recorder, base):
+        self._recorder = recorder
+        self._base = base
+
+    def time(self):
+        now = self._base.time()
+        self._recorder.write("clock.time", ((), now))
+        return now
+
+    def __getattr__(self, name):
+        return getattr(self._base, name)
+
+
+class Recorder:
+    """
+    Logs every input run_robot_loop reads (joystick, sensor, detections, clock...)
+    and every actuator command it issues to a compact binary file.
+    wrap_loop_args() -> proxies to pass to run_robot_loop instead of the devices.
+    """
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.path = path
+        self.file = open(path, "wb")
+        self.index = {name: i for i, name in enumerate(CHANNELS)}
+        self.events = 0
+        self.ticks = 0
+        self.saved_time = None
+
+    @classmethod
+    def in_folder(cls, folder):
+        return cls(os.path.join(folder, time.strftime("session-%Y%m%d-%H%M%S.frlog")))
+
+    def wrap_loop_args(self, *args):
+        wrapped = []
+        devices = {}
+        for device, obj in zip(LOOP_ARGS, args):
+            if obj is None:
+                wrapped.append(None)
+                continue
+            devices[device] = _constants(obj)
+            proxy_class = _RecordingConfig if device == "config" else _RecordingProxy
+            wrapped.append(proxy_class(self, device, obj))
+
+        state, aim, ballistics = _modes_state()
+        header = {"channels": CHANNELS, "devices": devices, "state": state, "aim_table": aim,
+                  "ballistics": ballistics,
+                  "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self.file.write(MAGIC)
+        marshal.dump(header, self.file)
+
+        self.saved_time = robot_modes.time
+        robot_modes.time = _RecordingClock(self, robot_modes.time)
+        print(f"[Recorder] Recording session to {self.path}")
+        return wrapped
+
+    def write(self, channel, payload):
+        self.file.write(CHANNEL.pack(self.index[channel]))
+        marshal.dump(payload, self.file)
+        self.events += 1
+        if channel == TICK:
+            self.ticks += 1
+            self.file.flush()
+
+    def close(self):
+        if self.saved_time is not None:
+            robot_modes.time = self.saved_time
+            self.saved_time = None
+        if not self.file.closed:
+            self.file.close()
+            size = os.path.getsize(self.path)
+            print(f"[Recorder] {self.ticks} ticks, {self.events} events, {size / 1024:.1f}KB "
+                  f"({size / max(self.ticks, 1):.0f} bytes/tick) -> {self.path}")
+
+
+# ---------------------------------------------------------
+# Replay
+# ---------------------------------------------------------
+
+class ReplayFinished(Exception):
+    """The loop asked for an input past the end of the log"""
+
+
+class ReplayDiverged(Exception):
+    """The loop asked for a different input than the recorded one (control flow changed)"""
+
+
+def read_log(path):
+    """-> header, iterator of (channel name, payload). A truncated last event is dropped."""
+    f = open(path, "rb")
+    if f.read(len(MAGIC)) != MAGIC:
+        f.close()
+        raise ValueError(f"{path} is not a session log")
+    header = marshal.load(f)
+    channels = header["channels"]
+
+    def events():
+        with f:
+            while True:
+                raw = f.read(CHANNEL.size)
+                if len(raw) < CHANNEL.size:
+                    return
+                try:
+                    payload = marshal.load(f)
+                except (EOFError, ValueError):
+                    return
+                yield channels[CHANNEL.unpack(raw)[0]], payload
+
+    return header, events()
+
+
+class _ReplaySession:
+    def __init__(self, path):
+        self.header, self.events = read_log(path)
+        self.expected = []   # (tick, channel, args) from the log
+        self.actual = []     # (tick, channel, args) issued during replay
+        self.log_tick = 0
+        self.tick = 0
+        self.inputs = 0
+        self.arg_mismatches = []
+
+    def next_input(self, channel, args):
+        for name, payload in self.events:
+            if name in OUTPUTS:
+                self.expected.append((self.log_tick, name, payload))
+                if name == TICK:
+                    self.log_tick += 1
+                continue
+            if name != channel:
+                raise ReplayDiverged(f"tick {self.tick}: loop read {channel}, log has {name}")
+            self.inputs += 1
+            recorded_args, value = payload
+            if recorded_args != args and len(self.arg_mismatches) < 10:
+                self.arg_mismatches.append((self.tick, channel, recorded_args, args))
+            return value
+        raise ReplayFinished()
+
+    def output(self, channel, args):
+        self.actual.append((self.tick, channel, args))
+        if channel == TICK:
+            self.tick += 1
+
+
+class _ReplayProxy:
+    def __init__(self, session, device, constants):
+        self._session = session
+        self._device = device
+        self._spec = DEVICES[device]
+        self.__dict__.update(constants)
+
+    def __getattr__(self, name):
+        channel = f"{self._device}.{name}"
+        if name in self._spec.get("attrs", ()):
+            return self._session.next_input(channel, ())
+        if name in self._spec.get("calls", ()):
+            return lambda *args, **kwargs: self._session.next_input(channel, _call_args(args, kwargs))
+        if name in self._spec.get("commands", ()):
+            return lambda *args, **kwargs: self._session.output(channel, _call_args(args, kwargs))
+        return lambda *args, **kwargs: None
+
+
+class _ReplayConfig(_ReplayProxy):
+    version = 0
+    active = {}
+
+    def apply_pending(self):
+        changes = self._session.next_input("config.apply_pending", ())
+        for attr, value in (changes or {}).items():
+            setattr(robot_modes, attr, value)
+        return bool(changes)
+
+
+class _ReplayClock:
+    def __init__(self, session):
+        self._session = session
+
+    def time(self):
+        return self._session.next_input("clock.time", ())
+
+    def sleep(self, seconds):
+        pass
+
+
+def _restore_modes(header):
+    for name, value in header["state"].items():
+        setattr(robot_modes, name, value)
+    aim = header["aim_table"]
+    table = AimTable()
+    table.samples = [list(s) for s in aim["samples"]]
+    table.grid = [[tuple(v) for v in row] for row in aim["grid"]] if aim["grid"] else None
+    for key in ("calib_offset_x", "calib_offset_y", "offset_x", "offset_y"):
+        setattr(table, key, aim[key])
+    table.save = lambda *args, **kwargs: None   # Replays never touch the calibration file
+    robot_modes.aim_table = table
+    robot_modes.ballistics = BallisticModel.from_dict(header.get("ballistics", {}))
+    robot_modes.search_planner = SearchPlanner()
+    robot_modes.spray_planner = SprayPlanner()
+
+
+def replay(path, profile=False):
+    """Feed a session log through run_robot_loop as fast as possible -> session with both command lists"""
+    session = _ReplaySession(path)
+    devices = session.header["devices"]
+    args = []
+    for device in LOOP_ARGS:
+        if device not in devices:
+            args.append(None)
+        else:
+            proxy_class = _ReplayConfig if device == "config" else _ReplayProxy
+            args.append(proxy_class(session, device, devices[device]))
+
+    saved = {name: getattr(robot_modes, name) for name in
+             list(session.header["state"]) + ["time", "aim_table", "ballistics", "search_planner", "spray_planner"]}
+    _restore_modes(session.header)
+    robot_modes.time = _ReplayClock(session)
+
+    profiler = cProfile.Profile() if profile else None
+    session.error = None
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if profiler:
+                profiler.enable()
+            try:
+                robot_modes.run_robot_loop(*args)
+            except ReplayFinished:
+                pass
+            except ReplayDiverged as e:
+                session.error = str(e)
+            finally:
+                if profiler:
+                    profiler.disable()
+    finally:
+        session.wall_time = time.perf_counter() - t0
+        for name, value in saved.items():
+            setattr(robot_modes, name, value)
+    # Whatever is left in the log after the last input
+    for name, payload in session.events:
+        if name in OUTPUTS:
+            session.expected.append((session.log_tick, name, payload))
+    session.profiler = profiler
+    return session
+
+
+def diff(session, show=10):
+    """Compare the replayed actuator commands with the recorded ones -> number of differences"""
+    # Commands issued after the last recorded input did not make it into the log
+    actual = session.actual[:len(session.expected)]
+    mismatches = [(e, a) for e, a in zip(session.expected, actual) if e[1:] != a[1:]]
+    missing = len(session.expected) - len(actual)
+
+    print(f"[Replay] {session.tick} ticks, {session.inputs} inputs, {len(session.expected)} commands "
+          f"in {session.wall_time:.2f}s")
+    for tick, channel, recorded, replayed in session.arg_mismatches:
+        print(f"[Replay] tick {tick}: {channel} asked with {replayed}, recorded {recorded}")
+    if session.error:
+        print(f"[Replay] DIVERGED: {session.error}")
+    for (tick, channel, recorded), (_, channel_now, replayed) in mismatches[:show]:
+        print(f"[Replay] tick {tick}: recorded {channel}{recorded} | replay {channel_now}{replayed}")
+    if missing > 0:
+        print(f"[Replay] {missing} recorded commands were never issued")
+    differences = len(mismatches) + max(missing, 0) + (1 if session.error else 0)
+    print(f"[Replay] {'IDENTICAL' if differences == 0 else f'{differences} DIFFERENCES'}")
+    return differences
+
+
+# ---------------------------------------------------------
+# Simulated Session (a log without the robot)
+# ---------------------------------------------------------
+
+class _SimStop(Exception):
+    pass
+
+
+class _SimTicker:
+    """Watchdog stand-in for the simulator: loop overhead per tick, stops after 'seconds'"""
+    def __init__(self, clock, seconds):
+        self.clock = clock
+        self.end = clock.time() + seconds
+
+    def beat(self):
+        self.clock.sleep(0.005)
+        if self.clock.time() >= self.end:
+            raise _SimStop()
+
+
+def record_sim(path, seconds, seed):
+    """Record run_robot_loop driving the simulated world (fake_hw) in automatic mode"""
+    import fake_hw
+    import simulator
+
+    scenario = simulator.make_scenario(seed)
+    world = fake_hw.SimWorld([fake_hw.Flame(**f) for f in scenario["flames"]], seed=seed)
+    clock = fake_hw.SimClock(world)
+    null = fake_hw.NullDevice()
+    devices = (fake_hw.SimMotor(world), null, fake_hw.SimServo(world, clock), fake_hw.SimPump(world),
+               fake_hw.SimFireSensor(world), null, fake_hw.SimCamera(world, clock), None, None,
+               _SimTicker(clock, seconds))
+
+    saved_time = robot_modes.time
+    simulator.reset_modes({}, clock)
+    rec = Recorder(path)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            robot_modes.run_robot_loop(*rec.wrap_loop_args(*devices))
+    except _SimStop:
+        pass
+    finally:
+        rec.close()
+        robot_modes.time = saved_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session record / deterministic replay of run_robot_loop")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("replay", help="Replay a log and diff the actuator commands (exit 1 on differences)")
+    p.add_argument("log")
+    p.add_argument("--profile", action="store_true", help="cProfile the replayed loop")
+    p = sub.add_parser("record-sim", help="Record a simulated automatic-mode session")
+    p.add_argument("log")
+    p.add_argument("--seconds", type=float, default=30.0)
+    p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "record-sim":
+        record_sim(args.log, args.seconds, args.seed)
+    else:
+        session = replay(args.log, args.profile)
+        differences = diff(session)
+        if session.profiler:
+            pstats.Stats(session.profiler).sort_stats("cumulative").print_stats(15)
+        raise SystemExit(1 if differences else 0)
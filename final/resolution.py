@@ -0,0 +1,108 @@
+# resolution.py
+import time
+
+
+class ResolutionScaler:
+    """
+    Picks the model input size for the next frame (dynamic-shape ONNX models only).
+    - Searching: largest size whose latency fits SEARCH_TARGET_MS (see small flames)
+    - Tracking a locked target: largest size that fits TRACK_TARGET_MS (high frame rate)
+    - Latency is tracked as a rolling cost per input pixel, so a throttled
+      (or recovered) Pi shows up in the estimate for every size at once
+    - Switches are logged, time spent at each size is kept for report()
+    """
+    LADDER = (192, 256, 320)
+    SEARCH_TARGET_MS = 120.0
+    TRACK_TARGET_MS = 60.0
+    LOCK_FRAMES = 3          # Consecutive detections before we call it locked
+    UNLOCK_FRAMES = 5        # Consecutive misses before we go back to searching
+    MIN_DWELL_S = 1.0        # No switching back and forth faster than this
+    HEADROOM = 0.9           # Estimated latency must be 10% under target to step up
+    EMA_ALPHA = 0.2
+
+    def __init__(self, start_size=320, ladder=None):
+        if ladder is not None:
+            self.LADDER = tuple(sorted(ladder))
+        self.size = start_size if start_size in self.LADDER else self.LADDER[-1]
+        self.latency_ms = {}            # size -> rolling latency (for the report)
+        self.ms_per_pixel = None
+        self.time_at = {s: 0.0 for s in self.LADDER}
+        self.switches = []              # (time, old, new, reason)
+        self.locked = False
+        self.hits = 0
+        self.misses = 0
+        now = time.monotonic()
+        self.last_switch = now
+        self.last_update = now
+
+    def estimate(self, size):
+        if self.ms_per_pixel is None:
+            return None
+        return self.ms_per_pixel * size * size
+
+    def update(self, latency_ms, found):
+        """Feed one frame's inference latency; returns the size for the next frame"""
+        now = time.monotonic()
+        self.time_at[self.size] += now - self.last_update
+        self.last_update = now
+
+        prev = self.latency_ms.get(self.size)
+        self.latency_ms[self.size] = latency_ms if prev is None else prev + self.EMA_ALPHA * (latency_ms - prev)
+        per_pixel = latency_ms / (self.size * self.size)
+        if self.ms_per_pixel is None:
+            self.ms_per_pixel = per_pixel
+        else:
+            self.ms_per_pixel += self.EMA_ALPHA * (per_pixel - self.ms_per_pixel)
+
+        # Lock state with hysteresis
+        lock_changed = False
+        if found:
+            self.hits += 1
+            self.misses = 0
+            if not self.locked and self.hits >= self.LOCK_FRAMES:
+                self.locked = lock_changed = True
+        else:
+            self.misses += 1
+            self.hits = 0
+            if self.locked and self.misses >= self.UNLOCK_FRAMES:
+                self.locked = False
+                lock_changed = True
+
+        if not lock_changed and now - self.last_switch < self.MIN_DWELL_S:
+            return self.size
+
+        target = self.TRACK_TARGET_MS if self.locked else self.SEARCH_TARGET_MS
+        best = self.LADDER[0]
+        for size in self.LADDER:
+            est = self.estimate(size)
+            limit = target if size <= self.size else target * self.HEADROOM
+            if est is not None and est <= limit:
+                best = size
+
+        if best != self.size:
+            reason = (f"{'tracking' if self.locked else 'searching'}, "
+                      f"{self.latency_ms[self.size]:.1f}ms @ {self.size} vs target {target:.0f}ms")
+            self.switches.append((now, self.size, best, reason))
+            print(f"\n[Camera] Input size {self.size} -> {best} ({reason})")
+            self.size = best
+            self.last_switch = now
+        return self.size
+
+    def set_size(self, size):
+        """Config override: jump to this rung (must be on the LADDER), dwell starts over"""
+        now = time.monotonic()
+        self.time_at[self.size] += now - self.last_update
+        self.last_update = now
+        if size != self.size:
+            self.switches.append((now, self.size, size, "config"))
+            print(f"\n[Camera] Input size {self.size} -> {size} (config)")
+        self.size = size
+        self.last_switch = now
+
+    def report(self):
+        total = sum(self.time_at.values()) or 1.0
+        print(f"[Camera] Resolution switches: {len(self.switches)}")
+        for size in self.LADDER:
+            lat = self.latency_ms.get(size)
+            lat_txt = f"{lat:.1f}ms" if lat is not None else "-"
+            print(f"[Camera]   {size:4d}: {self.time_at[size]:7.1f}s ({self.time_at[size] / total * 100:5.1f}%) | latency {lat_txt}")
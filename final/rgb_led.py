@@ -1,6 +1,5 @@
 # rgb_led.py
 import RPi.GPIO as GPIO
-import time
 
 class RGBController:
     # Pin Definitions (BCM)
@@ -13,17 +12,20 @@ class RGBController:
         GPIO.setup(self.PIN_G, GPIO.OUT)
         GPIO.setup(self.PIN_B, GPIO.OUT)
         
-        self.last_blink_time = 0
-        self.blink_state = False
+        self.color = None # Last written (r, g, b)
+        self.writes = 0 # GPIO writes (for metrics)
         
         self.turn_off()
         print("RGBController Initialized (R:14, G:15, B:4).")
 
     def set_color(self, r, g, b):
-        """Set RGB color directly (1=ON, 0=OFF)"""
-        GPIO.output(self.PIN_R, GPIO.HIGH if r else GPIO.LOW)
-        GPIO.output(self.PIN_G, GPIO.HIGH if g else GPIO.LOW)
-        GPIO.output(self.PIN_B, GPIO.HIGH if b else GPIO.LOW)
+        """Set RGB color directly (1=ON, 0=OFF). Only pins that change are written."""
+        color = (bool(r), bool(g), bool(b))
+        for pin, on, was in zip((self.PIN_R, self.PIN_G, self.PIN_B), color, self.color or (None,) * 3):
+            if on != was:
+                GPIO.output(pin, GPIO.HIGH if on else GPIO.LOW)
+                self.writes += 1
+        self.color = color
 
     def set_manual_mode(self):
         """Blue for Manual Mode (Idle)"""
@@ -37,22 +39,6 @@ class RGBController:
         """Turn off all LEDs"""
         self.set_color(0, 0, 0)
 
-    def blink_red_effect(self):
-        """
-        Non-blocking Red Blink Effect (Fire Truck Style).
-        Must be called continuously in the loop.
-        """
-        current_time = time.time()
-        # Blink every 0.1 seconds
-        if current_time - self.last_blink_time > 0.1:
-            self.blink_state = not self.blink_state
-            self.last_blink_time = current_time
-        
-        if self.blink_state:
-            self.set_color(1, 0, 0) # Red ON
-        else:
-            self.set_color(0, 0, 0) # Red OFF
-
     def cleanup(self):
         self.turn_off()
         print("RGBController Cleaned up.")
\ No newline at end of file
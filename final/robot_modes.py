@@ -1,5 +1,10 @@
 # robot_modes.py
 import time
+import effects
+from search_planner import SearchPlanner
+from aim_calibration import AimTable
+from ballistics import BallisticModel
+from spray_planner import SprayPlanner
 
 # --- Constants ---
 MAX_SPEED = 30
@@ -9,10 +14,16 @@ START_BUTTON_ID = 7
 # AI Threshold (60%)
 AUTO_MIN_SCORE = 0.2
 
-# Pump Duration (3 Seconds)
-PUMP_DURATION = 3.0
+# Pump Bursts: short pulses, sensor + vision re-checked in the gaps.
+# A burst ends once the flame has been gone for PUMP_HOLD_TIME (or the tank is empty)
+PUMP_PULSE_ON = 0.5     # sec
+PUMP_PULSE_OFF = 0.3    # sec
+PUMP_HOLD_TIME = 1.0    # sec
+PUMP_MIN_SCORE = 0.3    # Vision confidence needed to start / keep a burst
 
 # Tracking Gains
+# (Error is applied to the pose at frame exposure, so the loop does not
+#  fight its own latency. Higher gains can be tried on the real turret.)
 PAN_GAIN = 15.0 
 TILT_GAIN = 15.0
 
@@ -22,33 +33,85 @@ NOZZLE_OFFSET_Y = 0.5
 
 NOZZLE_OFFSET_X = -0.07
 
+# Joystick trims (g_offset_x / y) stay within +- this
+TRIM_LIMIT = 0.3
+
+# Spray Sweep: zig-zag over the flame box while a burst runs (see spray_planner.py). 0 = centre only
+SPRAY_SWEEP = 1
+
+# One-shot Aiming (Calibrated Table): wait for the slew before aiming again
+AIM_SETTLE_TIME = 0.2
+
+# Approach: drive toward a tracked flame until it is within water range
+# (box width = distance proxy, pan angle = bearing). APPROACH_SPEED 0 = off
+APPROACH_SPEED = 25             # Cruise speed (%)
+APPROACH_STANDOFF_WIDTH = 0.14  # Box width (fraction of frame) at the stand-off distance (~1m)
+APPROACH_TURN_GAIN = 0.5        # Turn speed (%) per degree the turret is off straight ahead
+APPROACH_MAX_BEARING = 30.0     # Turn in place first when the flame is further off-axis
+APPROACH_ACCEL = 40.0           # Ramp (% per sec)
+APPROACH_FIRE_RATIO = 0.8       # Pump may fire once the box reaches this share of the stand-off width
+APPROACH_MIN_SCORE = 0.3        # Vision confidence needed to move the wheels (tracking needs only AUTO_MIN_SCORE)
+APPROACH_MIN_FRAMES = 3         # ...in this many consecutive frames, so one false positive never drives
+
 # ---------------------------------------------------------
 
 
-g_offset_x = NOZZLE_OFFSET_X   
-g_offset_y = NOZZLE_OFFSET_Y 
-pump_start_time = 0.0
+aim_table = AimTable.load()
+ballistics = BallisticModel.load()
+
+# Trims survive restarts (saved in the calibration file)
+g_offset_x = NOZZLE_OFFSET_X if aim_table.offset_x is None else aim_table.offset_x
+g_offset_y = NOZZLE_OFFSET_Y if aim_table.offset_y is None else aim_table.offset_y
+burst_start = None
+burst_confirm_time = 0.0
+aim_hold_until = 0.0
+tank_empty_logged = False
+last_select_btn = False
+search_planner = SearchPlanner()
+spray_planner = SprayPlanner()
+drive_speed = 0.0
+drive_time = 0.0
+approach_frames = 0
 
 def _clamp_value(value, min_val, max_val):
     return max(min(value, max_val), min_val)
 
-def handle_manual_mode(joy_ctrl, motor_ctrl, servo_ctrl, pump_ctrl, rgb_ctrl, buzz_ctrl, camera):
+def save_trims():
+    """Store the current joystick trims in the calibration file"""
+    if aim_table.offset_x == g_offset_x and aim_table.offset_y == g_offset_y:
+        return
+    aim_table.offset_x = g_offset_x
+    aim_table.offset_y = g_offset_y
+    try:
+        aim_table.save()
+        print(f"\n[Aim] Trims saved (X:{g_offset_x:.3f} Y:{g_offset_y:.3f}).")
+    except Exception as e:
+        print(f"\n[Aim] Trim Save Error: {e}")
+
+def handle_manual_mode(joy_ctrl, motor_ctrl, servo_ctrl, pump_ctrl, fx, camera):
     """
     [Manual Mode]
     - Camera: Shows everything > 50%
+    - SELECT: tank refilled (resets the water budget)
     """
+    global tank_empty_logged, last_select_btn
     # 1. Draw UI (Low threshold for manual visibility)
     camera.detect(sensor_active=False, min_score=0.50)
 
     # 2. Pump & Effect
     if joy_ctrl.get_button_state(joy_ctrl.BUTTON_L):
         pump_ctrl.pump_on()
-        buzz_ctrl.on()
-        rgb_ctrl.blink_red_effect()
+        fx.play(effects.FIRE_ALARM)
     else:
         pump_ctrl.pump_off()
-        buzz_ctrl.off()
-        rgb_ctrl.set_manual_mode() 
+        fx.play(effects.IDLE_MANUAL)
+
+    select = joy_ctrl.get_button_state(joy_ctrl.BUTTON_SELECT)
+    if select and not last_select_btn:
+        pump_ctrl.refill()
+        tank_empty_logged = False
+        print(f"\n[Pump] Tank refilled ({pump_ctrl.water_left:.0f}ml).")
+    last_select_btn = select
 
     # 3. Motor
     x_axis, y_axis = joy_ctrl.get_axes()
@@ -81,17 +144,15 @@ def handle_manual_mode(joy_ctrl, motor_ctrl, servo_ctrl, pump_ctrl, rgb_ctrl, bu
 
     return f"[MANUAL] Cam: ON | Motors: L{left_speed:.0f}/R{right_speed:.0f}"
 
-def handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, rgb_ctrl, buzz_ctrl, camera, joy_ctrl):
+def handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, fx, camera, joy_ctrl):
     """
     [Auto Mode]
     - Tracks fire with Manual Offset (Trim) Adjustment
     - Buttons X/B adjust Left/Right Offset
     - Buttons Y/A adjust Up/Down Offset
     """
-    global pump_start_time, g_offset_x, g_offset_y
+    global burst_start, burst_confirm_time, g_offset_x, g_offset_y, aim_hold_until, tank_empty_logged, approach_frames
 
-    motor_ctrl.stop_all()
-    
     # --- Real-time Offset Adjustment (Trim) ---
    
     if joy_ctrl.get_button_state(joy_ctrl.BUTTON_X): g_offset_x -= 0.005 # Left
@@ -100,8 +161,8 @@ def handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, rgb_ctrl
     if joy_ctrl.get_button_state(joy_ctrl.BUTTON_A): g_offset_y -= 0.005 # Down
 
     # Limit offsets
-    g_offset_x = _clamp_value(g_offset_x, -0.3, 0.3)
-    g_offset_y = _clamp_value(g_offset_y, -0.3, 0.3)
+    g_offset_x = _clamp_value(g_offset_x, -TRIM_LIMIT, TRIM_LIMIT)
+    g_offset_y = _clamp_value(g_offset_y, -TRIM_LIMIT, TRIM_LIMIT)
     
     # 1. Check Sensor & Time
     is_sensor_fire = fire_sens.is_fire_detected()
@@ -110,72 +171,198 @@ def handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, rgb_ctrl
     # 2. Vision Detection (>60%)
     found, cx, cy = camera.detect(sensor_active=is_sensor_fire, min_score=AUTO_MIN_SCORE)
     
-    # --- Pump Logic (3 Sec Hold) ---
-    if found and is_sensor_fire:
-        pump_start_time = current_time 
+    # --- Pump Logic (Bursts) ---
+    # With approach enabled, far flames are driven to instead of sprayed short
+    box = getattr(camera, "last_box", None)
+    # Water arc drops with range: aim higher for small (far) boxes
+    lead_y = ballistics.lead(box[3]) if found and box is not None else 0.0
+    aim_offset_y = g_offset_y + lead_y
+    in_range = APPROACH_SPEED <= 0 or box is None or box[2] >= APPROACH_STANDOFF_WIDTH * APPROACH_FIRE_RATIO
+    score = camera.last_detection[3] if found else 0.0
+    confirmed = found and is_sensor_fire and in_range and score >= PUMP_MIN_SCORE
+    approach_frames = approach_frames + 1 if found and score >= APPROACH_MIN_SCORE else 0
+    if confirmed:
+        burst_confirm_time = current_time
 
-    time_since_start = current_time - pump_start_time
-    is_shooting = time_since_start < PUMP_DURATION
+    if burst_start is None:
+        if confirmed and pump_ctrl.water_left > 0:
+            burst_start = current_time
+        elif confirmed and not tank_empty_logged:
+            print("\n[Pump] Tank empty: refill it, then press SELECT in Manual Mode.")
+            tank_empty_logged = True
+    elif current_time - burst_confirm_time > PUMP_HOLD_TIME or pump_ctrl.water_left <= 0:
+        print(f"\n[Pump] Burst done ({current_time - burst_start:.1f}s) | Water left {pump_ctrl.water_left:.0f}ml")
+        burst_start = None
+
+    is_shooting = burst_start is not None
 
     if is_shooting:
-        pump_ctrl.pump_on()
-        buzz_ctrl.on()
-        rgb_ctrl.blink_red_effect()
-        status_msg = f">>> SHOOTING! ({PUMP_DURATION - time_since_start:.1f}s) | Offset X:{g_offset_x:.2f} Y:{g_offset_y:.2f} <<<"
+        # Spray, then look again with the pump off
+        pulse_on = (current_time - burst_start) % (PUMP_PULSE_ON + PUMP_PULSE_OFF) < PUMP_PULSE_ON
+        if pulse_on:
+            pump_ctrl.pump_on()
+        else:
+            pump_ctrl.pump_off()
+        fx.play(effects.FIRE_ALARM)
+        status_msg = f">>> SHOOTING! ({'PULSE' if pulse_on else 'CHECK'}) | Water {pump_ctrl.water_left:.0f}ml | Offset X:{g_offset_x:.2f} Y:{g_offset_y:.2f} <<<"
     else:
         pump_ctrl.pump_off()
-        buzz_ctrl.off()
         if found:
-            rgb_ctrl.set_color(1, 1, 0) 
+            fx.play(effects.TRACKING)
             status_msg = f">>> Tracking... Offset[X:{g_offset_x:.2f} Y:{g_offset_y:.2f}] <<<"
         elif is_sensor_fire:
-            rgb_ctrl.set_auto_mode()
+            fx.play(effects.IDLE_AUTO)
             status_msg = ">>> SENSOR ACTIVE! (Searching...) <<<"
         else:
-            rgb_ctrl.set_auto_mode()
+            fx.play(effects.IDLE_AUTO)
             status_msg = f">>> Scanning... Offset[X:{g_offset_x:.2f} Y:{g_offset_y:.2f}] <<<"
 
     # 3. Visual Servoing (With Dynamic Offset)
-    if found:
+    # Pose the turret had when the frame was exposed, not the current one
+    frame_pan, frame_tilt = servo_ctrl.pose_at(camera.last_frame_time)
+    if found and spray_planner.active:
+        # Frame taken mid-sweep: track the pattern centre, not the swept pose
+        frame_pan, frame_tilt, cx, cy = spray_planner.unsweep(frame_pan, frame_tilt, cx, cy)
+
+    aim_pose = None
+    if found and aim_table.ready:
+        # One-shot: calibrated table already includes the nozzle offset,
+        # trims shift the target relative to the trims used while calibrating
+        if current_time >= aim_hold_until:
+            d_pan, d_tilt = aim_table.lookup(cx - (g_offset_x - aim_table.calib_offset_x),
+                                             cy - (aim_offset_y - aim_table.calib_offset_y))
+            new_pan = _clamp_value(frame_pan + d_pan, 0, 180)
+            new_tilt = _clamp_value(frame_tilt + d_tilt, 0, 180)
+            aim_pose = (new_pan, new_tilt)
+            aim_hold_until = current_time + AIM_SETTLE_TIME
+    elif found:
         # X Axis Target: Center(0.5) + Offset
         target_x = 0.5 + g_offset_x
         err_x = target_x - cx
         
         # Y Axis Target: Center(0.5) + Offset
-        target_y = 0.5 + g_offset_y
+        target_y = 0.5 + aim_offset_y
         err_y = target_y - cy
         
-        new_pan = servo_ctrl.current_pan_angle + (err_x * PAN_GAIN)
-        new_tilt = servo_ctrl.current_tilt_angle + (err_y * TILT_GAIN)
+        new_pan = frame_pan + (err_x * PAN_GAIN)
+        new_tilt = frame_tilt + (err_y * TILT_GAIN)
         
         new_pan = _clamp_value(new_pan, 0, 180)
         new_tilt = _clamp_value(new_tilt, 0, 180)
-        
-        servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, new_pan)
-        servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, new_tilt)
+        aim_pose = (new_pan, new_tilt)
+
+    # Shooting: the aim pose is the centre of a sweep over the flame box
+    if is_shooting and SPRAY_SWEEP:
+        if aim_pose is not None and box is not None:
+            spray_planner.recenter(aim_pose[0], aim_pose[1], box[2], box[3])
+        aim_pose = spray_planner.update(current_time, pulse_on) or aim_pose
+    elif spray_planner.active:
+        spray_planner.reset()
+
+    if aim_pose is not None:
+        servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, aim_pose[0])
+        servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, aim_pose[1])
+
+    # 4. Search Pattern (Nothing visible, not shooting)
+    # A burst counts as "seen": its pump-off check frames must not advance the
+    # sweep or mark cells searched that the camera never pointed at
+    search_pose = search_planner.update(current_time, servo_ctrl.current_pan_angle,
+                                        servo_ctrl.current_tilt_angle, found or is_shooting, is_sensor_fire)
+    if search_pose is not None:
+        servo_ctrl.set_angle(servo_ctrl.PAN_SERVO_PIN, search_pose[0])
+        servo_ctrl.set_angle(servo_ctrl.TILT_SERVO_PIN, search_pose[1])
+
+    # 5. Approach (only while a confirmed flame is in view and the pump is off)
+    tracking = found and not is_shooting and approach_frames >= APPROACH_MIN_FRAMES
+    if _drive_approach(motor_ctrl, servo_ctrl, camera, tracking, current_time):
+        status_msg += f" | APPROACH {drive_speed:.0f}%"
 
     return status_msg
 
-def run_robot_loop(motor_ctrl, joy_ctrl, servo_ctrl, pump_ctrl, fire_sens, rgb_ctrl, buzz_ctrl, camera):
+def _drive_approach(motor_ctrl, servo_ctrl, camera, tracking, now):
+    """
+    Drive toward the tracked flame, slowing down as its box grows to the stand-off size.
+    Stops at once when the flame is lost or the pump fires. Returns True while driving.
+    """
+    global drive_speed, drive_time
+    dt = _clamp_value(now - drive_time, 0.0, 0.5)
+    drive_time = now
+
+    box = getattr(camera, "last_box", None)
+    if not tracking or box is None or APPROACH_SPEED <= 0:
+        drive_speed = 0.0
+        motor_ctrl.stop_all()
+        return False
+
+    # Pan > 90: flame is to the left
+    bearing = servo_ctrl.current_pan_angle - 90
+    remaining = (APPROACH_STANDOFF_WIDTH - box[2]) / APPROACH_STANDOFF_WIDTH
+    target = APPROACH_SPEED * _clamp_value(remaining * 2.0, 0.0, 1.0)
+    if abs(bearing) > APPROACH_MAX_BEARING:
+        target = 0.0
+
+    step = APPROACH_ACCEL * dt
+    drive_speed += _clamp_value(target - drive_speed, -step, step)
+    turn = _clamp_value(-bearing * APPROACH_TURN_GAIN, -APPROACH_SPEED, APPROACH_SPEED)
+
+    left_speed = _clamp_value(drive_speed + turn, -MAX_SPEED, MAX_SPEED)
+    right_speed = _clamp_value(drive_speed - turn, -MAX_SPEED, MAX_SPEED)
+    motor_ctrl.set_left_motor(left_speed)
+    motor_ctrl.set_right_motor(right_speed)
+    return left_speed != 0 or right_speed != 0
+
+def _select_input(joy_ctrl, teleop):
+    """Network teleop wins while its operator is sending commands"""
+    if teleop is not None and (teleop.active or joy_ctrl is None):
+        return teleop
+    return joy_ctrl
+
+def run_robot_loop(motor_ctrl, joy_ctrl, servo_ctrl, pump_ctrl, fire_sens, fx, camera, teleop=None, config=None, watchdog=None, metrics=None):
     manual_mode = False 
     last_start_btn = False
+    loop_hz = 0.0
+    last_tick = time.time()
     
     print(">>> SYSTEM READY. Press START to switch modes. <<<")
 
     while True:
-        curr_start = joy_ctrl.get_button_state(START_BUTTON_ID)
+        # Heartbeat: the watchdog stops motors + pump if this stalls
+        if watchdog is not None:
+            watchdog.beat()
+
+        # New tuning values go live here, never in the middle of a tick
+        if config is not None:
+            config.apply_pending()
+
+        input_ctrl = _select_input(joy_ctrl, teleop)
+        curr_start = input_ctrl.get_button_state(START_BUTTON_ID)
         if curr_start and not last_start_btn:
             manual_mode = not manual_mode
             print(f"\n*** MODE SWITCHED: {'MANUAL' if manual_mode else 'AUTO'} ***")
             motor_ctrl.stop_all() 
             pump_ctrl.pump_off()
-            buzz_ctrl.off()
+            fx.play(effects.JINGLE_MANUAL if manual_mode else effects.JINGLE_AUTO)
+            save_trims()
         last_start_btn = curr_start
 
         msg = ""
         if manual_mode:
-            msg = handle_manual_mode(joy_ctrl, motor_ctrl, servo_ctrl, pump_ctrl, rgb_ctrl, buzz_ctrl, camera)
+            msg = handle_manual_mode(input_ctrl, motor_ctrl, servo_ctrl, pump_ctrl, fx, camera)
         else:
-            msg = handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, rgb_ctrl, buzz_ctrl, camera, joy_ctrl)
+            msg = handle_automatic_mode(motor_ctrl, servo_ctrl, pump_ctrl, fire_sens, fx, camera, input_ctrl)
+
+        # Loop rate (smoothed) + Telemetry
+        now = time.time()
+        if now > last_tick:
+            loop_hz = 0.9 * loop_hz + 0.1 / (now - last_tick)
+        last_tick = now
+        if metrics is not None:
+            metrics.loop_tick(manual_mode, loop_hz)
+        if teleop is not None:
+            teleop.publish(manual_mode, motor_ctrl, servo_ctrl, pump_ctrl, fire_sens.is_fire_detected(), camera, loop_hz)
+            if config is not None:
+                teleop.publish_config(config.version, config.active)
+            if teleop.active:
+                msg += f" | NET RTT {teleop.client_rtt_ms:.1f}ms"
 
         print(msg, end='\r')
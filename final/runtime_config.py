@@ -0,0 +1,238 @@
+# runtime_config.py
+import ctypes
+import ctypes.util
+import json
+import math
+import os
+import select
+import struct
+import threading
+import time
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "robot_config.json")
+
+# --- Schema ---
+# key: (target, attribute, type, min, max)
+# target "modes" = robot_modes module, "camera" = FireCamera instance
+SCHEMA = {
+    "MAX_SPEED":       ("modes", "MAX_SPEED", float, 0, 100),
+    "AUTO_MIN_SCORE":  ("modes", "AUTO_MIN_SCORE", float, 0.0, 1.0),
+    "PUMP_PULSE_ON":   ("modes", "PUMP_PULSE_ON", float, 0.05, 10.0),
+    "PUMP_PULSE_OFF":  ("modes", "PUMP_PULSE_OFF", float, 0.0, 10.0),
+    "PUMP_HOLD_TIME":  ("modes", "PUMP_HOLD_TIME", float, 0.0, 30.0),
+    "PUMP_MIN_SCORE":  ("modes", "PUMP_MIN_SCORE", float, 0.0, 1.0),
+    "PAN_GAIN":        ("modes", "PAN_GAIN", float, 0.0, 200.0),
+    "TILT_GAIN":       ("modes", "TILT_GAIN", float, 0.0, 200.0),
+    "NOZZLE_OFFSET_X": ("modes", "NOZZLE_OFFSET_X", float, -1.0, 1.0),
+    "NOZZLE_OFFSET_Y": ("modes", "NOZZLE_OFFSET_Y", float, -1.0, 1.0),
+    "APPROACH_SPEED":  ("modes", "APPROACH_SPEED", float, 0, 100),
+    "APPROACH_STANDOFF_WIDTH": ("modes", "APPROACH_STANDOFF_WIDTH", float, 0.01, 1.0),
+    "APPROACH_MIN_SCORE": ("modes", "APPROACH_MIN_SCORE", float, 0.0, 1.0),
+    "APPROACH_MIN_FRAMES": ("modes", "APPROACH_MIN_FRAMES", int, 1, 100),
+    "SPRAY_SWEEP":     ("modes", "SPRAY_SWEEP", int, 0, 1),
+    "conf_thres":      ("camera", "conf_thres", float, 0.0, 1.0),
+    "img_size":        ("camera", "img_size", int, 32, 1280),   # Ladder rung when the resolution ladder is active
+}
+
+# Changing the nozzle offset also resets the live joystick trim
+# (only when the file changes its value: see apply_pending())
+LINKED = {
+    "NOZZLE_OFFSET_X": ("modes", "g_offset_x"),
+    "NOZZLE_OFFSET_Y": ("modes", "g_offset_y"),
+}
+
+# --- inotify (Linux) ---
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+_EVENT = struct.Struct("iIII")
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class RuntimeConfig:
+    """
+    Hot-reloadable tuning values.
+    - robot_config.json is watched with inotify (mtime polling if unavailable)
+    - A new file is parsed and validated on the watcher thread
+    - The main loop calls apply_pending() between ticks: all changed values at once
+    - Only keys whose value differs from the active config are applied, so a
+      reload (or a restart) does not reset what the robot changed itself (trims)
+    - Invalid files are rejected, a failed apply is rolled back
+    """
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, modes, camera, path=CONFIG_FILE):
+        self.targets = {"modes": modes, "camera": camera}
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = None
+        self.version = 0
+        self.active = self._snapshot()
+        self.last_error = None
+
+        if not os.path.exists(path):
+            self._write_defaults()
+        else:
+            self._load_file()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._watch, daemon=True)
+        self.thread.start()
+
+    # --- Values ---
+    def _snapshot(self):
+        values = {}
+        for key, (target, attr, _, _, _) in SCHEMA.items():
+            obj = self.targets[target]
+            if obj is not None and hasattr(obj, attr):
+                values[key] = getattr(obj, attr)
+        return values
+
+    def _write_defaults(self):
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.active, f, indent=4)
+            print(f"[Config] Default config written to {self.path}")
+        except OSError as e:
+            print(f"[Config] Could not write defaults: {e}")
+
+    def validate(self, data):
+        """Parsed JSON -> dict of typed values, raises ConfigError"""
+        if not isinstance(data, dict):
+            raise ConfigError("Config must be a JSON object")
+        values = {}
+        for key, raw in data.items():
+            if key not in SCHEMA:
+                raise ConfigError(f"Unknown key '{key}'")
+            _, _, kind, lo, hi = SCHEMA[key]
+            if isinstance(raw, bool) or not isinstance(raw, (int, float)):
+                raise ConfigError(f"{key}: expected a number, got {raw!r}")
+            if not math.isfinite(raw):   # json.load accepts Infinity / NaN
+                raise ConfigError(f"{key}: {raw!r} is not a finite number")
+            if kind is int and raw != int(raw):
+                raise ConfigError(f"{key}: expected an integer, got {raw!r}")
+            value = kind(raw)
+            if not lo <= value <= hi:
+                raise ConfigError(f"{key}: {value} outside [{lo}, {hi}]")
+            values[key] = value
+
+        camera = self.targets["camera"]
+        if "img_size" in values and camera is not None:
+            size = values["img_size"]
+            if size % 32:
+                raise ConfigError(f"img_size: {size} is not a multiple of 32")
+            scaler = getattr(camera, "scaler", None)
+            if scaler is not None and size not in scaler.LADDER:
+                raise ConfigError(f"img_size: {size} is not on the resolution ladder {scaler.LADDER}")
+            session = getattr(camera, "session", None)
+            if session is not None:
+                fixed = session.get_inputs()[0].shape[2]
+                if isinstance(fixed, int) and fixed != size:
+                    raise ConfigError(f"img_size: model input is fixed at {fixed}")
+        return values
+
+    def _load_file(self):
+        try:
+            with open(self.path) as f:
+                values = self.validate(json.load(f))
+        except (OSError, ValueError) as e:
+            self.last_error = str(e)
+            print(f"\n[Config] Rejected {os.path.basename(self.path)}: {e} (keeping current values)")
+            return
+        with self.lock:
+            self.pending = values
+
+    def apply_pending(self):
+        """Call between loop ticks. Returns True if new values went live."""
+        with self.lock:
+            values, self.pending = self.pending, None
+        if values is None:
+            return False
+        values = {key: value for key, value in values.items() if self.active.get(key) != value}
+        if not values:
+            return False
+
+        backup = []
+        try:
+            for key, value in values.items():
+                for target, attr in [SCHEMA[key][:2]] + ([LINKED[key]] if key in LINKED else []):
+                    obj = self.targets[target]
+                    if obj is None:
+                        continue
+                    old = getattr(obj, attr)
+                    setattr(obj, attr, value)
+                    backup.append((obj, attr, old))
+            # The resolution ladder picks img_size every frame: move its rung as well
+            scaler = getattr(self.targets["camera"], "scaler", None)
+            if "img_size" in values and scaler is not None:
+                scaler.set_size(values["img_size"])
+        except Exception as e:
+            # Roll back whatever was already applied
+            for obj, attr, old in reversed(backup):
+                setattr(obj, attr, old)
+            self.last_error = str(e)
+            print(f"\n[Config] Apply failed, rolled back: {e}")
+            return False
+
+        # Configured values, not live ones: the ladder moving img_size is no file change
+        self.active = dict(self.active, **values)
+        self.version += 1
+        self.last_error = None
+        changed = ", ".join(f"{k}={v}" for k, v in values.items())
+        print(f"\n[Config] v{self.version} applied: {changed}")
+        return True
+
+    # --- File Watcher ---
+    def _watch(self):
+        try:
+            self._watch_inotify()
+        except OSError as e:
+            print(f"[Config] inotify unavailable ({e}), polling every {self.POLL_INTERVAL}s.")
+            self._watch_poll()
+
+    def _watch_inotify(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        # Watch the directory: editors replace the file (rename) instead of writing it
+        directory = os.path.dirname(self.path) or "."
+        if libc.inotify_add_watch(fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch")
+
+        name = os.path.basename(self.path)
+        try:
+            while self.running:
+                ready, _, _ = select.select([fd], [], [], 0.5)
+                if not ready:
+                    continue
+                data = os.read(fd, 4096)
+                offset = 0
+                hit = False
+                while offset < len(data):
+                    _, _, _, length = _EVENT.unpack_from(data, offset)
+                    event_name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0").decode()
+                    hit = hit or event_name == name
+                    offset += _EVENT.size + length
+                if hit:
+                    self._load_file()
+        finally:
+            os.close(fd)
+
+    def _watch_poll(self):
+        last_mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        while self.running:
+            time.sleep(self.POLL_INTERVAL)
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                continue
+            if mtime != last_mtime:
+                last_mtime = mtime
+                self._load_file()
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,224 @@
+# search_planner.py
+import math
+import random
+
+
+class SearchPlanner:
+    """
+    Pan/Tilt search pattern for Automatic Mode when no target is visible.
+    - Splits the search range into camera-sized cells (FOV minus overlap)
+    - Picks the pose with the most unseen area per second of travel + dwell
+    - Holds each pose until the servos settled and at least one frame was inferred
+    - Skips cells that were seen empty recently
+    - Visits the sector where the flame sensor went active first
+    """
+    # --- Camera Field of View (Degrees) ---
+    CAMERA_HFOV_DEG = 62.0
+    CAMERA_VFOV_DEG = 48.0
+    FOV_OVERLAP = 0.2          # 20% overlap between neighbouring poses
+    BIN_DEG = 5                # Resolution of the empty-region memory
+
+    # --- Search Range (Servo Angles) ---
+    PAN_RANGE = (0, 180)
+    TILT_RANGE = (10, 70)
+
+    # --- Timing ---
+    SERVO_SLEW_DEG_PER_S = 300.0  # SG90 class servo (~0.1s / 60 deg, unloaded)
+    SETTLE_TIME = 0.15            # Extra time for the turret to stop shaking
+    MIN_FRAMES_PER_POSE = 1       # Inferences required before a pose counts as seen
+    DWELL_ESTIMATE = 0.1          # Expected time for those inferences (~10 FPS)
+    LOST_GRACE_TIME = 0.5         # Keep still this long after losing the target
+    EMPTY_MEMORY_TIME = 8.0       # Cells seen empty are skipped for this long
+
+    # --- Flame Sensor Sector ---
+    SENSOR_ON_TURRET = True       # False: sensor is fixed to the chassis (faces pan 90)
+    SENSOR_SECTOR_DEG = 60.0      # IR flame sensor cone
+    SENSOR_PRIORITY_TIME = 5.0    # Sector stays preferred this long after the sensor fired
+
+    def __init__(self):
+        self.cells = self._build_cells()
+        self.bins = [(p + self.BIN_DEG / 2.0, t + self.BIN_DEG / 2.0)
+                     for p in range(int(self.PAN_RANGE[0]), int(self.PAN_RANGE[1]), self.BIN_DEG)
+                     for t in range(int(self.TILT_RANGE[0]), int(self.TILT_RANGE[1]), self.BIN_DEG)]
+        self.cell_bins = [self._cell_bins(c) for c in self.cells]
+        self.empty_since = {}     # coverage bin -> time it was seen empty
+        self.target = None        # cell index currently being visited
+        self.ready_time = 0.0     # time the current pose is settled
+        self.frames = 0           # frames inferred at the current pose
+        self.last_seen_time = None
+        self.last_seen_pose = None
+        self.sensor_pose = None
+        self.sensor_time = None
+        self.last_sensor = False
+
+    def _build_cells(self):
+        """Centers of the grid cells covering PAN_RANGE x TILT_RANGE"""
+        def centers(lo, hi, fov):
+            step = fov * (1.0 - self.FOV_OVERLAP)
+            span = hi - lo
+            if span <= fov:
+                return [(lo + hi) / 2.0]
+            count = int(math.ceil((span - fov) / step)) + 1
+            first = lo + fov / 2.0
+            last = hi - fov / 2.0
+            return [first + i * (last - first) / (count - 1) for i in range(count)]
+
+        pans = centers(self.PAN_RANGE[0], self.PAN_RANGE[1], self.CAMERA_HFOV_DEG)
+        tilts = centers(self.TILT_RANGE[0], self.TILT_RANGE[1], self.CAMERA_VFOV_DEG)
+        return [(p, t) for t in tilts for p in pans]
+
+    def travel_time(self, pan_a, tilt_a, pan_b, tilt_b):
+        """Both servos move at once, so the slower axis decides"""
+        return max(abs(pan_b - pan_a), abs(tilt_b - tilt_a)) / self.SERVO_SLEW_DEG_PER_S
+
+    def reset(self):
+        self.empty_since.clear()
+        self.target = None
+
+    def _cell_bins(self, cell):
+        """Coverage bins inside the camera view of a cell"""
+        return [b for b in self.bins
+                if abs(b[0] - cell[0]) <= self.CAMERA_HFOV_DEG / 2.0 and
+                   abs(b[1] - cell[1]) <= self.CAMERA_VFOV_DEG / 2.0]
+
+    def _bin_weight(self, b, now):
+        weight = 1.0
+        # Sensor sector and the last known target pose are searched first
+        if self.sensor_pose is not None and now - self.sensor_time <= self.SENSOR_PRIORITY_TIME and \
+                abs(b[0] - self.sensor_pose[0]) <= self.SENSOR_SECTOR_DEG / 2.0:
+            weight += 4.0
+        if self.last_seen_pose is not None and \
+                abs(b[0] - self.last_seen_pose[0]) <= self.CAMERA_HFOV_DEG / 2.0 and \
+                abs(b[1] - self.last_seen_pose[1]) <= self.CAMERA_VFOV_DEG / 2.0:
+            weight += 2.0
+        return weight
+
+    def _pick_next(self, pan, tilt, now):
+        # Forget regions that have been empty for too long
+        for b in [b for b, t in self.empty_since.items() if now - t > self.EMPTY_MEMORY_TIME]:
+            del self.empty_since[b]
+
+        for attempt in range(2):
+            best_idx, best_score = None, 0.0
+            for idx, cell in enumerate(self.cells):
+                if idx == self.target:
+                    continue
+                # New (not recently empty) area gained per second spent
+                gain = sum(self._bin_weight(b, now) for b in self.cell_bins[idx] if b not in self.empty_since)
+                cost = self.travel_time(pan, tilt, cell[0], cell[1]) + self.SETTLE_TIME + self.DWELL_ESTIMATE
+                if gain / cost > best_score:
+                    best_idx, best_score = idx, gain / cost
+            if best_idx is not None:
+                return best_idx
+            # Everything was seen recently: start a new sweep
+            self.empty_since.clear()
+        return 0
+
+    def update(self, now, pan, tilt, found, sensor_active):
+        """
+        Call once per Auto Mode tick, after camera.detect().
+        Returns the (pan, tilt) pose to move to, or None to stay put.
+        """
+        # Remember where the turret was pointing when the sensor went active
+        if sensor_active and not self.last_sensor:
+            self.sensor_pose = (pan, tilt) if self.SENSOR_ON_TURRET else (90.0, tilt)
+            self.sensor_time = now
+        self.last_sensor = sensor_active
+
+        if found:
+            self.last_seen_time = now
+            self.last_seen_pose = (pan, tilt)
+            self.target = None
+            return None
+
+        # Target just lost: hold still for a moment before sweeping
+        if self.last_seen_time is not None and now - self.last_seen_time < self.LOST_GRACE_TIME:
+            return None
+
+        if self.target is not None:
+            if now < self.ready_time:
+                return None
+            # This tick's frame was captured at a settled pose
+            self.frames += 1
+            if self.frames < self.MIN_FRAMES_PER_POSE:
+                return None
+            for b in self.cell_bins[self.target]:
+                self.empty_since[b] = now
+
+        self.target = self._pick_next(pan, tilt, now)
+        next_pan, next_tilt = self.cells[self.target]
+        self.ready_time = now + self.travel_time(pan, tilt, next_pan, next_tilt) + self.SETTLE_TIME
+        self.frames = 0
+        return next_pan, next_tilt
+
+
+# ---------------------------------------------------------
+# Simulation Benchmark: time-to-first-detection
+# ---------------------------------------------------------
+
+def _in_view(planner, pan, tilt, flame):
+    return abs(flame[0] - pan) <= planner.CAMERA_HFOV_DEG / 2.0 and \
+           abs(flame[1] - tilt) <= planner.CAMERA_VFOV_DEG / 2.0
+
+
+def simulate_search(planner_factory, trials=500, frame_time=0.1, timeout=30.0, seed=0):
+    """
+    Places a flame at random pan/tilt angles and steps the planner
+    until the flame is inside the camera view at a settled pose.
+    Half the trials get the flame sensor hint (sensor fires when the turret faces the flame).
+    Returns a list of detection times (None = not found before timeout).
+    """
+    rng = random.Random(seed)
+    results = []
+    for trial in range(trials):
+        planner = planner_factory()
+        flame = (rng.uniform(*planner.PAN_RANGE), rng.uniform(*planner.TILT_RANGE))
+        use_sensor = trial % 2 == 0
+        pan, tilt = 90.0, 30.0
+        settled_time = 0.0
+        now = 0.0
+        found_time = None
+        while now < timeout:
+            found = now >= settled_time and _in_view(planner, pan, tilt, flame)
+            if found:
+                found_time = now
+                break
+            sensor = use_sensor and abs(flame[0] - pan) <= planner.SENSOR_SECTOR_DEG / 2.0
+            pose = planner.update(now, pan, tilt, False, sensor)
+            if pose is not None:
+                settled_time = now + planner.travel_time(pan, tilt, pose[0], pose[1])
+                pan, tilt = pose
+            now += frame_time
+        results.append(found_time)
+    return results
+
+
+class _StationaryPlanner(SearchPlanner):
+    """Old behaviour: keep the current angles and wait"""
+    def update(self, now, pan, tilt, found, sensor_active):
+        return None
+
+
+class _RasterPlanner(SearchPlanner):
+    """Fixed row-by-row raster, no sensor or coverage ordering"""
+    def _pick_next(self, pan, tilt, now):
+        return 0 if self.target is None else (self.target + 1) % len(self.cells)
+
+
+def _report(name, results):
+    hits = sorted(t for t in results if t is not None)
+    miss = len(results) - len(hits)
+    if hits:
+        mean = sum(hits) / len(hits)
+        p50 = hits[len(hits) // 2]
+        p90 = hits[min(len(hits) - 1, int(len(hits) * 0.9))]
+        print(f"{name:<12} found {len(hits):4d}/{len(results)} | mean {mean:5.2f}s | p50 {p50:5.2f}s | p90 {p90:5.2f}s | miss {miss}")
+    else:
+        print(f"{name:<12} found    0/{len(results)}")
+
+
+if __name__ == "__main__":
+    print(">>> Search Planner Benchmark (time-to-first-detection) <<<")
+    _report("Stationary", simulate_search(_StationaryPlanner))
+    _report("Raster", simulate_search(_RasterPlanner))
+    _report("Sweep", simulate_search(SearchPlanner))
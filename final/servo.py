@@ -1,6 +1,7 @@
 # servo.py
-import RPi.GPIO as GPIO
 import time
+import pwm_backend
+from collections import deque
 
 class ServoController:
     # --- [PIN MAP] ---
@@ -14,20 +15,27 @@ class ServoController:
     INITIAL_PAN_ANGLE = 90
     INITIAL_TILT_ANGLE = 30
 
+    # Pose History (for latency-compensated aiming)
+    HISTORY_LENGTH = 64
+    RESPONSE_TIME = 0.05 # Command -> physical movement delay (sec)
+
     def __init__(self):
         # Note: GPIO.setmode is handled in main.py
         
-        GPIO.setup(self.PAN_SERVO_PIN, GPIO.OUT)
-        GPIO.setup(self.TILT_SERVO_PIN, GPIO.OUT)
-        
-        self.pan_pwm = GPIO.PWM(self.PAN_SERVO_PIN, self.PWM_FREQ)
-        self.tilt_pwm = GPIO.PWM(self.TILT_SERVO_PIN, self.PWM_FREQ)
+        # Pins 12/19 get hardware PWM when the pwm-2chan overlay is enabled
+        self.pan_pwm = pwm_backend.open_pwm(self.PAN_SERVO_PIN, self.PWM_FREQ)
+        self.tilt_pwm = pwm_backend.open_pwm(self.TILT_SERVO_PIN, self.PWM_FREQ)
         
         self.pan_pwm.start(0) 
         self.tilt_pwm.start(0)
         
         self.current_pan_angle = self.INITIAL_PAN_ANGLE
         self.current_tilt_angle = self.INITIAL_TILT_ANGLE
+        self.writes = 0 # PWM writes (for metrics)
+        
+        # (time.monotonic(), pan, tilt) of every command
+        self.history = deque(maxlen=self.HISTORY_LENGTH)
+        self.history.append((time.monotonic(), self.current_pan_angle, self.current_tilt_angle))
         
         print(f"ServoController initialized (Pins {self.PAN_SERVO_PIN}, {self.TILT_SERVO_PIN}).")
         
@@ -42,9 +50,11 @@ class ServoController:
         
         time.sleep(1.0) # Wait 1.0s for physical movement
         
-        # Cut power to prevent jitter
-        self.pan_pwm.ChangeDutyCycle(0)
-        self.tilt_pwm.ChangeDutyCycle(0)
+        # Cut power to prevent jitter (hardware PWM does not jitter: keep holding)
+        if not self.pan_pwm.is_hardware:
+            self.pan_pwm.ChangeDutyCycle(0)
+        if not self.tilt_pwm.is_hardware:
+            self.tilt_pwm.ChangeDutyCycle(0)
         print(">>> Servos aligned and ready. <<<")
 
     def _angle_to_duty_cycle(self, angle):
@@ -67,9 +77,28 @@ class ServoController:
             self.current_tilt_angle = angle
         
         if pwm_instance:
+            self.history.append((time.monotonic(), self.current_pan_angle, self.current_tilt_angle))
             pwm_instance.ChangeDutyCycle(duty_cycle)
-            time.sleep(0.03) # Short pulse for smoothness
-            pwm_instance.ChangeDutyCycle(0)
+            self.writes += 1
+            if not pwm_instance.is_hardware:
+                time.sleep(0.03) # Short pulse for smoothness
+                pwm_instance.ChangeDutyCycle(0)
+                self.writes += 1
+
+    def pose_at(self, timestamp):
+        """
+        Commanded (pan, tilt) the turret had at 'timestamp' (time.monotonic();
+        FireCamera converts the sensor's CLOCK_BOOTTIME stamps).
+        Returns the current angles if the time is unknown or newer than the history.
+        """
+        if timestamp is None:
+            return self.current_pan_angle, self.current_tilt_angle
+        t = timestamp - self.RESPONSE_TIME
+        for cmd_time, pan, tilt in reversed(self.history):
+            if cmd_time <= t:
+                return pan, tilt
+        # Older than the whole history: best guess is the oldest entry
+        return self.history[0][1], self.history[0][2]
 
     def cleanup(self):
         self.pan_pwm.stop()
@@ -0,0 +1,214 @@
+# simulator.py
+import argparse
+import contextlib
+import io
+import math
+import random
+from multiprocessing import Pool
+
+import fake_hw
+import robot_modes
+from aim_calibration import AimTable
+from ballistics import BallisticModel, CALIB_RANGES
+from runtime_config import SCHEMA, LINKED
+from search_planner import SearchPlanner
+from spray_planner import SprayPlanner
+
+# Stop this long after the last flame went out (pump tail counts as water used)
+SETTLE_AFTER_OUT = 0.5
+# Aim counts as locked when the flame sits this close to the aim point (normalized)
+LOCK_TOLERANCE = 0.05
+
+
+def make_scenario(seed, flames=1, duration=60.0, overrides=None, world=None, camera=None, distance=None, width=None):
+    """Random flames in front of the robot (turret reach: pan 0~180), optionally at a fixed distance / width"""
+    rng = random.Random(seed)
+    placed = []
+    for _ in range(flames):
+        dist = rng.uniform(0.8, 3.0) if distance is None else distance
+        bearing = math.radians(90.0 + rng.uniform(-80.0, 80.0))
+        placed.append({"x": dist * math.cos(bearing), "y": dist * math.sin(bearing),
+                       "water_needed": rng.uniform(60.0, 200.0)})
+        if width is not None:
+            placed[-1]["width"] = width
+    return {"seed": seed, "flames": placed, "duration": duration,
+            "overrides": overrides or {}, "world": world or {}, "camera": camera or {}}
+
+
+def reset_modes(overrides, clock):
+    """Fresh robot_modes state in this process, driven by the sim clock"""
+    robot_modes.time = clock
+    robot_modes.burst_start = None
+    robot_modes.burst_confirm_time = -1e9
+    robot_modes.aim_hold_until = 0.0
+    robot_modes.tank_empty_logged = False
+    robot_modes.drive_speed = 0.0
+    robot_modes.drive_time = clock.time()
+    robot_modes.approach_frames = 0
+    robot_modes.search_planner = SearchPlanner()
+    robot_modes.spray_planner = SprayPlanner()
+    robot_modes.aim_table = AimTable()
+    robot_modes.ballistics = BallisticModel()
+    robot_modes.g_offset_x = robot_modes.NOZZLE_OFFSET_X
+    robot_modes.g_offset_y = robot_modes.NOZZLE_OFFSET_Y
+    for key, value in overrides.items():
+        if key == "use_calibration":
+            robot_modes.aim_table = AimTable.load()
+            continue
+        if key == "use_ballistics":
+            continue
+        target, attr, kind = SCHEMA[key][:3]
+        if target != "modes":
+            continue
+        setattr(robot_modes, attr, kind(value))
+        if key in LINKED:
+            setattr(robot_modes, LINKED[key][1], kind(value))
+
+
+def sim_ballistics(world, flame):
+    """BallisticModel fitted from perfect test shots at CALIB_RANGES (what calibrate() would measure)"""
+    model = BallisticModel()
+    trim_y = robot_modes._clamp_value(robot_modes.g_offset_y, -robot_modes.TRIM_LIMIT, robot_modes.TRIM_LIMIT)
+    for dist in CALIB_RANGES:
+        box_h = math.degrees(2 * math.atan2(flame.width / 2, dist)) / world.VFOV
+        lead = world.NOZZLE_Y + world.NOZZLE_DROP * dist * dist - trim_y
+        model.add_shot(box_h, dist, lead)
+    model.fit()
+    return model
+
+
+def run_scenario(scenario):
+    """One closed-loop run of handle_automatic_mode -> metrics dict"""
+    flames = [fake_hw.Flame(**f) for f in scenario["flames"]]
+    world = fake_hw.SimWorld(flames, seed=scenario["seed"])
+    for key, value in scenario["world"].items():
+        setattr(world, key, value)
+    clock = fake_hw.SimClock(world)
+    start = clock.time()
+
+    motor = fake_hw.SimMotor(world)
+    servo_ctrl = fake_hw.SimServo(world, clock, scenario["world"].get("hardware_pwm", False))
+    pump = fake_hw.SimPump(world)
+    sensor = fake_hw.SimFireSensor(world)
+    camera = fake_hw.SimCamera(world, clock)
+    for key, value in scenario["camera"].items():
+        setattr(camera, key, value)
+    null = fake_hw.NullDevice()
+
+    # Keep the module constants of the parent untouched between scenarios
+    saved = {attr: getattr(robot_modes, attr) for attr in
+             [SCHEMA[k][1] for k in SCHEMA if SCHEMA[k][0] == "modes"] + ["time"]}
+    reset_modes(scenario["overrides"], clock)
+    if scenario["overrides"].get("use_ballistics"):
+        robot_modes.ballistics = sim_ballistics(world, flames[0])
+
+    lock_time = None
+    ticks = 0
+    # Status prints of robot_modes are noise here
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    quiet.__enter__()
+    try:
+        while clock.time() - start < scenario["duration"]:
+            robot_modes.handle_automatic_mode(motor, servo_ctrl, pump, sensor, null, camera, null)
+            ticks += 1
+
+            if lock_time is None and camera.last_detection[0]:
+                target_x = 0.5 + robot_modes.g_offset_x
+                target_y = 0.5 + robot_modes.g_offset_y + robot_modes.ballistics.lead(camera.last_box[3])
+                for flame in flames:
+                    p = world.project(flame) if flame.burning else None
+                    if p and abs(p[0] - target_x) < LOCK_TOLERANCE and abs(p[1] - target_y) < LOCK_TOLERANCE:
+                        lock_time = clock.time() - start
+                        break
+
+            if world.all_out and not pump.is_on and \
+                    clock.time() - max(f.out_time for f in flames) >= SETTLE_AFTER_OUT:
+                break
+            clock.sleep(0.005)   # Status print / loop overhead
+    finally:
+        quiet.__exit__(None, None, None)
+        for attr, value in saved.items():
+            setattr(robot_modes, attr, value)
+
+    out_time = max(f.out_time for f in flames) - start if world.all_out else None
+    return {
+        "seed": scenario["seed"],
+        "time_to_lock": lock_time,
+        "time_to_extinguish": out_time,
+        "water_used": world.water_used,
+        "water_on_target": world.water_on_target,
+        "loop_hz": ticks / (clock.time() - start),
+        "sim_time": clock.time() - start,
+    }
+
+
+def run_batch(scenarios, workers=None):
+    with Pool(workers) as pool:
+        return pool.map(run_scenario, scenarios)
+
+
+def _stats(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return "    -         -   "
+    return f"{values[len(values) // 2]:6.2f} / {values[min(len(values) - 1, int(len(values) * 0.9))]:6.2f}"
+
+
+def report(name, results):
+    done = [r for r in results if r["time_to_extinguish"] is not None]
+    used = sum(r["water_used"] for r in results) / len(results)
+    hit = sum(r["water_on_target"] for r in results) / len(results)
+    print(f"{name:<28} out {len(done):4d}/{len(results)} | lock p50/p90 {_stats([r['time_to_lock'] for r in results])}s"
+          f" | out p50/p90 {_stats([r['time_to_extinguish'] for r in results])}s"
+          f" | water {used:6.1f}ml ({hit / used * 100 if used else 0:4.1f}% on target)")
+
+
+def _parse_overrides(text):
+    """'PAN_GAIN=30,PUMP_HOLD_TIME=0.5' -> dict"""
+    overrides = {}
+    for part in filter(None, text.split(",")):
+        key, value = part.split("=", 1)
+        if key not in SCHEMA and key not in ("use_calibration", "use_ballistics"):
+            raise SystemExit(f"Unknown setting '{key}' (see runtime_config.SCHEMA)")
+        overrides[key] = float(value)
+    return overrides
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Automatic mode simulator (faster than real time)")
+    parser.add_argument("configs", nargs="*", default=[""],
+                        help="Settings to compare, e.g. PAN_GAIN=15 PAN_GAIN=40,TILT_GAIN=40")
+    parser.add_argument("--scenarios", type=int, default=200)
+    parser.add_argument("--flames", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=60.0, help="Sim seconds per scenario")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--latency", type=float, default=fake_hw.SimCamera.INFERENCE_TIME, help="Inference time (s)")
+    parser.add_argument("--noise", type=float, default=fake_hw.SimCamera.NOISE, help="Detection center noise")
+    parser.add_argument("--nozzle", type=float, nargs=2, metavar=("X", "Y"),
+                        default=[fake_hw.SimWorld.NOZZLE_X, fake_hw.SimWorld.NOZZLE_Y],
+                        help="Where the water really lands (image coordinates - 0.5)")
+    parser.add_argument("--drop", type=float, default=fake_hw.SimWorld.NOZZLE_DROP,
+                        help="Water arc drop (image units per m^2 of range)")
+    parser.add_argument("--flame-width", type=float, help="Flame width (m), default 0.15")
+    parser.add_argument("--flame-grid", type=int, nargs=2, metavar=("COLS", "ROWS"), default=list(fake_hw.SimWorld.FLAME_GRID),
+                        help="Flame cells that each need their share of water (1 1 = anywhere on the flame counts)")
+    parser.add_argument("--hardware-pwm", action="store_true", help="No 30ms servo pulse sleep")
+    parser.add_argument("--distances", type=float, nargs="+", help="Start distances (m) to compare, e.g. 1 2 3 4")
+    args = parser.parse_args()
+
+    world = {"NOZZLE_X": args.nozzle[0], "NOZZLE_Y": args.nozzle[1], "NOZZLE_DROP": args.drop,
+             "FLAME_GRID": tuple(args.flame_grid), "hardware_pwm": args.hardware_pwm}
+    camera = {"INFERENCE_TIME": args.latency, "NOISE": args.noise}
+    print(f">>> Simulator: {args.scenarios} scenarios x {len(args.configs)} configs, "
+          f"{args.flames} flame(s), latency {args.latency * 1000:.0f}ms <<<")
+    for distance in args.distances or [None]:
+        if distance is not None:
+            print(f"\n--- Flame at {distance:.1f}m ---")
+        for text in args.configs:
+            overrides = _parse_overrides(text)
+            scenarios = [make_scenario(seed, args.flames, args.duration, overrides, world, camera, distance, args.flame_width)
+                         for seed in range(args.scenarios)]
+            results = run_batch(scenarios, args.workers)
+            sim_time = sum(r["sim_time"] for r in results)
+            report(text or "defaults", results)
+            print(f"{'':<28} {sim_time:.0f}s simulated, mean loop {sum(r['loop_hz'] for r in results) / len(results):.1f}Hz")
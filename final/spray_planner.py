@@ -0,0 +1,107 @@
+# spray_planner.py
+import math
+from collections import deque
+
+from search_planner import SearchPlanner
+
+
+def zigzag(rows=3, cols=4):
+    """Rows of points over the unit box (-0.5..0.5), every other row reversed, then back up"""
+    ys = [0.0] if rows == 1 else [-0.5 + r / (rows - 1) for r in range(rows)]
+    xs = [-0.5 + c / (cols - 1) for c in range(cols)]
+    path = []
+    for r, y in enumerate(ys):
+        path += [(x, y) for x in (xs if r % 2 == 0 else xs[::-1])]
+    return path + path[-2:0:-1]
+
+
+def spiral(points=12, turns=2.0):
+    """Archimedean spiral from the centre out to the box edge, then back in"""
+    path = []
+    for i in range(points):
+        t = i / (points - 1)
+        a = 2 * math.pi * turns * t
+        path.append((0.5 * t * math.cos(a), 0.5 * t * math.sin(a)))
+    return path + path[-2:0:-1]
+
+
+class SprayPlanner:
+    """
+    Sweeps the spray over the detected flame box while a burst is running.
+    - The tracker's aim pose is the centre, the box size (fraction of the frame)
+      maps to degrees through the camera FOV
+    - Waypoints of a zig-zag (or spiral) over COVERAGE of the box, each held for the
+      servo slew time to reach it, at least MIN_DWELL (water needs time to land)
+    - Every detection re-centres the pattern, which keeps its place in the path
+    - Pump pulse off: back to the centre, so the check frame sees the flame straight on
+    - Remembers which offset went with each commanded pose, so the tracker can
+      take it back out of frames exposed mid-sweep (see unsweep())
+    """
+    PATTERN = "zigzag"     # "zigzag" / "spiral"
+    COVERAGE = 0.8         # Share of the box width / height swept (spray has its own width)
+    MIN_SPAN_DEG = 3.0     # Smaller boxes: centre only
+    MIN_DWELL = 0.15       # sec per waypoint
+    HISTORY = 32
+    SERVO_SLEW_DEG_PER_S = SearchPlanner.SERVO_SLEW_DEG_PER_S
+    CAMERA_HFOV_DEG = SearchPlanner.CAMERA_HFOV_DEG
+    CAMERA_VFOV_DEG = SearchPlanner.CAMERA_VFOV_DEG
+
+    def __init__(self):
+        self.path = spiral() if self.PATTERN == "spiral" else zigzag()
+        self.center = None       # (pan, tilt) of the pattern centre
+        self.span = (0.0, 0.0)   # Swept (pan, tilt) extent in degrees
+        self.index = 0
+        self.index_since = None
+        self.commanded = deque(maxlen=self.HISTORY)   # (pan, tilt, d_pan, d_tilt)
+
+    @property
+    def active(self):
+        return self.center is not None
+
+    def recenter(self, pan, tilt, box_w, box_h):
+        """New detection: aim pose for the box centre + box size (fraction of the frame)"""
+        self.center = (pan, tilt)
+        self.span = (box_w * self.CAMERA_HFOV_DEG * self.COVERAGE, box_h * self.CAMERA_VFOV_DEG * self.COVERAGE)
+
+    def _offset(self, index):
+        if max(self.span) < self.MIN_SPAN_DEG:
+            return 0.0, 0.0
+        x, y = self.path[index % len(self.path)]
+        return x * self.span[0], y * self.span[1]
+
+    def _dwell(self, index):
+        (x0, y0), (x1, y1) = self._offset(index - 1), self._offset(index)
+        return max(self.MIN_DWELL, max(abs(x1 - x0), abs(y1 - y0)) / self.SERVO_SLEW_DEG_PER_S)
+
+    def update(self, now, spraying=True):
+        """Pose to command this tick, None before the first recenter()"""
+        if self.center is None:
+            return None
+        if self.index_since is None:
+            self.index_since = now
+        while now - self.index_since >= self._dwell(self.index):
+            self.index_since += self._dwell(self.index)
+            self.index = (self.index + 1) % len(self.path)
+
+        d_pan, d_tilt = self._offset(self.index) if spraying else (0.0, 0.0)
+        pan = max(0.0, min(180.0, self.center[0] + d_pan))
+        tilt = max(0.0, min(180.0, self.center[1] + d_tilt))
+        self.commanded.append((pan, tilt, pan - self.center[0], tilt - self.center[1]))
+        return pan, tilt
+
+    def unsweep(self, pan, tilt, cx, cy):
+        """
+        Frame taken at a swept pose -> pose + flame position as if the turret had been
+        on the pattern centre. pan, tilt: servo_ctrl.pose_at() for the frame.
+        """
+        for c_pan, c_tilt, d_pan, d_tilt in reversed(self.commanded):
+            if abs(c_pan - pan) < 1e-6 and abs(c_tilt - tilt) < 1e-6:
+                return (pan - d_pan, tilt - d_tilt,
+                        cx - d_pan / self.CAMERA_HFOV_DEG, cy - d_tilt / self.CAMERA_VFOV_DEG)
+        return pan, tilt, cx, cy
+
+    def reset(self):
+        self.center = None
+        self.index = 0
+        self.index_since = None
+        self.commanded.clear()
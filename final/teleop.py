@@ -0,0 +1,424 @@
+# teleop.py
+import argparse
+import hashlib
+import hmac
+import ipaddress
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+# --- Protocol (UDP, little endian) ---
+MAGIC = b"FT"
+VERSION = 2
+TYPE_COMMAND = 1
+TYPE_ACK = 2
+TYPE_TELEMETRY = 3
+TYPE_CONFIG = 4
+TYPE_HELLO = 5
+TYPE_WELCOME = 6
+
+# Handshake: the client sends a random nonce, the robot answers with a new random session ID.
+# Hello: magic, ver, type, client nonce
+HELLO = struct.Struct("<2sBBQ")
+# Welcome: magic, ver, type, echoed client nonce, session ID
+WELCOME = struct.Struct("<2sBBQQ")
+# Command: magic, ver, type, session ID, seq, client time (ns), axis X, axis Y (+-32767),
+#          buttons (bit = button ID), client RTT (0.1ms)
+COMMAND = struct.Struct("<2sBBQIQhhHH")
+# Hello / welcome / command are followed by an HMAC-SHA256 tag (truncated) over them,
+# keyed with the shared key
+TAG_SIZE = 16
+# Ack: magic, ver, type, seq, echoed client time (ns)
+ACK = struct.Struct("<2sBBIQ")
+# Telemetry: magic, ver, type, seq, last command seq, robot time (ns),
+#            mode (0 auto / 1 manual), motor L/R (%), pan, tilt (0.1 deg), pump, sensor,
+#            found, cx, cy (1/10000), score (1/1000), loop rate (0.1 Hz)
+TELEMETRY = struct.Struct("<2sBBIIQBbbHHBBBHHHH")
+# Config: magic, ver, type, config version + active values as JSON
+CONFIG = struct.Struct("<2sBBI")
+
+DEFAULT_PORT = 5005
+AXIS_SCALE = 32767.0
+KEY_ENV = "ROBOT_TELEOP_KEY"
+
+
+def _key_bytes(key):
+    return key.encode() if isinstance(key, str) else (key or b"")
+
+
+def _tag(key, body):
+    return hmac.new(key, body, hashlib.sha256).digest()[:TAG_SIZE]
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def _signed(key, struct_, data):
+    """Fields of a tagged packet, None if the size or the tag is wrong"""
+    if len(data) != struct_.size + TAG_SIZE:
+        return None
+    body, tag = data[:struct_.size], data[struct_.size:]
+    if not hmac.compare_digest(tag, _tag(key, body)):
+        return None
+    return struct_.unpack(body)
+
+
+def _seq_newer(seq, last):
+    """Sequence comparison with 32-bit wrap-around"""
+    return last is None or 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
+
+
+class TeleopServer:
+    """
+    Network input for Manual Mode (drop-in for JoystickController).
+    - Commands carry axes + button bitmask with sequence numbers
+    - Listens on loopback by default; any other interface needs a shared key,
+      commands with a wrong tag are dropped without an ack
+    - Commands only count inside a session: the robot hands out a random session ID
+      on hello, bound to that address. Sequence and client time must keep growing
+      for the whole session, so captured packets cannot be replayed (from any address)
+    - One operator at a time: hellos from other addresses are ignored until the
+      current one goes quiet (dead-man), then the next one gets a new session
+    - Dead-man: no command for DEADMAN_TIMEOUT -> axes 0, all buttons released
+    - Every command is acked right away (client measures round-trip time)
+    - publish() streams telemetry to the last client at TELEMETRY_HZ
+    - publish_config() sends the active runtime config on change (and every CONFIG_INTERVAL)
+    """
+    DEADZONE = 0.1
+    DEADMAN_TIMEOUT = 0.25   # sec
+    TELEMETRY_HZ = 10.0
+    CONFIG_INTERVAL = 2.0    # sec
+
+    # Same IDs as JoystickController
+    BUTTON_B = 0
+    BUTTON_A = 2
+    BUTTON_Y = 1
+    BUTTON_X = 3
+    BUTTON_L = 4
+    BUTTON_R = 5
+    BUTTON_SELECT = 6
+    START_BUTTON = 7
+
+    def __init__(self, port=DEFAULT_PORT, host="127.0.0.1", key=None, telemetry_hz=None):
+        self.key = _key_bytes(key)
+        if not self.key and not _is_loopback(host):
+            raise ValueError(f"Teleop on {host} needs a shared key (set {KEY_ENV})")
+        if telemetry_hz is not None:
+            self.TELEMETRY_HZ = telemetry_hz
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+
+        self.lock = threading.Lock()
+        self.client_addr = None
+        self.session = None
+        self.last_seq = None
+        self.last_client_ns = 0
+        self.last_cmd_time = 0.0
+        self.axes = (0.0, 0.0)
+        self.buttons = 0
+        self.client_rtt_ms = 0.0
+
+        self.telemetry_seq = 0
+        self.last_publish = 0.0
+        self.config_sent = (None, None, 0.0)   # version, client, time
+        self.running = True
+        self.thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.thread.start()
+        print(f"TeleopServer listening on UDP {host}:{self.port} ({'key' if self.key else 'no key'}).")
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(64)
+            except OSError:
+                break
+            hello = _signed(self.key, HELLO, data)
+            if hello is not None:
+                self._hello(hello, addr)
+                continue
+            fields = _signed(self.key, COMMAND, data)
+            if fields is None:
+                continue
+            magic, ver, ptype, session, seq, client_ns, ax, ay, buttons, rtt = fields
+            if magic != MAGIC or ver != VERSION or ptype != TYPE_COMMAND:
+                continue
+
+            with self.lock:
+                if session != self.session or addr != self.client_addr:
+                    continue
+                if not _seq_newer(seq, self.last_seq) or client_ns <= self.last_client_ns:
+                    continue
+                self.last_seq = seq
+                self.last_client_ns = client_ns
+                self.last_cmd_time = time.monotonic()
+                self.axes = (ax / AXIS_SCALE, ay / AXIS_SCALE)
+                self.buttons = buttons
+                self.client_rtt_ms = rtt / 10.0
+
+            # Acked right away so the client sees the real network round trip
+            try:
+                self.sock.sendto(ACK.pack(MAGIC, VERSION, TYPE_ACK, seq, client_ns), addr)
+            except OSError:
+                pass
+
+    def _hello(self, fields, addr):
+        magic, ver, ptype, nonce = fields
+        if magic != MAGIC or ver != VERSION or ptype != TYPE_HELLO:
+            return
+        # Someone else is driving: no takeover while their commands keep coming
+        if addr != self.client_addr and self.active:
+            return
+        with self.lock:
+            self.session = int.from_bytes(os.urandom(8), "little")
+            self.client_addr = addr
+            self.last_seq = None
+            self.last_client_ns = 0
+            self.last_cmd_time = 0.0
+        welcome = WELCOME.pack(MAGIC, VERSION, TYPE_WELCOME, nonce, self.session)
+        try:
+            self.sock.sendto(welcome + _tag(self.key, welcome), addr)
+        except OSError:
+            pass
+
+    @property
+    def active(self):
+        """True while commands keep arriving (dead-man)"""
+        return time.monotonic() - self.last_cmd_time < self.DEADMAN_TIMEOUT
+
+    # --- JoystickController Interface ---
+    def get_axes(self):
+        if not self.active:
+            return 0.0, 0.0
+        with self.lock:
+            x_val, y_val = self.axes
+        if abs(x_val) < self.DEADZONE:
+            x_val = 0.0
+        if abs(y_val) < self.DEADZONE:
+            y_val = 0.0
+        return x_val, y_val
+
+    def get_button_state(self, button_id):
+        if not self.active:
+            return False
+        return bool(self.buttons >> button_id & 1)
+
+    # --- Telemetry ---
+    def publish(self, manual_mode, motor_ctrl, servo_ctrl, pump_ctrl, sensor_active, camera, loop_hz):
+        """Send telemetry to the current client (rate limited)"""
+        now = time.monotonic()
+        if self.client_addr is None or now - self.last_publish < 1.0 / self.TELEMETRY_HZ:
+            return
+        self.last_publish = now
+        self.telemetry_seq = (self.telemetry_seq + 1) & 0xFFFFFFFF
+
+        found, cx, cy, score = getattr(camera, "last_detection", (False, 0.5, 0.5, 0.0))
+        packet = TELEMETRY.pack(
+            MAGIC, VERSION, TYPE_TELEMETRY, self.telemetry_seq, self.last_seq or 0, time.monotonic_ns(),
+            1 if manual_mode else 0,
+            int(max(-100, min(100, motor_ctrl.left_speed))), int(max(-100, min(100, motor_ctrl.right_speed))),
+            int(servo_ctrl.current_pan_angle * 10), int(servo_ctrl.current_tilt_angle * 10),
+            1 if pump_ctrl.is_on else 0, 1 if sensor_active else 0,
+            1 if found else 0, int(max(0.0, min(1.0, cx)) * 10000), int(max(0.0, min(1.0, cy)) * 10000),
+            int(score * 1000), int(min(loop_hz * 10, 65535)))
+        try:
+            self.sock.sendto(packet, self.client_addr)
+        except OSError:
+            pass
+
+    def publish_config(self, version, values):
+        """Send the active config when it changed, the client changed, or periodically"""
+        now = time.monotonic()
+        if self.client_addr is None:
+            return
+        sent_version, sent_client, sent_time = self.config_sent
+        if version == sent_version and self.client_addr == sent_client and now - sent_time < self.CONFIG_INTERVAL:
+            return
+        self.config_sent = (version, self.client_addr, now)
+        packet = CONFIG.pack(MAGIC, VERSION, TYPE_CONFIG, version) + json.dumps(values).encode()
+        try:
+            self.sock.sendto(packet, self.client_addr)
+        except OSError:
+            pass
+
+    def quit(self):
+        self.running = False
+        self.sock.close()
+
+
+class TeleopClient:
+    """
+    Operator side (also used for the loopback test).
+    send() a command, poll() acks / telemetry, rtt_ms keeps the latest round trip.
+    Without a session, send() says hello instead (again after SESSION_TIMEOUT without acks).
+    """
+    HELLO_INTERVAL = 0.2     # sec
+    SESSION_TIMEOUT = 1.0    # sec without an ack: the robot restarted or gave the session away
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, key=None):
+        self.addr = (host, port)
+        self.key = _key_bytes(key)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.session = None
+        self.nonce = None
+        self.last_hello = 0.0
+        self.last_ack = 0.0
+        self.seq = 0
+        self.rtt_ms = 0.0
+        self.rtt_history = []
+        self.telemetry = None
+        self.config = None
+        self.config_version = None
+
+    def send(self, x_axis=0.0, y_axis=0.0, buttons=()):
+        """Send a command. Returns False while there is no session yet (hello sent instead)."""
+        now = time.monotonic()
+        if self.session is not None and now - self.last_ack > self.SESSION_TIMEOUT:
+            self.session = None
+        if self.session is None:
+            if now - self.last_hello >= self.HELLO_INTERVAL:
+                self.last_hello = now
+                self.nonce = int.from_bytes(os.urandom(8), "little")
+                hello = HELLO.pack(MAGIC, VERSION, TYPE_HELLO, self.nonce)
+                self.sock.sendto(hello + _tag(self.key, hello), self.addr)
+            return False
+        self.sock.sendto(self.packet(x_axis, y_axis, buttons), self.addr)
+        return True
+
+    def packet(self, x_axis=0.0, y_axis=0.0, buttons=()):
+        """Next signed command packet of the current session"""
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        mask = 0
+        for b in buttons:
+            mask |= 1 << b
+        body = COMMAND.pack(MAGIC, VERSION, TYPE_COMMAND, self.session, self.seq, time.monotonic_ns(),
+                            int(max(-1.0, min(1.0, x_axis)) * AXIS_SCALE),
+                            int(max(-1.0, min(1.0, y_axis)) * AXIS_SCALE),
+                            mask, int(min(self.rtt_ms * 10, 65535)))
+        return body + _tag(self.key, body)
+
+    def connect(self, timeout=1.0):
+        """Handshake now (blocking up to timeout). Returns True once there is a session."""
+        end = time.monotonic() + timeout
+        while self.session is None and time.monotonic() < end:
+            self.send()
+            time.sleep(0.005)
+            self.poll()
+        return self.session is not None
+
+    def poll(self):
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(4096)
+            except BlockingIOError:
+                return
+            if data[:2] != MAGIC:
+                continue
+            if data[3] == TYPE_WELCOME:
+                welcome = _signed(self.key, WELCOME, data)
+                if welcome is not None and welcome[3] == self.nonce:
+                    self.session = welcome[4]
+                    self.seq = 0
+                    self.last_ack = time.monotonic()
+            elif data[3] == TYPE_ACK and len(data) == ACK.size:
+                _, _, _, _, client_ns = ACK.unpack(data)
+                self.rtt_ms = (time.monotonic_ns() - client_ns) / 1e6
+                self.rtt_history.append(self.rtt_ms)
+                self.last_ack = time.monotonic()
+            elif data[3] == TYPE_TELEMETRY and len(data) == TELEMETRY.size:
+                f = TELEMETRY.unpack(data)
+                self.telemetry = {
+                    "seq": f[3], "cmd_seq": f[4], "manual": bool(f[6]),
+                    "left": f[7], "right": f[8], "pan": f[9] / 10.0, "tilt": f[10] / 10.0,
+                    "pump": bool(f[11]), "sensor": bool(f[12]), "found": bool(f[13]),
+                    "cx": f[14] / 10000.0, "cy": f[15] / 10000.0, "score": f[16] / 1000.0,
+                    "loop_hz": f[17] / 10.0,
+                }
+            elif data[3] == TYPE_CONFIG and len(data) >= CONFIG.size:
+                self.config_version = CONFIG.unpack_from(data)[3]
+                self.config = json.loads(data[CONFIG.size:].decode())
+
+    def close(self):
+        self.sock.close()
+
+
+def _loopback_test(seconds=5.0, rate_hz=50.0):
+    """Server + client on 127.0.0.1, reports round-trip latency and dead-man behaviour"""
+    class _Stub:
+        left_speed = right_speed = 0
+        current_pan_angle = 90
+        current_tilt_angle = 30
+        is_on = False
+        last_detection = (True, 0.42, 0.61, 0.87)
+
+    stub = _Stub()
+    server = TeleopServer(port=0, host="127.0.0.1", key="loopback-test", telemetry_hz=20.0)
+    client = TeleopClient("127.0.0.1", server.port, key="loopback-test")
+    client.connect()
+
+    end = time.monotonic() + seconds
+    telemetry_count = 0
+    while time.monotonic() < end:
+        tick = time.monotonic()
+        acked = len(client.rtt_history)
+        client.send(0.5, -0.25, buttons=(TeleopServer.BUTTON_L,))
+        # Wait for the ack without sleeping, so the RTT is not quantised
+        while len(client.rtt_history) == acked and time.monotonic() - tick < 0.1:
+            client.poll()
+        server.publish(True, stub, stub, stub, False, stub, rate_hz)
+        last = client.telemetry
+        time.sleep(max(0.0, 1.0 / rate_hz - (time.monotonic() - tick)))
+        client.poll()
+        if client.telemetry is not last:
+            telemetry_count += 1
+
+    print(f"[Teleop] Axes {server.get_axes()} | Pump button {server.get_button_state(server.BUTTON_L)}")
+
+    # Wrong key, then a second operator while the first is still driving: both ignored
+    for intruder in (TeleopClient("127.0.0.1", server.port, key="wrong"),
+                     TeleopClient("127.0.0.1", server.port, key="loopback-test")):
+        client.send(0.5, -0.25, buttons=(TeleopServer.BUTTON_L,))
+        intruder.connect(timeout=0.05)
+        print(f"[Teleop] Intruder ({'wrong key' if intruder.key != client.key else 'second client'}): "
+              f"session={intruder.session is not None} axes={server.get_axes()}")
+        intruder.close()
+    time.sleep(server.DEADMAN_TIMEOUT + 0.05)
+    print(f"[Teleop] After dead-man timeout: active={server.active} axes={server.get_axes()}")
+
+    rtt = sorted(client.rtt_history)
+    if rtt:
+        print(f"[Teleop] RTT over {len(rtt)} commands: p50 {rtt[len(rtt) // 2]:.3f}ms "
+              f"p95 {rtt[int(len(rtt) * 0.95)]:.3f}ms max {rtt[-1]:.3f}ms")
+    print(f"[Teleop] Telemetry packets: {telemetry_count} | Last: {client.telemetry}")
+    client.close()
+    server.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Robot teleoperation channel")
+    parser.add_argument("--loopback", action="store_true", help="Run server and client locally and report latency")
+    parser.add_argument("--host", help="Robot address: send idle commands and print telemetry")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--key", default=os.environ.get(KEY_ENV), help=f"Shared key (default: ${KEY_ENV})")
+    args = parser.parse_args()
+
+    if args.host:
+        client = TeleopClient(args.host, args.port, args.key)
+        try:
+            while True:
+                client.send()
+                client.poll()
+                print(f"RTT {client.rtt_ms:6.2f}ms | {client.telemetry}", end="\r")
+                time.sleep(0.05)
+        except KeyboardInterrupt:
+            client.close()
+    else:
+        _loopback_test()
@@ -0,0 +1,129 @@
+# test_runtime_config.py
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from runtime_config import ConfigError, RuntimeConfig
+
+
+def _modes():
+    return SimpleNamespace(MAX_SPEED=30, PAN_GAIN=15.0, TILT_GAIN=15.0,
+                           NOZZLE_OFFSET_X=-0.07, NOZZLE_OFFSET_Y=0.5,
+                           g_offset_x=-0.07, g_offset_y=0.5)
+
+
+def _config(tmp_path, modes, camera=None):
+    config = RuntimeConfig(modes, camera, path=str(tmp_path / "robot_config.json"))
+    config.stop()
+    return config
+
+
+def _write(config, values):
+    with open(config.path, "w") as f:
+        json.dump(values, f)
+    config._load_file()
+
+
+def test_validate_types_and_ranges(tmp_path):
+    config = _config(tmp_path, _modes())
+    assert config.validate({"MAX_SPEED": 50, "PAN_GAIN": 20}) == {"MAX_SPEED": 50.0, "PAN_GAIN": 20.0}
+    for bad in ({"MAX_SPEED": 500}, {"PAN_GAIN": "fast"}, {"MAX_SPEED": True}, {"NO_SUCH_KEY": 1}, [1, 2],
+                {"SPRAY_SWEEP": float("inf")}, {"PAN_GAIN": float("nan")}):
+        with pytest.raises(ConfigError):
+            config.validate(bad)
+
+
+def test_restart_keeps_trims(tmp_path):
+    # First boot writes the defaults
+    _config(tmp_path, _modes())
+
+    # Second boot: trims restored from aim_calibration.json, file unchanged
+    modes = _modes()
+    modes.g_offset_x, modes.g_offset_y = 0.02, 0.21
+    config = _config(tmp_path, modes)
+    config.apply_pending()
+    assert (modes.g_offset_x, modes.g_offset_y) == (0.02, 0.21)
+
+
+def test_apply_only_changed_keys(tmp_path):
+    modes = _modes()
+    config = _config(tmp_path, modes)
+    modes.g_offset_y = 0.21   # Joystick trim
+
+    values = dict(config.active, PAN_GAIN=25.0)
+    _write(config, values)
+    assert config.apply_pending()
+    assert modes.PAN_GAIN == 25.0
+    assert modes.g_offset_y == 0.21
+    assert config.version == 1
+
+    # Same file again: nothing to do
+    _write(config, values)
+    assert not config.apply_pending()
+    assert config.version == 1
+
+    # The nozzle offset itself changed: the live trim follows it
+    _write(config, dict(values, NOZZLE_OFFSET_Y=0.1))
+    assert config.apply_pending()
+    assert modes.NOZZLE_OFFSET_Y == 0.1
+    assert modes.g_offset_y == 0.1
+
+
+def test_infinity_in_file_is_rejected(tmp_path):
+    modes = _modes()
+    config = _config(tmp_path, modes)
+    with open(config.path, "w") as f:
+        f.write('{"PAN_GAIN": 25.0, "SPRAY_SWEEP": Infinity}')
+    config._load_file()
+    assert not config.apply_pending()
+    assert "finite" in config.last_error
+
+
+def test_rejected_file_keeps_values(tmp_path):
+    modes = _modes()
+    config = _config(tmp_path, modes)
+    _write(config, {"PAN_GAIN": 25.0, "TILT_GAIN": -1})
+    assert not config.apply_pending()
+    assert modes.PAN_GAIN == 15.0
+    assert config.last_error
+
+
+def test_failed_apply_rolls_back(tmp_path):
+    class Camera:
+        conf_thres = 0.5
+
+        @property
+        def img_size(self):
+            return 320
+
+        @img_size.setter
+        def img_size(self, value):
+            raise RuntimeError("busy")
+
+    modes = _modes()
+    config = _config(tmp_path, modes, Camera())
+    with config.lock:
+        config.pending = {"PAN_GAIN": 25.0, "img_size": 256}
+    assert not config.apply_pending()
+    assert modes.PAN_GAIN == 15.0
+
+
+def test_img_size_moves_resolution_ladder(tmp_path):
+    from resolution import ResolutionScaler
+
+    camera = SimpleNamespace(conf_thres=0.5, img_size=320, scaler=ResolutionScaler(320))
+    config = _config(tmp_path, _modes(), camera)
+    with pytest.raises(ConfigError):
+        config.validate({"img_size": 288})
+
+    # The ladder stepped down on its own: not a config change
+    camera.img_size = camera.scaler.size = 192
+    _write(config, dict(config.active, PAN_GAIN=25.0))
+    assert config.apply_pending()
+    assert camera.img_size == 192
+
+    _write(config, dict(config.active, img_size=256))
+    assert config.apply_pending()
+    assert camera.img_size == camera.scaler.size == 256
+
@@ -0,0 +1,92 @@
+# test_teleop.py
+import socket
+import time
+
+import pytest
+
+from teleop import TeleopClient, TeleopServer
+
+KEY = "test-key"
+
+
+@pytest.fixture
+def server():
+    srv = TeleopServer(port=0, host="127.0.0.1", key=KEY)
+    yield srv
+    srv.quit()
+
+
+def _wait(condition, timeout=0.5):
+    end = time.monotonic() + timeout
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.002)
+    return condition()
+
+
+def _expire(server):
+    time.sleep(server.DEADMAN_TIMEOUT + 0.05)
+    assert not server.active
+
+
+def test_commands_need_a_session(server):
+    client = TeleopClient("127.0.0.1", server.port, key=KEY)
+    assert not client.send(0.0, 1.0)   # Hello only
+    assert client.connect()
+    assert client.send(0.0, 1.0)
+    assert _wait(lambda: server.active)
+    assert server.get_axes()[1] > 0.9
+    client.close()
+
+
+def test_wrong_key_gets_no_session(server):
+    client = TeleopClient("127.0.0.1", server.port, key="wrong")
+    assert not client.connect(timeout=0.1)
+    client.close()
+
+
+def test_replay_from_second_address(server):
+    client = TeleopClient("127.0.0.1", server.port, key=KEY)
+    assert client.connect()
+    captured = client.packet(0.0, 1.0, (TeleopServer.BUTTON_L,))
+    client.sock.sendto(captured, client.addr)
+    assert _wait(lambda: server.active)
+    _expire(server)
+
+    attacker = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    attacker.sendto(captured, client.addr)
+    time.sleep(0.05)
+    assert not server.active
+    assert not server.get_button_state(TeleopServer.BUTTON_L)
+
+    # Same address (spoofed source) does not work either: the sequence was used
+    client.sock.sendto(captured, client.addr)
+    time.sleep(0.05)
+    assert not server.active
+
+    # Nor in a later session
+    client.session = None
+    assert client.connect()
+    attacker.sendto(captured, client.addr)
+    client.sock.sendto(captured, client.addr)
+    time.sleep(0.05)
+    assert not server.active
+    attacker.close()
+    client.close()
+
+
+def test_no_takeover_while_driving(server):
+    first = TeleopClient("127.0.0.1", server.port, key=KEY)
+    second = TeleopClient("127.0.0.1", server.port, key=KEY)
+    assert first.connect()
+    first.send(0.5, 0.0)
+    assert _wait(lambda: server.active)
+    assert not second.connect(timeout=0.05)
+
+    # After the dead-man the next operator gets a new session, the old one is dead
+    _expire(server)
+    assert second.connect()
+    first.sock.sendto(first.packet(-1.0, 0.0), first.addr)
+    time.sleep(0.05)
+    assert not server.active
+    first.close()
+    second.close()
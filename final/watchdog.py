@@ -0,0 +1,178 @@
+# watchdog.py
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+
+# --- Real-time Priority ---
+# SCHED_FIFO needs root or CAP_SYS_NICE (or an rtprio limit in /etc/security/limits.conf)
+FIFO_PRIORITY = 50
+
+
+def set_fifo(priority=FIFO_PRIORITY):
+    """SCHED_FIFO for the calling thread. Returns True on success."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return True
+    except (AttributeError, PermissionError, OSError) as e:
+        print(f"[Watchdog] SCHED_FIFO unavailable ({e}), running at normal priority.")
+        return False
+
+
+def pin_current_thread(cpus):
+    """Pin the calling thread (Linux: affinity is per thread) to a set of CPUs"""
+    if not cpus:
+        return False
+    try:
+        os.sched_setaffinity(0, set(cpus))
+        return True
+    except (AttributeError, OSError) as e:
+        print(f"[Watchdog] CPU pinning to {sorted(cpus)} failed: {e}")
+        return False
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))] * 1000
+    return pick(0.5), pick(0.99), values[-1] * 1000
+
+
+class Watchdog:
+    """
+    Stops the robot when run_robot_loop stalls (inference, imshow hang, servo sleep...).
+    - The loop calls beat() once per tick
+    - A separate thread (SCHED_FIFO if allowed) checks every CHECK_INTERVAL
+    - No beat for TIMEOUT -> motor_ctrl.stop_all() + pump_ctrl.pump_off(), once per stall
+    - Armed by the first beat, so slow start-up does not trip it
+    - Keeps loop period and own wake-up jitter for report()
+    """
+    TIMEOUT = 0.5            # sec without a beat
+    CHECK_INTERVAL = 0.01    # sec
+    MAX_SAMPLES = 10000
+
+    def __init__(self, motor_ctrl, pump_ctrl, timeout=None, cpus=None, priority=FIFO_PRIORITY):
+        if timeout is not None:
+            self.TIMEOUT = timeout
+        self.motor_ctrl = motor_ctrl
+        self.pump_ctrl = pump_ctrl
+        self.cpus = cpus
+        self.priority = priority
+
+        self.last_beat = None
+        self.tripped = False
+        self.trips = 0
+        self.longest_stall = 0.0
+        self.loop_periods = []
+        self.wake_late = []
+        self.realtime = False
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def beat(self):
+        now = time.monotonic()
+        if self.last_beat is not None and len(self.loop_periods) < self.MAX_SAMPLES:
+            self.loop_periods.append(now - self.last_beat)
+        self.last_beat = now
+        if self.tripped:
+            self.tripped = False
+            print(f"\n[Watchdog] Loop recovered after {self.longest_stall:.2f}s.")
+
+    def _run(self):
+        pin_current_thread(self.cpus)
+        self.realtime = set_fifo(self.priority) if self.priority else False
+        next_check = time.monotonic() + self.CHECK_INTERVAL
+        while self.running:
+            time.sleep(max(0.0, next_check - time.monotonic()))
+            now = time.monotonic()
+            if len(self.wake_late) < self.MAX_SAMPLES:
+                self.wake_late.append(now - next_check)
+            next_check += self.CHECK_INTERVAL
+            if next_check < now:
+                next_check = now + self.CHECK_INTERVAL
+
+            last = self.last_beat
+            if last is None:
+                continue
+            stall = now - last
+            if stall > self.TIMEOUT:
+                self.longest_stall = max(self.longest_stall, stall)
+                if not self.tripped:
+                    self.tripped = True
+                    self.trips += 1
+                    self._stop_actuators(stall)
+
+    def _stop_actuators(self, stall):
+        print(f"\n[Watchdog] !!! No heartbeat for {stall * 1000:.0f}ms: stopping motors and pump !!!")
+        for stop in (self.motor_ctrl.stop_all, self.pump_ctrl.pump_off):
+            try:
+                stop()
+            except Exception as e:
+                print(f"[Watchdog] Stop Error: {e}")
+
+    def report(self):
+        print(f"[Watchdog] Trips: {self.trips} | SCHED_FIFO: {'on' if self.realtime else 'off'} | CPUs: {sorted(self.cpus) if self.cpus else 'any'}")
+        loop = _percentiles(self.loop_periods)
+        if loop:
+            print(f"[Watchdog] Loop period    p50 {loop[0]:7.2f}ms p99 {loop[1]:7.2f}ms max {loop[2]:7.2f}ms")
+        wake = _percentiles(self.wake_late)
+        if wake:
+            print(f"[Watchdog] Wake-up jitter p50 {wake[0]:7.3f}ms p99 {wake[1]:7.3f}ms max {wake[2]:7.3f}ms")
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.report()
+
+
+# ---------------------------------------------------------
+# Jitter Comparison (free scheduling vs. pinned + SCHED_FIFO)
+# ---------------------------------------------------------
+
+def _burn(stop_time, cpus):
+    """Vision-like CPU load (kept off the control cores when pinned)"""
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    x = 0
+    while time.monotonic() < stop_time:
+        x += 1
+
+
+def measure_jitter(seconds, cpus, priority, load_procs):
+    class _Idle:
+        def stop_all(self): pass
+        def pump_off(self): pass
+
+    stop_time = time.monotonic() + seconds
+    vision_cpus = (os.sched_getaffinity(0) - set(cpus)) if cpus else None
+    loads = [multiprocessing.Process(target=_burn, args=(stop_time, vision_cpus)) for _ in range(load_procs)]
+    for p in loads:
+        p.start()
+
+    idle = _Idle()
+    dog = Watchdog(idle, idle, timeout=1.0, cpus=cpus, priority=priority)
+    while time.monotonic() < stop_time:
+        dog.beat()
+        time.sleep(0.02)
+    dog.running = False
+    dog.thread.join()
+    for p in loads:
+        p.join()
+    return dog
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watchdog wake-up jitter under CPU load")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--cpus", type=int, nargs="+", default=[3], help="Control core(s) for the pinned run")
+    parser.add_argument("--load", type=int, default=os.cpu_count() or 4, help="Busy processes (vision stand-in)")
+    args = parser.parse_args()
+
+    print(f">>> Watchdog jitter, {args.load} busy processes, {args.seconds:.0f}s per run <<<")
+    for label, cpus, prio in [("free", None, 0), ("pinned + SCHED_FIFO", set(args.cpus), FIFO_PRIORITY)]:
+        print(f"\n--- {label} ---")
+        measure_jitter(args.seconds, cpus, prio, args.load).report()